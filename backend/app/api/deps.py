@@ -1,24 +1,82 @@
-from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from app.models.models import User
 from app.core.config import settings
-from typing import Generator, Optional
-from app.db.session import SessionLocal
-from app.core.security import ALGORITHM
-from fastapi import Depends, HTTPException, status, Request, Header
-
-def get_db() -> Generator:
-    db = SessionLocal()
-    try:
+from typing import AsyncGenerator, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import AsyncSessionLocal
+from app.db.replicas import replica_set
+from app.core.security import InvalidToken, decode_token
+from app.core.principal_cache import Principal, principal_cache
+from fastapi import Depends, HTTPException, status, Request, Response, Header
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Set after a write so the client's next reads see it despite replica lag
+PRIMARY_COOKIE = "read_primary"
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Safe requests read from a replica when any are configured and healthy;
+    everything else, and reads right after the client's own writes, use the primary.
+    """
+    bind = None
+    if replica_set:
+        if request.method not in SAFE_METHODS:
+            # Picked up by PrimaryCookieMiddleware
+            request.state.read_primary = True
+        elif PRIMARY_COOKIE not in request.cookies:
+            bind = replica_set.choose()
+
+    async with (AsyncSessionLocal(bind=bind) if bind else AsyncSessionLocal()) as db:
         yield db
-    finally:
-        db.close()
 
-def get_current_user(
+
+class PrimaryCookieMiddleware:
+    """
+    Sets PRIMARY_COOKIE on the response of a write that get_db sent to the
+    primary. Done here rather than on get_db's injected Response, which
+    endpoints returning their own Response (a 204, a cached body) drop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and scope.get("state", {}).get("read_primary"):
+                cookie = Response()
+                cookie.set_cookie(
+                    key=PRIMARY_COOKIE,
+                    value="1",
+                    httponly=True,
+                    max_age=settings.REPLICA_STICKY_SECONDS,
+                    samesite=settings.COOKIE_SAMESITE,
+                    secure=settings.COOKIE_SECURE,
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    header for header in cookie.raw_headers if header[0] == b"set-cookie"
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+async def get_user_by_subject(db: AsyncSession, subject: str) -> Optional[User]:
+    """Token subjects are user ids; tokens issued before that carry the email."""
+    if subject.isdigit():
+        return await db.get(User, int(subject))
+    return (await db.execute(select(User).where(User.email == subject))).scalars().first()
+
+async def get_current_principal(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     authorization: Optional[str] = Header(None),
-) -> User:
+) -> Principal:
+    """
+    Authenticates the request. A cached token is served without decoding
+    it again and without touching the database.
+    """
     token: Optional[str] = None
     if authorization and authorization.startswith("Bearer "):
         token = authorization.replace("Bearer ", "")
@@ -31,21 +89,38 @@ def get_current_user(
             detail="Not authenticated"
         )
 
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        email: str | None = payload.get("sub")
-        if not email:
+    principal = principal_cache.get(token)
+    if principal is None:
+        try:
+            payload = decode_token(token)
+            subject: str | None = payload.get("sub")
+            if not subject:
+                raise HTTPException(status_code=403, detail="Not enough permissions")
+        except InvalidToken:
             raise HTTPException(status_code=403, detail="Not enough permissions")
-    except JWTError:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    user = db.query(User).filter(User.email == email).first()
+        user = await get_user_by_subject(db, str(subject))
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        principal = Principal(id=user.id, username=user.username, is_active=user.is_active)
+        principal_cache.put(token, principal, expires_at=payload.get("exp"))
+
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
     
+    # Lets the rate limiter key on the user
+    request.state.principal = principal
+    return principal
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(get_current_principal),
+) -> User:
+    """The full users row, for endpoints that need more than the principal."""
+    user = await db.get(User, principal.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if not user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    
     return user
 
 def validate_csrf(
@@ -1,8 +1,10 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, snippets
+from app.api.v1.endpoints import auth, users, snippets, system, tags
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/auth", tags=["Auth"])
 api_router.include_router(users.router, prefix="/users", tags=["Users"])
-api_router.include_router(snippets.router, prefix="/snippets", tags=["Snippets"])
\ No newline at end of file
+api_router.include_router(snippets.router, prefix="/snippets", tags=["Snippets"])
+api_router.include_router(tags.router, prefix="/tags", tags=["Tags"])
+api_router.include_router(system.router, prefix="/system", tags=["System"])
\ No newline at end of file
@@ -1,16 +1,17 @@
 from typing import Any
 from app.api import deps
 from datetime import timedelta
-from jose import jwt, JWTError
 from app.models.models import User
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.password_hasher import password_hasher
 from app.core.config import settings
 from app.core.limiter import limiter
 from app.core.auth_csrf import generate_csrf_token
 from fastapi.security import OAuth2PasswordRequestForm
 from app.schemas.schemas import UserCreate, UserResponse
 from fastapi import APIRouter, Depends, HTTPException, Response, Request
-from app.core.security import create_access_token, create_refresh_token, get_password_hash, verify_password, ALGORITHM
+from app.core.security import InvalidToken, create_access_token, create_refresh_token, decode_token
 
 router = APIRouter()
 
@@ -48,24 +49,31 @@ def set_auth_cookies(response: Response, access_token: str, refresh_token: str,
 
 @router.post("/login", response_model=UserResponse)
 @limiter.limit("5/minute")
-def login_access_token(
+async def login_access_token(
     request: Request,
     *,
     response: Response,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = (await db.execute(select(User).where(User.email == form_data.username))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    is_valid, new_hash = await password_hasher.verify(form_data.password, user.hashed_password)
+    if not is_valid:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    if new_hash:
+        # Stored with an outdated bcrypt cost
+        user.hashed_password = new_hash
+        await db.commit()
 
     access_token = create_access_token(
-        data={"sub": user.email},
+        data={"sub": str(user.id)},
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    refresh_token = create_refresh_token(data={"sub": user.email})
+    refresh_token = create_refresh_token(data={"sub": str(user.id)})
     csrf_token = generate_csrf_token()
 
     set_auth_cookies(response, access_token, refresh_token, csrf_token)
@@ -78,33 +86,33 @@ def login_access_token(
     response_model=UserResponse,
 )
 @limiter.limit("3/minute")
-def register_user(
+async def register_user(
     request: Request,
     *,
     user_in: UserCreate,
     response: Response,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
 ) -> Any:
-    user = db.query(User).filter(User.email == user_in.email).first()
+    user = (await db.execute(select(User).where(User.email == user_in.email))).scalars().first()
     if user:
         raise HTTPException(status_code=400, detail="User already exists")
     
     user = User(
         email=user_in.email,
         username=user_in.username,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await password_hasher.hash(user_in.password),
         is_active=True,
         reputation_stars=0
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     access_token = create_access_token(
-        data={"sub": user.email},
+        data={"sub": str(user.id)},
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    refresh_token = create_refresh_token(data={"sub": user.email})
+    refresh_token = create_refresh_token(data={"sub": str(user.id)})
     csrf_token = generate_csrf_token()
 
     set_auth_cookies(response, access_token, refresh_token, csrf_token)
@@ -125,10 +133,10 @@ def logout(request: Request, *, response: Response):
 
 @router.post("/refresh", response_model=UserResponse, dependencies=[Depends(deps.validate_csrf)])
 @limiter.limit("10/minute")
-def refresh_token_endpoint(
+async def refresh_token_endpoint(
     *,
     response: Response,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     request: Request
 ):
     refresh_token = request.cookies.get("refresh_token")
@@ -136,22 +144,22 @@ def refresh_token_endpoint(
         raise HTTPException(status_code=401, detail="No refresh token found")
 
     try:
-        payload = jwt.decode(refresh_token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        email: str | None = payload.get("sub")
-        if not email:
+        payload = decode_token(refresh_token)
+        subject: str | None = payload.get("sub")
+        if not subject:
             raise HTTPException(status_code=403, detail="Invalid refresh token")
-    except JWTError:
+    except InvalidToken:
         raise HTTPException(status_code=403, detail="Invalid refresh token")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = await deps.get_user_by_subject(db, str(subject))
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="User not found or inactive")
 
     access_token = create_access_token(
-        data={"sub": user.email},
+        data={"sub": str(user.id)},
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    new_refresh_token = create_refresh_token(data={"sub": user.email})
+    new_refresh_token = create_refresh_token(data={"sub": str(user.id)})
     csrf_token = generate_csrf_token()
 
     set_auth_cookies(response, access_token, new_refresh_token, csrf_token)
@@ -1,22 +1,111 @@
+import re
 from app.api import deps
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy import LargeBinary, select, type_coerce
+from sqlalchemy.orm import defer, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.limiter import limiter
-from typing import Any, List, Optional
+from app.core.metrics import timed_serialization
+from app.services import bulk_service, search_service, snippet_service
+from app.services.code_search_service import SearchMode, search_code
+from pydantic import TypeAdapter
+from typing import Any, FrozenSet, Iterable, List, Optional, Tuple
 from datetime import datetime, timezone
-from app.models.models import User, Snippet, Tag, SnippetLike
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from app.schemas.schemas import SnippetCreate, SnippetResponse, SnippetUpdate
+from app.crud import crud_like, crud_snippet, crud_tag
+from app.models.models import Snippet, SnippetBlob, content_hash, normalize_code
+from app.core.principal_cache import Principal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from app.db import compression
+from app.db.session import AsyncSessionLocal
+from app.core.etag import cache_headers, etag_matches, make_etag, not_modified
+from app.core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, keyset_page, page_with_cursor
+from app.core.response_cache import LISTS_TAG, TRENDING_TAG, response_cache, snippet_tag
+from app.schemas.schemas import (
+    ImportReport, LikeResponse, SnippetCreate, SnippetListItem, SnippetResponse,
+    SnippetSearchResult, SnippetSearchSummary, SnippetSummary, SnippetUpdate,
+)
 
 router = APIRouter()
 
+# Id of the caller's existing snippet with the same code, set on create
+DUPLICATE_OF_HEADER = "X-Duplicate-Of"
+
+snippet_adapter = TypeAdapter(SnippetResponse)
+list_item_adapter = TypeAdapter(List[SnippetListItem])
+summary_list_adapter = TypeAdapter(List[SnippetSummary])
+search_result_list_adapter = TypeAdapter(List[SnippetSearchResult])
+search_summary_list_adapter = TypeAdapter(List[SnippetSearchSummary])
+
+MAX_FILTER_TAGS = 10
+
+SUMMARY_FIELDS = frozenset(SnippetSummary.model_fields)
+FULL_FIELDS = frozenset(SnippetResponse.model_fields)
+LIST_FIELDS = frozenset(SnippetListItem.model_fields)
+FIELDS_DESCRIPTION = (
+    "`summary` (default: preview instead of code_content), `full`, "
+    f"or a comma-separated subset of: {', '.join(sorted(LIST_FIELDS))}"
+)
+
 
 def utc_now():
     return datetime.now(timezone.utc)
 
 
-def normalize_tag(tag: str) -> str:
-    return tag.strip().lower()
+@timed_serialization
+def dump_json(adapter: TypeAdapter, value: Any) -> bytes:
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def list_tags(snippet_ids: Iterable[int]) -> List[str]:
+    """Cache tags of a list response: every list, plus each snippet it contains."""
+    return [LISTS_TAG, *(snippet_tag(snippet_id) for snippet_id in snippet_ids)]
+
+
+def parse_tags(tag: Optional[str], tags: Optional[str]) -> List[str]:
+    """Normalized, deduplicated (and sorted, for the cache key) names from ?tag= and ?tags=."""
+    names = [tag or "", *(tags or "").split(",")]
+    names = sorted({crud_tag.normalize_tag(name) for name in names} - {""})
+    if len(names) > MAX_FILTER_TAGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_FILTER_TAGS} tags can be combined")
+    return names
+
+
+def parse_fields(fields: Optional[str]) -> FrozenSet[str]:
+    """Resolves `fields=` to a set of list fields; `id` is always included."""
+    if not fields or fields == "summary":
+        return SUMMARY_FIELDS
+    if fields == "full":
+        return FULL_FIELDS
+    requested = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = requested - LIST_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested | {"id"}
+
+
+def fields_key(fields: FrozenSet[str]) -> str:
+    return ",".join(sorted(fields))
+
+
+def list_options(fields: FrozenSet[str]) -> list:
+    """Loader options for a list projection; code_content is only read when requested."""
+    options = [selectinload(Snippet.tags)]
+    if "code_content" not in fields:
+        options.append(defer(Snippet.code_content, raiseload=True))
+    return options
+
+
+@timed_serialization
+def dump_fields(items: Any, fields: FrozenSet[str], full: TypeAdapter, summary: TypeAdapter, extra=()) -> bytes:
+    """Serializes list items restricted to `fields` (plus `extra`), without touching a deferred code_content."""
+    adapter = full if "code_content" in fields else summary
+    include = {"__all__": set(fields) | set(extra)}
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True), include=include)
+
+
+def normalize_query(q: Optional[str]) -> Optional[str]:
+    """Full-text queries that tokenize the same share a cache entry."""
+    return " ".join(search_service.query_terms(q)) if q else None
 
 
 # CREATE SNIPPET
@@ -27,22 +116,27 @@ def normalize_tag(tag: str) -> str:
     dependencies=[Depends(deps.validate_csrf)]
 )
 @limiter.limit("5/minute")
-def create_snippet(
+async def create_snippet(
     request: Request,
+    response: Response,
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     snippet_in: SnippetCreate,
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ) -> Any:
-    tag_objects: List[Tag] = []
-    for tag_name in snippet_in.tags:
-        normalized = normalize_tag(tag_name)
-        tag = db.query(Tag).filter(Tag.name == normalized).first()
-        if not tag:
-            tag = Tag(name=normalized)
-            db.add(tag)
-            db.flush()
-        tag_objects.append(tag)
+    """Re-posting code the user already shared is allowed but flagged with X-Duplicate-Of."""
+    duplicate_id = (await db.execute(
+        select(Snippet.id)
+        .where(
+            Snippet.content_hash == content_hash(normalize_code(snippet_in.code_content)),
+            Snippet.user_id == current_user.id,
+        )
+        .limit(1)
+    )).scalar()
+    if duplicate_id is not None:
+        response.headers[DUPLICATE_OF_HEADER] = str(duplicate_id)
+
+    tag_ids = await crud_tag.resolve_tag_ids(db, snippet_in.tags)
 
     snippet = Snippet(
         title=snippet_in.title,
@@ -50,69 +144,319 @@ def create_snippet(
         language=snippet_in.language,
         user_id=current_user.id,
         created_at=utc_now(),
-        updated_at=utc_now(),
-        tags=tag_objects
+        updated_at=utc_now()
     )
 
     db.add(snippet)
-    db.commit()
-    db.refresh(snippet)
-    return snippet
+    await db.flush()
+    await crud_tag.link_tags(db, snippet.id, tag_ids)
+    await db.run_sync(snippet_service.index_snippet, snippet)
+    await db.commit()
+    await response_cache.snippet_created()
+    return await crud_snippet.get_snippet(db, snippet.id)
 
 
 # READ SNIPPETS
-@router.get("/", response_model=List[SnippetResponse])
+async def load_feed(
+    db: AsyncSession,
+    cursor: Optional[str],
+    skip: int,
+    limit: int,
+    tags: List[str],
+    q: Optional[str],
+    fields: FrozenSet[str] = SUMMARY_FIELDS,
+    match: crud_tag.TagMatch = crud_tag.TagMatch.all,
+) -> Tuple[List[Snippet], Optional[str]]:
+    statement = select(Snippet).options(*list_options(fields))
+    if tags:
+        clauses = await crud_tag.tag_filter(db, tags, match)
+        if clauses is None:
+            return [], None
+        statement = statement.where(*clauses)
+    if q:
+        matches = search_service.ranked_matches(db, q)
+        if matches is None:
+            return [], None
+        statement = statement.where(Snippet.id.in_(select(matches.c.snippet_id)))
+    if skip:
+        statement = statement.offset(skip)
+
+    try:
+        statement = keyset_page(statement, Snippet, cursor, limit)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return page_with_cursor((await db.execute(statement)).scalars().all(), limit)
+
+
+@router.get("/", response_model=List[SnippetSummary])
 @limiter.limit("20/minute")
-def read_snippets(
+async def read_snippets(
     request: Request,
     *,
-    skip: int = 0,
-    limit: int = Query(default=10, le=100),
+    cursor: Optional[str] = None,
+    skip: int = Query(default=0, ge=0, deprecated=True),
+    limit: int = Query(default=10, ge=1, le=100),
     tag: Optional[str] = None,
+    tags: Optional[str] = Query(default=None, description="Comma-separated tag names"),
+    match: crud_tag.TagMatch = Query(default=crud_tag.TagMatch.all, description="Require `all` of the tags, or `any`"),
     q: Optional[str] = None,
-    db: Session = Depends(deps.get_db)
+    fields: Optional[str] = Query(default=None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(deps.get_db)
 ) -> Any:
-    query = db.query(Snippet)
-    if tag:
-        normalized_tag = normalize_tag(tag)
-        query = query.join(Snippet.tags).filter(Tag.name == normalized_tag)
-    if q:
-        query = query.filter(
-            or_(Snippet.title.ilike(f"%{q}%"), Snippet.code_content.ilike(f"%{q}%"))
-        )
-    return query.order_by(Snippet.created_at.desc()).offset(skip).limit(limit).all()
+    """
+    Newest-first feed with keyset pagination: pass the `X-Next-Cursor`
+    response header back as `cursor` to fetch the following page.
+    """
+    tag_names = parse_tags(tag, tags)
+    q = normalize_query(q)
+    selected = parse_fields(fields)
+    key = response_cache.make_key(
+        "feed", cursor=cursor, skip=skip, limit=limit, tags=",".join(tag_names),
+        match=match.value if len(tag_names) > 1 else None, q=q, fields=fields_key(selected),
+    )
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
+    snippets, next_cursor = await load_feed(db, cursor, skip, limit, tag_names, q, selected, match)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return await response_cache.store(
+        key,
+        dump_fields(snippets, selected, list_item_adapter, summary_list_adapter),
+        list_tags(snippet.id for snippet in snippets),
+        headers,
+    )
 
 
 # SEARCH SNIPPETS
-@router.get("/search", response_model=List[SnippetResponse])
+async def load_search_results(
+    db: AsyncSession, q: str, mode: SearchMode, fields: FrozenSet[str] = SUMMARY_FIELDS
+) -> list:
+    if mode != SearchMode.text:
+        # Matching needs the code itself; the projection only trims the response
+        try:
+            results = await db.run_sync(search_code, q, mode)
+        except re.error as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid regex: {exc}")
+        return [
+            dict(SnippetListItem.model_validate(snippet).model_dump(), matches=matches)
+            for snippet, matches in results
+        ]
+
+    matches = search_service.ranked_matches(db, q)
+    if matches is None:
+        return []
+    statement = (
+        select(Snippet)
+        .options(*list_options(fields))
+        .join(matches, matches.c.snippet_id == Snippet.id)
+        .order_by(matches.c.rank, Snippet.created_at.desc())
+    )
+    return (await db.execute(statement)).scalars().all()
+
+
+@router.get("/search", response_model=List[SnippetSearchSummary])
+@limiter.limit("20/minute")
+async def search_snippets(
+    request: Request,
+    *,
+    q: str = Query(..., min_length=1, max_length=200),
+    mode: SearchMode = SearchMode.text,
+    fields: Optional[str] = Query(default=None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(deps.get_db)
+) -> Any:
+    if mode == SearchMode.text:
+        q = normalize_query(q) or q
+    selected = parse_fields(fields)
+    key = response_cache.make_key("search", q=q, mode=mode.value, fields=fields_key(selected))
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
+    results = await load_search_results(db, q, mode, selected)
+    snippet_ids = [r["id"] if isinstance(r, dict) else r.id for r in results]
+    body = dump_fields(
+        results, selected, search_result_list_adapter, search_summary_list_adapter, extra=("matches",)
+    )
+    return await response_cache.store(key, body, list_tags(snippet_ids))
+
+
+# TRENDING SNIPPETS
+@router.get("/trending", response_model=List[SnippetSummary])
 @limiter.limit("20/minute")
-def search_snippets(
+async def read_trending_snippets(
     request: Request,
     *,
-    q: str = Query(..., min_length=1),
-    db: Session = Depends(deps.get_db)
+    limit: int = Query(default=10, ge=1, le=100),
+    fields: Optional[str] = Query(default=None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(deps.get_db)
 ) -> Any:
-    return (
-        db.query(Snippet)
-        .filter(or_(Snippet.title.ilike(f"%{q}%"), Snippet.code_content.ilike(f"%{q}%")))
-        .order_by(Snippet.created_at.desc())
-        .all()
+    """
+    Most liked snippets, with each like counting half as much every
+    TRENDING_HALF_LIFE_HOURS. Served from the stored scores and their index.
+    """
+    selected = parse_fields(fields)
+    key = response_cache.make_key("trending", limit=limit, fields=fields_key(selected))
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
+    statement = (
+        select(Snippet)
+        .options(*list_options(selected))
+        .where(Snippet.trending_score > 0)
+        .order_by(Snippet.trending_score.desc(), Snippet.id.desc())
+        .limit(limit)
+    )
+    snippets = (await db.execute(statement)).scalars().all()
+    return await response_cache.store(
+        key,
+        dump_fields(snippets, selected, list_item_adapter, summary_list_adapter),
+        [TRENDING_TAG, *(snippet_tag(snippet.id) for snippet in snippets)],
     )
 
 
+# BULK IMPORT (NDJSON)
+@router.post(
+    "/import",
+    response_model=ImportReport,
+    dependencies=[Depends(deps.validate_csrf)]
+)
+@limiter.limit("2/minute")
+async def import_snippets(
+    request: Request,
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal)
+) -> Any:
+    """
+    Streams an NDJSON body (one snippet per line, as produced by /export)
+    into batched inserts owned by the caller. Invalid lines are reported by
+    line number and skipped; the valid ones are still imported.
+    """
+    lines = bulk_service.iter_lines(request.stream())
+    return await bulk_service.import_snippets(db, lines, current_user.id)
+
+
+# BULK EXPORT (NDJSON)
+@router.get("/export")
+@limiter.limit("2/minute")
+async def export_snippets(
+    request: Request,
+    *,
+    user_id: Optional[int] = None,
+    current_user: Principal = Depends(deps.get_current_principal)
+) -> Any:
+    """
+    Streams the caller's own snippets as NDJSON in id order. There is no
+    admin role, so whole-database exports go through `python -m app.cli export`.
+    """
+    if user_id is not None and user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="You can only export your own snippets")
+
+    async def stream():
+        # Owned by the stream, which outlives the request handler
+        async with AsyncSessionLocal() as db:
+            async for chunk in bulk_service.export_snippets(db, current_user.id):
+                yield chunk
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# RESPONSE CACHE STATS
+@router.get("/cache/stats", dependencies=[Depends(deps.get_current_principal)])
+async def read_cache_stats() -> Any:
+    return response_cache.stats()
+
+
 # READ SINGLE SNIPPET
 @router.get("/{snippet_id}", response_model=SnippetResponse)
 @limiter.limit("20/minute")
-def read_snippet(
+async def read_snippet(
     request: Request,
     *,
     snippet_id: int,
-    db: Session = Depends(deps.get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(deps.get_db)
 ) -> Any:
-    snippet = db.query(Snippet).filter(Snippet.id == snippet_id).first()
+    """
+    Conditional GET: the ETag covers everything that changes the JSON
+    (updated_at for edits, like_count for likes), so a matching
+    If-None-Match is answered with 304 from the response cache or from a
+    narrow query that never loads code_content.
+    """
+    key = response_cache.make_key("snippet", id=snippet_id)
+    cached = await response_cache.get(key)
+    if cached:
+        if etag_matches(if_none_match, cached.headers["ETag"]):
+            return not_modified(cached.headers["ETag"])
+        return cached
+
+    version = (await db.execute(
+        select(Snippet.updated_at, Snippet.like_count).where(Snippet.id == snippet_id)
+    )).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Snippet not found")
+    etag = make_etag(snippet_id, version.updated_at.isoformat(), version.like_count)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    snippet = await crud_snippet.get_snippet(db, snippet_id)
     if not snippet:
         raise HTTPException(status_code=404, detail="Snippet not found")
-    return snippet
+    etag = make_etag(snippet_id, snippet.updated_at.isoformat(), snippet.like_count)
+    return await response_cache.store(
+        key, dump_json(snippet_adapter, snippet), [snippet_tag(snippet_id)], cache_headers(etag)
+    )
+
+
+# READ RAW SNIPPET CONTENT
+@router.get(
+    "/{snippet_id}/raw",
+    response_class=Response,
+    responses={200: {"content": {"text/plain": {}}}, 304: {"description": "Not Modified"}},
+)
+@limiter.limit("20/minute")
+async def read_snippet_raw(
+    request: Request,
+    *,
+    snippet_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(deps.get_db)
+) -> Response:
+    """
+    The bare code as text/plain, for editors and CLI clients. With compressed
+    storage, bodies stored in a coding the client accepts are sent as stored.
+    """
+    blob_hash = (await db.execute(select(Snippet.content_hash).where(Snippet.id == snippet_id))).scalar()
+    if blob_hash is None:
+        raise HTTPException(status_code=404, detail="Snippet not found")
+    # Keyed on the body itself: identical code shares a validator across snippets
+    etag = make_etag("raw", blob_hash)
+    # Each content-coding is its own representation with its own validator
+    variants = [etag] + [f'{etag[:-1]}-{encoding}"' for encoding in compression.HTTP_ENCODINGS.values()]
+    for variant in variants if compression.enabled() else variants[:1]:
+        if etag_matches(if_none_match, variant):
+            return not_modified(variant)
+
+    if not compression.enabled():
+        code_content = (await db.execute(select(SnippetBlob.content).where(SnippetBlob.hash == blob_hash))).scalar()
+        if code_content is None:
+            raise HTTPException(status_code=404, detail="Snippet not found")
+        return Response(content=code_content, media_type="text/plain; charset=utf-8", headers=cache_headers(etag))
+
+    stored = (await db.execute(
+        select(type_coerce(SnippetBlob.content, LargeBinary)).where(SnippetBlob.hash == blob_hash)
+    )).scalar()
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Snippet not found")
+    encoded = compression.http_encoded(stored, request.headers.get("accept-encoding"))
+    if encoded is None:
+        headers = {**cache_headers(etag), "Vary": "Accept-Encoding"}
+        return Response(content=compression.decompress(stored), media_type="text/plain; charset=utf-8", headers=headers)
+    encoding, body = encoded
+    headers = {**cache_headers(f'{etag[:-1]}-{encoding}"'), "Vary": "Accept-Encoding", "Content-Encoding": encoding}
+    return Response(content=body, media_type="text/plain; charset=utf-8", headers=headers)
 
 
 # UPDATE SNIPPET
@@ -122,15 +466,15 @@ def read_snippet(
     dependencies=[Depends(deps.validate_csrf)]
 )
 @limiter.limit("5/minute")
-def update_snippet(
+async def update_snippet(
     request: Request,
     *,
     snippet_id: int,
     snippet_in: SnippetUpdate,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal)
 ) -> Any:
-    snippet = db.query(Snippet).filter(Snippet.id == snippet_id).first()
+    snippet = await db.get(Snippet, snippet_id)
     if not snippet:
         raise HTTPException(status_code=404, detail="Snippet not found")
     if snippet.user_id != current_user.id:
@@ -138,25 +482,20 @@ def update_snippet(
 
     update_data = snippet_in.model_dump(exclude_unset=True)
     if "tags" in update_data:
-        tag_objects: List[Tag] = []
-        for tag_name in update_data["tags"]:
-            normalized = normalize_tag(tag_name)
-            tag = db.query(Tag).filter(Tag.name == normalized).first()
-            if not tag:
-                tag = Tag(name=normalized)
-                db.add(tag)
-                db.flush()
-            tag_objects.append(tag)
-        snippet.tags = tag_objects
-        del update_data["tags"]
+        tag_ids = await crud_tag.resolve_tag_ids(db, update_data.pop("tags"))
+        await crud_tag.link_tags(db, snippet.id, tag_ids, replace=True)
 
     for field, value in update_data.items():
         setattr(snippet, field, value)
 
     snippet.updated_at = utc_now()
-    db.commit()
-    db.refresh(snippet)
-    return snippet
+    if "title" in update_data or "code_content" in update_data:
+        # The flush normalizes the code, which the index must be built from
+        await db.flush()
+        await db.run_sync(snippet_service.index_snippet, snippet)
+    await db.commit()
+    await response_cache.snippet_updated(snippet_id)
+    return await crud_snippet.get_snippet(db, snippet_id)
 
 
 # DELETE SNIPPET
@@ -166,57 +505,44 @@ def update_snippet(
     dependencies=[Depends(deps.validate_csrf)]
 )
 @limiter.limit("5/minute")
-def delete_snippet(
+async def delete_snippet(
     request: Request,
     *,
     snippet_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
-    snippet = db.query(Snippet).filter(Snippet.id == snippet_id).first()
+    snippet = await db.get(Snippet, snippet_id)
     if not snippet:
         raise HTTPException(status_code=404, detail="Snippet not found")
     if snippet.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    db.delete(snippet)
-    db.commit()
+    await db.run_sync(snippet_service.unindex_snippet, snippet_id)
+    await crud_tag.unlink_tags(db, snippet_id)
+    await db.delete(snippet)
+    await db.commit()
+    await response_cache.snippet_deleted(snippet_id)
     return None
 
 
 # LIKE / UNLIKE SNIPPET
 @router.post(
     "/{snippet_id}/like",
+    response_model=LikeResponse,
     dependencies=[Depends(deps.validate_csrf)]
 )
 @limiter.limit("10/minute")
-def like_snippet(
+async def like_snippet(
     request: Request,
     *,
     snippet_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
-    snippet = db.query(Snippet).filter(Snippet.id == snippet_id).first()
-    if not snippet:
+    owner_id = (await db.execute(select(Snippet.user_id).where(Snippet.id == snippet_id))).first()
+    if not owner_id:
         raise HTTPException(status_code=404, detail="Snippet not found")
 
-    owner = db.query(User).filter(User.id == snippet.user_id).first()
-    existing_like = (
-        db.query(SnippetLike)
-        .filter(SnippetLike.user_id == current_user.id, SnippetLike.snippet_id == snippet_id)
-        .first()
-    )
-
-    if existing_like:
-        db.delete(existing_like)
-        if owner and owner.reputation_stars > 0:
-            owner.reputation_stars -= 1
-        db.commit()
-        return {"is_liked": False}
-
-    db.add(SnippetLike(user_id=current_user.id, snippet_id=snippet_id, liked_at=utc_now()))
-    if owner:
-        owner.reputation_stars += 1
-    db.commit()
-    return {"is_liked": True}
+    is_liked, like_count = await crud_like.toggle_like(db, current_user.id, snippet_id, owner_id[0])
+    return {"is_liked": is_liked, "like_count": like_count}
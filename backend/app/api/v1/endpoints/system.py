@@ -0,0 +1,17 @@
+from typing import Any
+from fastapi import APIRouter
+from app.db.session import async_engine, engine, pool_stats
+from app.db.replicas import replica_set
+
+router = APIRouter()
+
+
+# DATABASE POOL STATS
+@router.get("/db-pool")
+async def read_db_pool_stats() -> Any:
+    """Per-worker pool occupancy; size DB_POOL_SIZE from checked_out and wait times under load."""
+    return {
+        "async": pool_stats(async_engine.sync_engine),
+        "sync": pool_stats(engine),
+        "replicas": replica_set.stats(),
+    }
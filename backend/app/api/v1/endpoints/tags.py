@@ -0,0 +1,53 @@
+from app.api import deps
+from typing import Any, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Query, Request
+from starlette.concurrency import run_in_threadpool
+from app.core.limiter import limiter
+from app.crud import crud_tag
+from app.core.tag_index import TagIndex
+from app.db.session import engine
+from app.schemas.schemas import TagCount
+
+router = APIRouter()
+
+
+# TOP TAGS
+@router.get("/", response_model=List[TagCount])
+@limiter.limit("20/minute")
+async def read_top_tags(
+    request: Request,
+    *,
+    limit: int = Query(default=20, ge=1, le=100),
+    db: AsyncSession = Depends(deps.get_db)
+) -> Any:
+    """Most used tags with their snippet counts, for facets next to the feed."""
+    return [
+        TagCount(name=name, snippet_count=snippet_count)
+        for name, snippet_count in await crud_tag.get_top_tags(db, limit)
+    ]
+
+
+# SUGGEST TAGS
+@router.get("/suggest", response_model=List[TagCount])
+@limiter.limit("120/minute")
+async def suggest_tags(
+    request: Request,
+    *,
+    prefix: str = Query(default="", max_length=50),
+    limit: int = Query(default=10, ge=1, le=TagIndex.MAX_SUGGESTIONS),
+) -> Any:
+    """Autocomplete for the tag input: the most used tags starting with `prefix`, from memory."""
+    if crud_tag.tag_index.due():
+        await run_in_threadpool(crud_tag.refresh_tag_index, engine)
+    return [
+        TagCount(name=name, snippet_count=snippet_count)
+        for name, snippet_count in crud_tag.tag_index.suggest(crud_tag.normalize_tag(prefix), limit)
+    ]
+
+
+# TAG CACHE STATS
+@router.get("/cache/stats", dependencies=[Depends(deps.get_current_principal)])
+async def read_tag_cache_stats() -> Any:
+    """This worker's name -> id cache (size, hits, misses, evictions)."""
+    return crud_tag.tag_cache.stats()
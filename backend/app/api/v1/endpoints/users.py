@@ -1,24 +1,41 @@
 from app.api import deps
-from typing import Any, List
-from sqlalchemy.orm import Session
+from typing import Any, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import user as crud_user
 from app.models.models import User
 from app.core.limiter import limiter
-from fastapi import APIRouter, Depends, HTTPException, Request
-from app.schemas.schemas import UserCreate, UserResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from app.core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, keyset_page, page_with_cursor
+from app.core.password_hasher import password_hasher
+from app.schemas.schemas import PasswordChange, UserCreate, UserResponse
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[UserResponse])
 @limiter.limit("10/minute")
-def read_users(
+async def read_users(
     request: Request,
+    response: Response,
     *,
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100
+    db: AsyncSession = Depends(deps.get_db),
+    cursor: Optional[str] = None,
+    skip: int = Query(default=0, ge=0, deprecated=True),
+    limit: int = Query(default=100, ge=1, le=100)
 ) -> Any:
-    return db.query(User).offset(skip).limit(limit).all()
+    statement = select(User)
+    if skip:
+        statement = statement.offset(skip)
+
+    try:
+        statement = keyset_page(statement, User, cursor, limit)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    users, next_cursor = page_with_cursor((await db.execute(statement)).scalars().all(), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return users
 
 
 @router.post(
@@ -27,33 +44,32 @@ def read_users(
     status_code=201,
 )
 @limiter.limit("5/minute")
-def create_user(
+async def create_user(
     request: Request,
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     user_in: UserCreate
 ) -> Any:
-    user = db.query(User).filter(User.email == user_in.email).first()
+    user = (await db.execute(select(User).where(User.email == user_in.email))).scalars().first()
     if user:
         raise HTTPException(status_code=400, detail="The user with this email already exists in the system")
 
-    from app.core.security import get_password_hash
     user = User(
         email=user_in.email,
         username=user_in.username,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await password_hasher.hash(user_in.password),
         is_active=True,
         reputation_stars=0
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.get("/me", response_model=UserResponse)
 @limiter.limit("20/minute")
-def read_user_me(
+async def read_user_me(
     request: Request,
     *,
     current_user: User = Depends(deps.get_current_user)
@@ -61,15 +77,32 @@ def read_user_me(
     return current_user
 
 
+@router.put("/me/password", status_code=204, dependencies=[Depends(deps.validate_csrf)])
+@limiter.limit("5/minute")
+async def change_password(
+    request: Request,
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+    password_in: PasswordChange
+) -> Response:
+    """Needs the current password; cached sessions of the user are dropped on this worker."""
+    is_valid, _ = await password_hasher.verify(password_in.current_password, current_user.hashed_password)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail="Incorrect password")
+    await crud_user.update_password(db, current_user, password_in.new_password)
+    return Response(status_code=204)
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 @limiter.limit("15/minute")
-def read_user_by_id(
+async def read_user_by_id(
     request: Request,
     *,
     user_id: int,
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ) -> Any:
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -0,0 +1,126 @@
+"""
+Maintenance commands. Run from backend/ with the app's environment:
+
+    python -m app.cli export [--user-id ID] [-o snippets.ndjson]
+    python -m app.cli import snippets.ndjson --user-id ID [--batch-size N]
+    python -m app.cli compress [--train-dictionary] [--batch-size N]
+    python -m app.cli trending [--rebuild]
+
+Files are NDJSON (one snippet per line); `-` means stdin/stdout.
+`compress` migrates stored code to SNIPPET_COMPRESSION; run it with the
+setting exported, before starting the app with it (or restarting it, when
+training a new dictionary). `trending` rescales
+the trending scores (for cron, with TRENDING_REBASE_MINUTES=0), or
+recomputes them from the likes with --rebuild.
+"""
+import sys
+import asyncio
+import argparse
+from typing import AsyncIterator, BinaryIO
+from app.db.session import AsyncSessionLocal, async_engine, engine
+from app.services import bulk_service, snippet_service, trending_service
+
+CHUNK_SIZE = 1 << 16
+
+
+async def _read_chunks(source: BinaryIO) -> AsyncIterator[bytes]:
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, source.read, CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def export_command(args: argparse.Namespace) -> int:
+    target = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        async with AsyncSessionLocal() as session:
+            async for chunk in bulk_service.export_snippets(session, args.user_id):
+                target.write(chunk)
+    finally:
+        if target is not sys.stdout.buffer:
+            target.close()
+    return 0
+
+
+async def import_command(args: argparse.Namespace) -> int:
+    source = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    try:
+        async with AsyncSessionLocal() as session:
+            report = await bulk_service.import_snippets(
+                session, bulk_service.iter_lines(_read_chunks(source)), args.user_id, args.batch_size
+            )
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+
+    for error in report.errors:
+        print(f"line {error.line}: {error.error}", file=sys.stderr)
+    print(f"created {report.created}, failed {report.failed}", file=sys.stderr)
+    return 1 if report.failed else 0
+
+
+async def compress_command(args: argparse.Namespace) -> int:
+    loop = asyncio.get_running_loop()
+    rewritten = await loop.run_in_executor(
+        None, snippet_service.compress_snippets, engine, args.train_dictionary, args.batch_size
+    )
+    print(f"rewrote {rewritten} snippets", file=sys.stderr)
+    return 0
+
+
+async def trending_command(args: argparse.Namespace) -> int:
+    loop = asyncio.get_running_loop()
+    if args.rebuild:
+        scored = await loop.run_in_executor(None, trending_service.rebuild, engine)
+        print(f"scored {scored} snippets", file=sys.stderr)
+    else:
+        await loop.run_in_executor(None, trending_service.rebase, engine)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="stream snippets as NDJSON")
+    export.add_argument("--user-id", type=int, help="only this user's snippets")
+    export.add_argument("-o", "--output", default="-")
+    export.set_defaults(handler=export_command)
+
+    load = commands.add_parser("import", help="bulk-create snippets from NDJSON")
+    load.add_argument("file")
+    load.add_argument("--user-id", type=int, required=True, help="owner of the imported snippets")
+    load.add_argument("--batch-size", type=int, default=bulk_service.IMPORT_BATCH_SIZE)
+    load.set_defaults(handler=import_command)
+
+    compress = commands.add_parser("compress", help="rewrite stored code with SNIPPET_COMPRESSION")
+    compress.add_argument("--train-dictionary", action="store_true", help="train a new shared dictionary first")
+    compress.add_argument("--batch-size", type=int, default=snippet_service.COMPRESS_BATCH_SIZE)
+    compress.set_defaults(handler=compress_command)
+
+    trending = commands.add_parser("trending", help="rescale or rebuild the trending scores")
+    trending.add_argument("--rebuild", action="store_true", help="recompute every score from the likes")
+    trending.set_defaults(handler=trending_command)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.handler is not compress_command:
+        # Loads the compression dictionaries, as the app's startup does
+        snippet_service.init_snippet_storage(engine)
+
+    async def run() -> int:
+        try:
+            return await args.handler(args)
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,9 +13,89 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     ENVIRONMENT: str = "development" 
 
+    # Schema check at startup: "verify" only checks that the database is at
+    # the latest migration (run `alembic upgrade head` when deploying),
+    # "upgrade" migrates it first. Empty: "verify" in production and staging.
+    DB_SCHEMA_MODE: str = ""
+
+    # Connection pool, per engine and per worker process: a worker holds at
+    # most DB_POOL_SIZE + DB_MAX_OVERFLOW connections of each engine
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Compiled SQL cache entries, and prepared statements per asyncpg connection
+    DB_STATEMENT_CACHE_SIZE: int = 500
+
+    # Read replicas for GET requests (JSON list or comma-separated). A client
+    # that just wrote reads from the primary for REPLICA_STICKY_SECONDS; a
+    # replica that fails to connect is skipped for REPLICA_RETRY_SECONDS.
+    DATABASE_REPLICA_URLS: Union[List[str], str] = []
+    REPLICA_STICKY_SECONDS: int = 5
+    REPLICA_RETRY_SECONDS: int = 30
+
+    # bcrypt cost factor; stored hashes with another cost are upgraded on login
+    BCRYPT_ROUNDS: int = 12
+    # Worker processes for password hashing, and how many more calls may wait
+    # for one before new ones are rejected with 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_DEPTH: int = 16
+
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    TAG_CACHE_SIZE: int = 10000
+    TAG_CACHE_TTL_SECONDS: int = 3600
+    # Most used tags loaded into the tag cache when a worker starts
+    TAG_CACHE_WARM_SIZE: int = 1000
+    # Autocomplete weights (tag usage counts) are reloaded this often per worker
+    TAG_SUGGEST_REFRESH_SECONDS: int = 300
+
+    # Rate limit buckets: "mmap" (shared by the workers of one host), "memory"
+    # (per worker) or "redis" (shared across hosts, at RATELIMIT_STORAGE_URL)
+    RATELIMIT_ENABLED: bool = True
+    RATELIMIT_STORAGE: str = "mmap"
+    RATELIMIT_STORAGE_URL: str = "redis://localhost:6379/1"
+    # Defaults to a file in the temp dir named after a hash of DATABASE_URL
+    # and the slot count, one per deployment; /dev/shm keeps it off disk
+    RATELIMIT_MMAP_PATH: str = ""
+    RATELIMIT_MMAP_SLOTS: int = 65536
+
+    # Request metrics at /metrics, with a Server-Timing header on every
+    # response. Each worker adds to its own memory-mapped file in METRICS_DIR
+    # (defaults to a directory in the temp dir named after a hash of
+    # DATABASE_URL, one per deployment) and a scrape sums them all. A scrape
+    # folds the files of exited workers into one, so their counts remain.
+    METRICS_ENABLED: bool = True
+    METRICS_DIR: str = ""
+
+    # "memory", "redis" or "none". A write invalidates the memory cache of
+    # the worker that handled it only: with several workers, the others can
+    # serve the old response for up to RESPONSE_CACHE_TTL_SECONDS. Use
+    # "redis" when that window matters.
+    RESPONSE_CACHE_BACKEND: str = "memory"
+    RESPONSE_CACHE_URL: str = "redis://localhost:6379/0"
+    RESPONSE_CACHE_SIZE: int = 2048
+    RESPONSE_CACHE_TTL_SECONDS: int = 30
+
+    # Browser/CDN freshness of single-snippet responses before revalidating the ETag
+    SNIPPET_MAX_AGE_SECONDS: int = 10
+
+    # Store code_content compressed: "zlib", "zstd" (needs `zstandard`) or
+    # empty for plain text. Enabling it on an existing database requires
+    # `python -m app.cli compress`; switching between codecs does not.
+    SNIPPET_COMPRESSION: str = ""
+
+    # Trending feed: a like counts half as much every TRENDING_HALF_LIFE_HOURS.
+    # Scores are rescaled every TRENDING_REBASE_MINUTES by each worker's
+    # background task (0 disables it; use `python -m app.cli trending` from cron).
+    TRENDING_HALF_LIFE_HOURS: float = 24
+    TRENDING_REBASE_MINUTES: float = 60
+
     BACKEND_CORS_ORIGINS: Union[List[str], str] = []
 
-    @field_validator("BACKEND_CORS_ORIGINS", mode="before")
+    @field_validator("BACKEND_CORS_ORIGINS", "DATABASE_REPLICA_URLS", mode="before")
     @classmethod
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> List[str]:
         if isinstance(v, list): return v
@@ -30,6 +110,12 @@ class Settings(BaseSettings):
     def COOKIE_SECURE(self) -> bool:
         return self.ENVIRONMENT.lower() in ["production", "staging"]
 
+    @property
+    def SCHEMA_MODE(self) -> str:
+        if self.DB_SCHEMA_MODE:
+            return self.DB_SCHEMA_MODE.lower()
+        return "verify" if self.ENVIRONMENT.lower() in ["production", "staging"] else "upgrade"
+
     @property
     def COOKIE_SAMESITE(self) -> str:
         if self.COOKIE_SECURE:
@@ -0,0 +1,24 @@
+import hashlib
+from typing import Optional
+from fastapi import Response
+from app.core.config import settings
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the values that determine a representation."""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def cache_headers(etag: str) -> dict:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.SNIPPET_MAX_AGE_SECONDS}, must-revalidate",
+    }
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
@@ -1,4 +1,285 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import os
+import math
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import inspect
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from functools import wraps
+from typing import Callable, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from app.core.config import settings
+from app.core.cache import LRUCache
+from app.core.principal_cache import principal_cache
 
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, rate: str, retry_after: float, headers: dict):
+        super().__init__(rate)
+        self.rate = rate
+        self.retry_after = retry_after
+        self.headers = headers
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """"5/minute" -> (5, 60): a bucket of 5 tokens refilled over 60 seconds."""
+    amount, _, period = rate.partition("/")
+    return int(amount), PERIODS[period.strip().rstrip("s")]
+
+
+def take_token(tokens: float, updated: float, now: float, capacity: int, refill_rate: float) -> Tuple[bool, float]:
+    """Token bucket step: refill for the time since `updated`, then try to spend one token."""
+    tokens = min(capacity, tokens + max(now - updated, 0.0) * refill_rate)
+    if tokens >= 1:
+        return True, tokens - 1
+    return False, tokens
+
+
+# =======================
+# STORES
+# =======================
+class BucketStore(ABC):
+    """Keeps token buckets; hit() spends a token and returns (allowed, tokens left)."""
+
+    @abstractmethod
+    async def hit(self, key: str, capacity: int, refill_rate: float) -> Tuple[bool, float]:
+        ...
+
+
+class MemoryStore(BucketStore):
+    """Per-process buckets; with several workers each one limits separately."""
+
+    def __init__(self, maxsize: int = 65536):
+        self._buckets = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, capacity: int, refill_rate: float) -> Tuple[bool, float]:
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            allowed, tokens = take_token(tokens, updated, now, capacity, refill_rate)
+            self._buckets.set(key, (tokens, now))
+        return allowed, tokens
+
+
+class MmapStore(BucketStore):
+    """
+    Buckets in a shared memory-mapped file, so every worker on the host
+    draws from the same buckets. The file is a fixed table of slots
+    (key hash, tokens, updated), probed in small aligned groups; a full
+    group evicts its least recently used slot. Each group is guarded by a
+    POSIX byte-range lock (between processes) and a striped thread lock
+    (between threads of one process, which POSIX locks don't exclude).
+    """
+
+    SLOT = struct.Struct("<Qdd")
+    GROUP_SIZE = 4
+    THREAD_STRIPES = 64
+
+    def __init__(self, path: str, slots: int):
+        self.groups = max(slots // self.GROUP_SIZE, 1)
+        size = self.groups * self.GROUP_SIZE * self.SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != size:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size != size:
+                    os.ftruncate(self._fd, size)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+        self._stripes = [threading.Lock() for _ in range(self.THREAD_STRIPES)]
+
+    async def hit(self, key: str, capacity: int, refill_rate: float) -> Tuple[bool, float]:
+        # Slot 0 marks an empty slot, so key hashes are never 0
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        group = key_hash % self.groups
+        group_bytes = self.GROUP_SIZE * self.SLOT.size
+        start = group * group_bytes
+
+        with self._stripes[group % self.THREAD_STRIPES]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, group_bytes, start)
+            try:
+                now = time.time()
+                offset, tokens, updated = self._find_slot(start, key_hash, capacity, now)
+                allowed, tokens = take_token(tokens, updated, now, capacity, refill_rate)
+                self.SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, group_bytes, start)
+        return allowed, tokens
+
+    def _find_slot(self, start: int, key_hash: int, capacity: int, now: float) -> Tuple[int, float, float]:
+        """Returns the key's slot, else a free one, else the stalest one, with its bucket state."""
+        victim, victim_updated = start, math.inf
+        for offset in range(start, start + self.GROUP_SIZE * self.SLOT.size, self.SLOT.size):
+            slot_hash, tokens, updated = self.SLOT.unpack_from(self._map, offset)
+            if slot_hash == key_hash:
+                return offset, tokens, updated
+            if slot_hash == 0:
+                updated = -math.inf
+            if updated < victim_updated:
+                victim, victim_updated = offset, updated
+        return victim, capacity, now
+
+
+class RedisStore(BucketStore):
+    """
+    Buckets shared across hosts, updated atomically by a Lua script on any
+    server speaking the Redis protocol. Requires the optional `redis` package,
+    whose asyncio client keeps the round trip off the event loop.
+    """
+
+    prefix = "snipted:ratelimit:"
+    SCRIPT = """
+    local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(now - updated, 0) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RATELIMIT_STORAGE=redis requires the 'redis' package") from exc
+        self.client = redis.Redis.from_url(url)
+        self._script = self.client.register_script(self.SCRIPT)
+
+    async def hit(self, key: str, capacity: int, refill_rate: float) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(keys=[self.prefix + key], args=[capacity, refill_rate, time.time()])
+        return bool(allowed), float(tokens)
+
+
+# =======================
+# LIMITER
+# =======================
+def rate_limit_key(request: Request) -> str:
+    """The authenticated user when the token is known, otherwise the client address."""
+    principal = getattr(request.state, "principal", None)
+    if principal is None:
+        authorization = request.headers.get("authorization", "")
+        token = authorization[7:] if authorization.startswith("Bearer ") else request.cookies.get("access_token")
+        principal = principal_cache.get(token) if token else None
+    if principal is not None:
+        return f"user:{principal.id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _find_request(args, kwargs) -> Request:
+    request = kwargs.get("request")
+    if isinstance(request, Request):
+        return request
+    for arg in args:
+        if isinstance(arg, Request):
+            return arg
+    raise RuntimeError("Rate limited endpoints need a `request: Request` parameter")
+
+
+class Limiter:
+    """
+    Token-bucket limits per endpoint and client, applied with @limiter.limit("5/minute").
+    The bucket state of the request is exposed as X-RateLimit-* headers by
+    RateLimitHeadersMiddleware.
+    """
+
+    def __init__(self, store: BucketStore, key_func: Callable[[Request], str] = rate_limit_key, enabled: bool = True):
+        self.store = store
+        self.key_func = key_func
+        self.enabled = enabled
+
+    async def check(self, request: Request, scope: str, rate: str) -> None:
+        capacity, period = parse_rate(rate)
+        refill_rate = capacity / period
+        allowed, tokens = await self.store.hit(f"{scope}:{self.key_func(request)}", capacity, refill_rate)
+        headers = {
+            "X-RateLimit-Limit": str(capacity),
+            "X-RateLimit-Remaining": str(int(tokens)),
+            "X-RateLimit-Reset": str(math.ceil((capacity - tokens) / refill_rate)),
+        }
+        if not allowed:
+            retry_after = (1 - tokens) / refill_rate
+            headers["Retry-After"] = str(math.ceil(retry_after))
+            raise RateLimitExceeded(rate, retry_after, headers)
+        request.state.rate_limit_headers = headers
+
+    def limit(self, rate: str) -> Callable:
+        parse_rate(rate)
+
+        def decorator(func: Callable) -> Callable:
+            scope = f"{func.__module__}.{func.__name__}"
+            is_coroutine = inspect.iscoroutinefunction(func)
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                if self.enabled:
+                    await self.check(_find_request(args, kwargs), scope, rate)
+                if is_coroutine:
+                    return await func(*args, **kwargs)
+                # The threadpool FastAPI would have run a sync endpoint in
+                return await run_in_threadpool(func, *args, **kwargs)
+            return wrapper
+
+        return decorator
+
+
+class RateLimitHeadersMiddleware:
+    """Copies the X-RateLimit-* headers of a limited endpoint onto its response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = scope.get("state", {}).get("rate_limit_headers")
+                if headers:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (name.lower().encode(), value.encode()) for name, value in headers.items()
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def default_mmap_path(database_url: str, slots: int) -> str:
+    """
+    A bucket file in the temp dir per deployment (its database) and table
+    size, so apps sharing a host neither share buckets nor resize each
+    other's file.
+    """
+    deployment = hashlib.blake2b(f"{database_url}|{slots}".encode(), digest_size=8).hexdigest()
+    return os.path.join(tempfile.gettempdir(), f"snipted-ratelimit-{deployment}.bin")
+
+
+def build_store() -> BucketStore:
+    storage = settings.RATELIMIT_STORAGE.lower()
+    if storage == "mmap":
+        slots = settings.RATELIMIT_MMAP_SLOTS
+        path = settings.RATELIMIT_MMAP_PATH or default_mmap_path(settings.DATABASE_URL, slots)
+        return MmapStore(path, slots)
+    if storage == "redis":
+        return RedisStore(settings.RATELIMIT_STORAGE_URL)
+    return MemoryStore()
+
+
+limiter = Limiter(build_store(), enabled=settings.RATELIMIT_ENABLED)
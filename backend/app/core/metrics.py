@@ -0,0 +1,386 @@
+import os
+import mmap
+import time
+import fcntl
+import bisect
+import hashlib
+import struct
+import tempfile
+import threading
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import JSONResponse
+from app.core.config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKET_LABELS = tuple(repr(bound) for bound in LATENCY_BUCKETS) + ("+Inf",)
+# Route label of requests that matched no route, so paths can't blow up the series count
+UNMATCHED_ROUTE = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# The counts of exited workers, folded together so their files don't pile up
+EXITED_FILE = "exited.bin"
+
+# (name, type, help), in exposition order
+METRICS = [
+    ("snipted_http_requests_total", "counter", "Requests by method, route template and status."),
+    ("snipted_http_request_duration_seconds", "histogram", "Time to serve a request, by method and route template."),
+    ("snipted_db_queries_total", "counter", "SQL statements executed while serving requests."),
+    ("snipted_db_query_duration_seconds_total", "counter", "Time spent in SQL statements while serving requests."),
+    ("snipted_serialization_duration_seconds_total", "counter", "Time spent serializing response bodies."),
+    ("snipted_rate_limited_total", "counter", "Requests rejected by the rate limiter."),
+]
+
+
+# =======================
+# SHARED STORAGE
+# =======================
+class MmapCounters:
+    """
+    One process's counters in a memory-mapped file that the other workers
+    read when scraped. The file is a used-bytes header followed by
+    append-only entries (key length, key padded to 8 bytes, float64 value).
+    Only the owning process writes, so adding takes no lock shared with
+    other processes; a reader sees an entry once the header covers it, and
+    the aligned 8-byte values are never seen half written.
+    """
+
+    HEADER = struct.Struct("<Q")
+    KEY_LENGTH = struct.Struct("<I")
+    VALUE = struct.Struct("<d")
+    INITIAL_SIZE = 1 << 16
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < self.INITIAL_SIZE:
+            os.ftruncate(self._fd, self.INITIAL_SIZE)
+        self._map = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+        # A reused pid continues the counts of its file
+        self._offsets = dict(self.scan(self._map))
+        self._used = max(self.HEADER.unpack_from(self._map, 0)[0], self.HEADER.size)
+
+    @classmethod
+    def scan(cls, buffer) -> Iterator[Tuple[str, int]]:
+        """(key, value offset) of every entry in `buffer`, a counters file's contents."""
+        used = cls.HEADER.unpack_from(buffer, 0)[0]
+        position = cls.HEADER.size
+        while position < used:
+            (length,) = cls.KEY_LENGTH.unpack_from(buffer, position)
+            key_start = position + cls.KEY_LENGTH.size
+            value_offset = _align(key_start + length)
+            yield bytes(buffer[key_start:key_start + length]).decode(), value_offset
+            position = value_offset + cls.VALUE.size
+
+    @classmethod
+    def read(cls, path: str) -> Dict[str, float]:
+        # Plain reads see the writer's mapped pages: both go through the page cache
+        with open(path, "rb") as source:
+            buffer = source.read()
+        if len(buffer) < cls.HEADER.size:
+            return {}
+        return {key: cls.VALUE.unpack_from(buffer, offset)[0] for key, offset in cls.scan(buffer)}
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+    def add(self, key: str, amount: float) -> None:
+        offset = self._offsets.get(key)
+        if offset is None:
+            offset = self._append(key)
+        self.VALUE.pack_into(self._map, offset, self.VALUE.unpack_from(self._map, offset)[0] + amount)
+
+    def _append(self, key: str) -> int:
+        encoded = key.encode()
+        key_start = self._used + self.KEY_LENGTH.size
+        offset = _align(key_start + len(encoded))
+        end = offset + self.VALUE.size
+        if end > len(self._map):
+            self._map.resize(max(2 * len(self._map), end))
+        self.KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[key_start:key_start + len(encoded)] = encoded
+        self.VALUE.pack_into(self._map, offset, 0.0)
+        # Publish the entry only once it is complete
+        self.HEADER.pack_into(self._map, 0, end)
+        self._used = end
+        self._offsets[key] = offset
+        return offset
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+# =======================
+# REQUEST TIMINGS
+# =======================
+class RequestTimings:
+    """What one request spent in SQL and serialization; lives in a context variable."""
+
+    __slots__ = ("db_queries", "db_seconds", "serialization_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+
+    def server_timing(self, elapsed: float) -> str:
+        return (
+            f"app;dur={1000 * elapsed:.1f}, "
+            f'db;dur={1000 * self.db_seconds:.1f};desc="queries: {self.db_queries}", '
+            f"serialize;dur={1000 * self.serialization_seconds:.1f}"
+        )
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+# Context variables follow the statement into asyncio.to_thread and the
+# async engine's greenlets, so every engine's queries count toward their request
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None and _current_timings.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = getattr(context, "_metrics_started", None)
+    timings = _current_timings.get()
+    if started is not None and timings is not None:
+        timings.db_queries += 1
+        timings.db_seconds += time.perf_counter() - started
+
+
+def timed_serialization(func: Callable) -> Callable:
+    """Counts the calls' duration as serialization time of the current request."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current_timings.get()
+        if timings is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.serialization_seconds += time.perf_counter() - started
+    return wrapper
+
+
+class TimedJSONResponse(JSONResponse):
+    """The default response class: rendering the JSON body counts as serialization."""
+
+    render = timed_serialization(JSONResponse.render)
+
+
+# =======================
+# REGISTRY
+# =======================
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(*pairs: Tuple[str, str]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+@lru_cache(maxsize=4096)
+def _request_keys(method: str, route: str, status: int) -> tuple:
+    """The keys observe_request adds to, built once per method, route and status."""
+    labels = _labels(("method", method), ("route", route))
+    return (
+        f"snipted_http_requests_total\t{labels},{_labels(('status', str(status)))}",
+        tuple(f"snipted_http_request_duration_seconds_bucket\t{labels}\t{bucket}" for bucket in BUCKET_LABELS),
+        f"snipted_http_request_duration_seconds_sum\t{labels}",
+        f"snipted_db_queries_total\t{labels}",
+        f"snipted_db_query_duration_seconds_total\t{labels}",
+        f"snipted_serialization_duration_seconds_total\t{labels}",
+    )
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class Metrics:
+    """
+    Request metrics of every worker on the host, in Prometheus text format.
+    Each worker process adds to its own MmapCounters file in `directory`;
+    render() sums all of them, so any worker can answer a scrape. Keys are
+    "series\\tlabels" (plus "\\tle" for histogram buckets, which are stored
+    per bucket and made cumulative when rendered).
+    """
+
+    def __init__(self, directory: str, enabled: bool = True):
+        self.directory = directory
+        self.enabled = enabled
+        self._counters: Optional[MmapCounters] = None
+        self._lock = threading.Lock()
+        # A forked child (e.g. a password hashing worker) must not write to its parent's file
+        os.register_at_fork(after_in_child=self._forget_counters)
+
+    def _forget_counters(self) -> None:
+        self._counters = None
+        self._lock = threading.Lock()
+
+    def _add(self, amounts: Iterable[Tuple[str, float]]) -> None:
+        with self._lock:
+            if self._counters is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._counters = MmapCounters(os.path.join(self.directory, f"{os.getpid()}.bin"))
+            for key, amount in amounts:
+                self._counters.add(key, amount)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, timings: RequestTimings) -> None:
+        requests, buckets, duration, queries, query_duration, serialization = _request_keys(method, route, status)
+        self._add((
+            (requests, 1),
+            (buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)], 1),
+            (duration, seconds),
+            (queries, timings.db_queries),
+            (query_duration, timings.db_seconds),
+            (serialization, timings.serialization_seconds),
+        ))
+
+    def count_rate_limited(self, route: str) -> None:
+        if self.enabled:
+            self._add([(f"snipted_rate_limited_total\t{_labels(('route', route))}", 1)])
+
+    def fold_exited(self) -> None:
+        """
+        Adds the files of exited workers to EXITED_FILE and deletes them, so
+        the totals keep counting those requests (dropping them would look like
+        a counter reset) while the directory stays one file per live worker.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        exited = [
+            name for name in names
+            if name.endswith(".bin") and name[:-4].isdigit() and not _alive(int(name[:-4]))
+        ]
+        if not exited:
+            return
+        # Two scrapes folding the same file at once would count it twice
+        with open(os.path.join(self.directory, "fold.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive = MmapCounters(os.path.join(self.directory, EXITED_FILE))
+            try:
+                for name in exited:
+                    path = os.path.join(self.directory, name)
+                    try:
+                        values = MmapCounters.read(path)
+                    except FileNotFoundError:
+                        continue
+                    for key, value in values.items():
+                        archive.add(key, value)
+                    os.unlink(path)
+            finally:
+                archive.close()
+
+    def collect(self) -> Dict[str, float]:
+        """Every key summed over the files of all workers, including exited ones."""
+        totals: Dict[str, float] = {}
+        self.fold_exited()
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return totals
+        for name in names:
+            if not name.endswith(".bin"):
+                continue
+            try:
+                values = MmapCounters.read(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            for key, value in values.items():
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self) -> str:
+        series: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for key, value in self.collect().items():
+            name, labels, *bucket = key.split("\t")
+            series.setdefault(name, {}).setdefault(labels, {})[bucket[0] if bucket else ""] = value
+
+        lines: List[str] = []
+        for name, kind, description in METRICS:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            if kind == "counter":
+                for labels, values in sorted(series.get(name, {}).items()):
+                    lines.append(f"{name}{{{labels}}} {_format(values[''])}")
+                continue
+            sums = series.get(f"{name}_sum", {})
+            for labels, buckets in sorted(series.get(f"{name}_bucket", {}).items()):
+                count = 0.0
+                for bucket in BUCKET_LABELS:
+                    count += buckets.get(bucket, 0.0)
+                    lines.append(f'{name}_bucket{{{labels},le="{bucket}"}} {_format(count)}')
+                lines.append(f"{name}_sum{{{labels}}} {_format(sums.get(labels, {}).get('', 0.0))}")
+                lines.append(f"{name}_count{{{labels}}} {_format(count)}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Records every HTTP request in `metrics` and reports its timings in a Server-Timing header."""
+
+    def __init__(self, app, metrics: "Metrics"):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.enabled:
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timings.server_timing(time.perf_counter() - started).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timings.reset(token)
+            self.metrics.observe_request(
+                scope["method"], route_label(scope), status, time.perf_counter() - started, timings
+            )
+
+
+def default_metrics_dir(database_url: str) -> str:
+    """A directory in the temp dir per deployment (its database), so apps sharing a host don't add up."""
+    deployment = hashlib.blake2b(database_url.encode(), digest_size=8).hexdigest()
+    return os.path.join(tempfile.gettempdir(), f"snipted-metrics-{deployment}")
+
+
+metrics = Metrics(
+    settings.METRICS_DIR or default_metrics_dir(settings.DATABASE_URL),
+    enabled=settings.METRICS_ENABLED,
+)
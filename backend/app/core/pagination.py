@@ -0,0 +1,60 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor pointing just after the row (created_at, id)."""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def keyset_order(model) -> list:
+    """Newest first, with the id as tie-breaker so the order is total."""
+    return [model.created_at.desc(), model.id.desc()]
+
+
+def keyset_filter(model, cursor: str):
+    """
+    Rows strictly after the cursor in keyset order. The row-value comparison
+    lets the (created_at, id) index seek straight to the page start.
+    """
+    created_at, row_id = decode_cursor(cursor)
+    return tuple_(model.created_at, model.id) < tuple_(created_at, row_id)
+
+
+def keyset_page(statement, model, cursor: Optional[str], limit: int):
+    """
+    Restricts a select() to one keyset page, fetching one extra row so
+    page_with_cursor() can tell whether another page follows.
+    Raises InvalidCursor for a malformed cursor.
+    """
+    if cursor:
+        statement = statement.where(keyset_filter(model, cursor))
+    return statement.order_by(*keyset_order(model)).limit(limit + 1)
+
+
+def page_with_cursor(rows: Sequence, limit: int) -> Tuple[List, Optional[str]]:
+    """Trims a limit+1 fetch to the page and derives the next cursor from its last row."""
+    if len(rows) <= limit:
+        return list(rows), None
+    last = rows[limit - 1]
+    return list(rows[:limit]), encode_cursor(last.created_at, last.id)
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Optional, Tuple
+from app.core.config import settings
+from app.core.security import get_password_hash, probe_password_backend, verify_and_update_password
+
+
+class PasswordHasherBusy(Exception):
+    """Every hashing worker is busy and the wait queue is full."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a small pool of worker processes, so a burst of logins
+    neither holds the GIL nor occupies the request threadpool.
+    At most `workers + queue_depth` calls are admitted at a time; further
+    calls fail immediately with PasswordHasherBusy instead of queueing.
+    """
+
+    def __init__(self, workers: int, queue_depth: int, executor_factory: Optional[Callable[[int], Executor]] = None):
+        self.workers = workers
+        self.capacity = workers + queue_depth
+        self.rejected = 0
+        self._executor_factory = executor_factory or (lambda n: ProcessPoolExecutor(max_workers=n))
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._executor_factory(self.workers)
+            return self._executor
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Returns whether the password matches and, if its cost is outdated, a new hash to store."""
+        return await self._submit(verify_and_update_password, password, hashed_password)
+
+    async def warm_up(self) -> str:
+        """
+        Starts every worker and loads the bcrypt backend in each, so the
+        first logins pay for neither. Returns the backend's name.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        backends = await asyncio.gather(
+            *(loop.run_in_executor(executor, probe_password_backend) for _ in range(self.workers))
+        )
+        return backends[0]
+
+    def shutdown(self) -> None:
+        """Stops the workers; the pool is started again on the next call."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "in_flight": self._in_flight, "capacity": self.capacity, "rejected": self.rejected}
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_DEPTH)
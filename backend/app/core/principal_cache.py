@@ -0,0 +1,62 @@
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class Principal:
+    """What most endpoints need to know about the caller, without a users row."""
+    id: int
+    username: str
+    is_active: bool
+
+
+class PrincipalCache:
+    """
+    Verified access token -> Principal, bounded in size and time.
+    Entries never outlive the token's own `exp`. invalidate_user() bumps a
+    per-user epoch so every cached token of that user is ignored at once;
+    other workers drop theirs when the (short) TTL runs out.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._epochs: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        entry = self._cache.get(token)
+        if entry is None:
+            return None
+        principal, epoch = entry
+        if self._epochs.get(principal.id, 0) != epoch:
+            self._cache.pop(token)
+            return None
+        return principal
+
+    def put(self, token: str, principal: Principal, expires_at: Optional[float] = None) -> None:
+        ttl = self._cache.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+            if ttl <= 0:
+                return
+        self._cache.set(token, (principal, self._epochs.get(principal.id, 0)), ttl=ttl)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._epochs[user_id] = self._epochs.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,253 @@
+import json
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlencode
+from fastapi import Response
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_HEADER = "X-Cache"
+# Every list response (feed, search) carries this tag; a new snippet can
+# appear in any of them, so creates drop them all.
+LISTS_TAG = "lists"
+# The trending list; any like can reorder it
+TRENDING_TAG = "trending"
+
+
+def snippet_tag(snippet_id: int) -> str:
+    return f"snippet:{snippet_id}"
+
+
+# =======================
+# BACKENDS
+# =======================
+class CacheBackend(ABC):
+    """Stores opaque bytes under a key, grouped by tags for invalidation."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str]) -> None:
+        ...
+
+    @abstractmethod
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Per-process LRU. Evicted or invalidated keys are removed from the tag index too.
+    Invalidations reach only this process, so other workers keep stale
+    entries until their TTL runs out.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[bytes, float, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._drop(key)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisBackend(CacheBackend):
+    """
+    Shared across workers and hosts. Works with any server speaking the
+    Redis protocol (Redis, Valkey, KeyDB...), including a local one for
+    development. Requires the optional `redis` package; calls go through
+    its asyncio client, so a slow server never blocks the event loop.
+    """
+
+    prefix = "snipted:cache:"
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self.client = redis.Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str]) -> None:
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, value, ex=ttl)
+        for tag in tags:
+            pipe.sadd(self.prefix + "tag:" + tag, self.prefix + key)
+            pipe.expire(self.prefix + "tag:" + tag, ttl)
+        await pipe.execute()
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            tag_key = self.prefix + "tag:" + tag
+            keys = await self.client.smembers(tag_key)
+            await self.client.delete(tag_key, *keys)
+
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+
+# =======================
+# RESPONSE CACHE
+# =======================
+class ResponseCache:
+    """
+    Pre-serialized JSON responses keyed by normalized request parameters.
+    Entries are tagged with the snippets they contain and invalidated by
+    write events after commit; the TTL bounds how long a response rendered
+    concurrently with a write can outlive it.
+    Backend errors are logged and treated as misses.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def make_key(namespace: str, **params) -> str:
+        items = sorted((name, value) for name, value in params.items() if value not in (None, ""))
+        return f"{namespace}?{urlencode(items)}"
+
+    async def get(self, key: str) -> Optional[Response]:
+        if not self.enabled:
+            return None
+        try:
+            packed = await self.backend.get(key)
+        except Exception:
+            logger.exception("Response cache read failed")
+            packed = None
+        if packed is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        raw_headers, body = packed.split(b"\n", 1)
+        headers = json.loads(raw_headers)
+        headers[CACHE_HEADER] = "HIT"
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def store(
+        self,
+        key: str,
+        body: bytes,
+        tags: Iterable[str],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        """Caches `body` and returns it as the (MISS) response."""
+        headers = dict(headers or {})
+        if self.enabled:
+            packed = json.dumps(headers).encode() + b"\n" + body
+            try:
+                await self.backend.set(key, packed, self.ttl, tags)
+            except Exception:
+                logger.exception("Response cache write failed")
+        headers[CACHE_HEADER] = "MISS"
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, *tags: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            await self.backend.invalidate_tags(tags)
+        except Exception:
+            logger.exception("Response cache invalidation failed")
+
+    # Write events
+    async def snippet_created(self) -> None:
+        await self.invalidate(LISTS_TAG)
+
+    async def snippet_updated(self, snippet_id: int) -> None:
+        # Edits can move the snippet into lists it wasn't in (new tags, new text)
+        await self.invalidate(snippet_tag(snippet_id), LISTS_TAG)
+
+    async def snippet_deleted(self, snippet_id: int) -> None:
+        # Pages after the snippet's shift up a place, so lists go too, as on create
+        await self.invalidate(snippet_tag(snippet_id), LISTS_TAG)
+
+    async def snippet_liked(self, snippet_id: int) -> None:
+        await self.invalidate(snippet_tag(snippet_id), TRENDING_TAG)
+
+    async def clear(self) -> None:
+        if self.enabled:
+            await self.backend.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def build_backend() -> Optional[CacheBackend]:
+    backend = settings.RESPONSE_CACHE_BACKEND.lower()
+    if backend == "memory":
+        return MemoryBackend(maxsize=settings.RESPONSE_CACHE_SIZE)
+    if backend == "redis":
+        return RedisBackend(settings.RESPONSE_CACHE_URL)
+    return None
+
+
+response_cache = ResponseCache(build_backend(), ttl=settings.RESPONSE_CACHE_TTL_SECONDS)
@@ -1,10 +1,27 @@
-from jose import jwt
+from functools import lru_cache
+from typing import Optional, Tuple
 from app.core.config import settings
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 
+# jose and passlib are imported on first use: workers start without them,
+# and bcrypt only ever runs in the password hashing processes.
 ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class InvalidToken(Exception):
+    """The token is malformed, expired or not signed with SECRET_KEY."""
+
+@lru_cache(maxsize=None)
+def password_context():
+    """
+    Hashes with a different cost than BCRYPT_ROUNDS are reported by
+    verify_and_update() and rehashed on the next successful login.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+def probe_password_backend() -> str:
+    """Loads the bcrypt backend (passlib self-tests it on load) and returns its name."""
+    return password_context().handler("bcrypt").get_backend()
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """Generates the JWT string"""
@@ -19,6 +36,7 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     
     to_encode.update({"exp": expire})
     
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -26,12 +44,25 @@ def create_refresh_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "refresh": True}) 
+    from jose import jwt
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
 
+def decode_token(token: str) -> dict:
+    """Returns the verified claims of a token issued by create_access_token or create_refresh_token"""
+    from jose import JWTError, jwt
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as exc:
+        raise InvalidToken() from exc
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Checks if the password matches the hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hashes a password before saving to DB"""
-    return pwd_context.hash(password)
\ No newline at end of file
+    return password_context().hash(password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Checks the password and returns a replacement hash when the stored cost is outdated"""
+    return password_context().verify_and_update(plain_password, hashed_password)
\ No newline at end of file
@@ -0,0 +1,112 @@
+import time
+import bisect
+import heapq
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Suggestions are ranked by usage, then name
+Suggestion = Tuple[str, int]
+
+
+def _rank(entry: Suggestion) -> Tuple[int, str]:
+    return -entry[1], entry[0]
+
+
+class TagIndex:
+    """
+    In-process prefix index of tag names weighted by usage, for autocomplete.
+    Names are kept sorted, so a prefix is one contiguous range found by
+    bisection. Ranges of up to SCAN_LIMIT names are ranked on the fly; every
+    prefix with a longer range has its top suggestions computed at load time
+    (merged up from the prefixes one character longer), so no lookup ranks
+    more than SCAN_LIMIT names. Weights are the counts at the last load and
+    are refreshed every `refresh_seconds`; tags created in between are added
+    as they are committed, with no usage yet.
+    """
+
+    SCAN_LIMIT = 32
+    MAX_SUGGESTIONS = 20
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        # (sorted names, name -> count, prefix -> ranked top), swapped as a whole on load
+        self._snapshot: Tuple[List[str], Dict[str, int], Dict[str, List[Suggestion]]] = ([], {}, {})
+        self._write_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+
+    def load(self, rows: Iterable[Suggestion]) -> None:
+        counts = dict(rows)
+        names = sorted(counts)
+        top: Dict[str, List[Suggestion]] = {}
+        self._rank_range(names, counts, top, 0, len(names), 0)
+        with self._write_lock:
+            self._snapshot = (names, counts, top)
+            self.loaded_at = time.monotonic()
+
+    def _rank_range(
+        self, names: List[str], counts: Dict[str, int], top: Dict[str, List[Suggestion]], lo: int, hi: int, depth: int,
+    ) -> List[Suggestion]:
+        """Top suggestions of names[lo:hi], which share their first `depth` characters."""
+        if hi - lo <= self.SCAN_LIMIT:
+            return heapq.nsmallest(self.MAX_SUGGESTIONS, ((name, counts[name]) for name in names[lo:hi]), key=_rank)
+        prefix = names[lo][:depth]
+        entries: List[Suggestion] = []
+        start = lo
+        # The prefix itself sorts first, then one child range per next character
+        while start < hi and len(names[start]) == depth:
+            entries.append((names[start], counts[names[start]]))
+            start += 1
+        while start < hi:
+            end = bisect.bisect_left(names, names[start][:depth + 1] + "\U0010ffff", start, hi)
+            entries.extend(self._rank_range(names, counts, top, start, end, depth + 1))
+            start = end
+        top[prefix] = heapq.nsmallest(self.MAX_SUGGESTIONS, entries, key=_rank)
+        return top[prefix]
+
+    def due(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= self.refresh_seconds
+
+    def refresh(self, loader: Callable[[], Iterable[Suggestion]]) -> None:
+        """
+        Loads the index when it is due. The first load blocks every caller;
+        later ones run in one thread while the others keep the current index.
+        """
+        if not self.due() or not self._load_lock.acquire(blocking=self.loaded_at is None):
+            return
+        try:
+            if self.due():
+                self.load(loader())
+        finally:
+            self._load_lock.release()
+
+    def add(self, names: Iterable[str]) -> None:
+        """Inserts new tag names with no usage; names already indexed are left alone."""
+        with self._write_lock:
+            sorted_names, counts, top = self._snapshot
+            for name in names:
+                if name in counts:
+                    continue
+                counts[name] = 0
+                bisect.insort(sorted_names, name)
+                for length in range(len(name) + 1):
+                    entries = top.get(name[:length])
+                    if entries is None:
+                        # Shorter prefixes have the longer ranges; the rest are scanned
+                        break
+                    if len(entries) < self.MAX_SUGGESTIONS:
+                        # Copy on write: readers may be iterating the current list
+                        top[name[:length]] = sorted(entries + [(name, 0)], key=_rank)
+
+    def suggest(self, prefix: str, limit: int) -> List[Suggestion]:
+        names, counts, top = self._snapshot
+        if prefix in top:
+            return top[prefix][:limit]
+        start = bisect.bisect_left(names, prefix)
+        end = bisect.bisect_left(names, prefix + "\U0010ffff", start)
+        return heapq.nsmallest(
+            limit, ((name, counts.get(name, 0)) for name in names[start:end]), key=_rank
+        )
+
+    def __len__(self) -> int:
+        return len(self._snapshot[0])
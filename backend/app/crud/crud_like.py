@@ -0,0 +1,58 @@
+from typing import Tuple
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.utils import insert_ignore
+from app.core.response_cache import response_cache
+from app.services import trending_service
+from app.models.models import Snippet, SnippetLike, User, utc_now
+
+async def toggle_like(session: AsyncSession, user_id: int, snippet_id: int, owner_id: int) -> Tuple[bool, int]:
+    """
+    Like the snippet, or unlike it if the user already did.
+    The like row is inserted (or deleted) in one conditional statement and
+    both counters, and the trending score, move with SQL-side arithmetic in
+    the same transaction, so concurrent toggles never lose an update.
+    Returns (is_liked, like_count).
+    """
+    now = utc_now()
+    # Held until the commit: a rebase in between would rescale the scores but not this weight
+    epoch = await trending_service.lock_epoch(session)
+    inserted = await session.execute(
+        insert_ignore(session, SnippetLike).values(user_id=user_id, snippet_id=snippet_id, liked_at=now)
+    )
+    if inserted.rowcount == 1:
+        is_liked, delta = True, 1
+        trending = trending_service.add_like(trending_service.like_weight(now.timestamp(), epoch))
+    else:
+        deleted = (await session.execute(
+            delete(SnippetLike)
+            .where(SnippetLike.user_id == user_id, SnippetLike.snippet_id == snippet_id)
+            .returning(SnippetLike.liked_at)
+        )).scalars().all()
+        is_liked, delta = False, -len(deleted)
+        trending = {}
+        if deleted:
+            weight = trending_service.like_weight(trending_service.timestamp(deleted[0]), epoch)
+            trending = trending_service.remove_like(weight)
+
+    like_count = (await session.execute(
+        update(Snippet)
+        .where(Snippet.id == snippet_id)
+        .values(like_count=Snippet.like_count + delta, **trending)
+        .returning(Snippet.like_count)
+    )).scalar_one()
+
+    if delta > 0:
+        await session.execute(
+            update(User).where(User.id == owner_id).values(reputation_stars=User.reputation_stars + 1)
+        )
+    elif delta < 0:
+        await session.execute(
+            update(User)
+            .where(User.id == owner_id, User.reputation_stars > 0)
+            .values(reputation_stars=User.reputation_stars - 1)
+        )
+
+    await session.commit()
+    await response_cache.snippet_liked(snippet_id)
+    return is_liked, like_count
@@ -1,32 +1,54 @@
-from typing import List, Optional
-from sqlmodel import Session, select
+from typing import List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.pagination import keyset_page, page_with_cursor
 from app.schemas.schemas import SnippetUpdate
-from app.models.models import Snippet, Tag, utc_now
+from app.services import snippet_service
+from app.crud import crud_tag
+from app.core.response_cache import response_cache
+from app.models.models import Snippet, SnippetTagLink, utc_now
 
-def get_snippet(session: Session, snippet_id: int) -> Optional[Snippet]:
-    """Get a single snippet by ID."""
-    return session.get(Snippet, snippet_id)
+async def get_snippet(session: AsyncSession, snippet_id: int) -> Optional[Snippet]:
+    """
+    Get a single snippet by ID, with its tags loaded.
+    Always re-reads the row, so it also refreshes a snippet already in the session.
+    """
+    statement = (
+        select(Snippet)
+        .options(selectinload(Snippet.tags))
+        .where(Snippet.id == snippet_id)
+        .execution_options(populate_existing=True)
+    )
+    return (await session.execute(statement)).scalars().first()
 
-def get_multi_snippets(
-    session: Session, 
-    skip: int = 0, 
+async def get_multi_snippets(
+    session: AsyncSession, 
+    cursor: Optional[str] = None, 
     limit: int = 100,
     tag_filter: Optional[str] = None
-) -> List[Snippet]:
+) -> Tuple[List[Snippet], Optional[str]]:
     """
-    Get a list of snippets, optionally filtering by a Tag name.
+    Get a keyset page of snippets (newest first), optionally filtering by a Tag name.
+    Returns the page and the cursor of the next one (None on the last page).
+    Raises InvalidCursor for a malformed cursor.
     """
-    statement = select(Snippet)
+    statement = select(Snippet).options(selectinload(Snippet.tags))
     
     if tag_filter:
-        # Join with Tags table to filter efficiently
-        statement = statement.join(Snippet.tags).where(Tag.name == tag_filter)
-        
-    statement = statement.offset(skip).limit(limit).order_by(Snippet.created_at.desc())
-    return session.exec(statement).all()
+        # Filter on the link table directly, with the tag id from the tag cache
+        tag_id = await crud_tag.get_tag_id(session, tag_filter)
+        if tag_id is None:
+            return [], None
+        statement = statement.join(SnippetTagLink, SnippetTagLink.snippet_id == Snippet.id).where(
+            SnippetTagLink.tag_id == tag_id
+        )
+
+    statement = keyset_page(statement, Snippet, cursor, limit)
+    return page_with_cursor((await session.execute(statement)).scalars().all(), limit)
 
-def update_snippet(
-    session: Session, 
+async def update_snippet(
+    session: AsyncSession, 
     db_snippet: Snippet, 
     snippet_in: SnippetUpdate
 ) -> Snippet:
@@ -43,12 +65,19 @@ def update_snippet(
     db_snippet.updated_at = utc_now()
     
     session.add(db_snippet)
-    session.commit()
-    session.refresh(db_snippet)
-    return db_snippet
+    if "title" in update_data or "code_content" in update_data:
+        await session.flush()
+        await session.run_sync(snippet_service.index_snippet, db_snippet)
+    await session.commit()
+    await response_cache.snippet_updated(db_snippet.id)
+    return await get_snippet(session, db_snippet.id)
 
-def delete_snippet(session: Session, db_snippet: Snippet) -> Snippet:
+async def delete_snippet(session: AsyncSession, db_snippet: Snippet) -> Snippet:
     """Delete a snippet."""
-    session.delete(db_snippet)
-    session.commit()
-    return db_snippet
\ No newline at end of file
+    snippet_id = db_snippet.id
+    await session.run_sync(snippet_service.unindex_snippet, snippet_id)
+    await crud_tag.unlink_tags(session, snippet_id)
+    await session.delete(db_snippet)
+    await session.commit()
+    await response_cache.snippet_deleted(snippet_id)
+    return db_snippet
@@ -1,16 +1,182 @@
-from typing import Optional
-from app.models.models import Tag
-from sqlmodel import Session, select
-
-def get_tag_by_name(session: Session, name: str) -> Optional[Tag]:
-    """Find a tag strictly by name (exact match)."""
-    statement = select(Tag).where(Tag.name == name)
-    return session.exec(statement).first()
-
-def create_tag(session: Session, name: str) -> Tag:
-    """Create a new tag."""
-    tag = Tag(name=name)
-    session.add(tag)
-    session.commit()
-    session.refresh(tag)
-    return tag
\ No newline at end of file
+from enum import Enum
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, event, exists, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.tag_index import TagIndex
+from app.db.utils import insert_ignore, insert_or_increment
+from app.models.models import Snippet, SnippetTagLink, Tag, TagStat
+
+# name -> id. Tags are never renamed or deleted, so an entry can only be
+# missing, never wrong; every worker falls back to the DB on a miss.
+tag_cache = LRUCache(maxsize=settings.TAG_CACHE_SIZE, ttl=settings.TAG_CACHE_TTL_SECONDS)
+# Every tag name with its usage, for autocomplete; see refresh_tag_index
+tag_index = TagIndex(refresh_seconds=settings.TAG_SUGGEST_REFRESH_SECONDS)
+
+PENDING_TAG_IDS = "pending_tag_ids"
+
+
+class TagMatch(str, Enum):
+    all = "all"
+    any = "any"
+
+
+def normalize_tag(name: str) -> str:
+    return name.strip().lower()
+
+async def get_tag_id(session: AsyncSession, name: str) -> Optional[int]:
+    """Cached id lookup for read paths (e.g. the ?tag= feed filter)."""
+    tag_id = tag_cache.get(name)
+    if tag_id is None:
+        tag_id = (await session.execute(select(Tag.id).where(Tag.name == name))).scalar()
+        if tag_id is not None:
+            tag_cache.set(name, tag_id)
+    return tag_id
+
+async def _fetch_tag_ids(session: AsyncSession, names: List[str]) -> Dict[str, int]:
+    rows = await session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names)))
+    return {name: tag_id for name, tag_id in rows}
+
+async def resolve_tag_ids(session: AsyncSession, names: Iterable[str]) -> List[int]:
+    """
+    Bulk get-or-create, returning tag ids.
+    Normalizes and dedupes `names` (keeping their order) and serves what it
+    can from the tag cache. The rest are fetched with one IN query, and
+    missing tags are inserted with a single INSERT ... ON CONFLICT DO NOTHING,
+    so concurrent writers creating the same tag don't fail on the unique index.
+    Does not commit: ids resolved from the DB only reach the cache once the
+    caller's transaction commits, so a rollback can't leave a dangling id.
+    """
+    normalized = list(dict.fromkeys(n for n in (normalize_tag(name) for name in names) if n))
+    if not normalized:
+        return []
+
+    tag_ids: Dict[str, int] = {}
+    for name in normalized:
+        tag_id = tag_cache.get(name)
+        if tag_id is not None:
+            tag_ids[name] = tag_id
+
+    missing = [name for name in normalized if name not in tag_ids]
+    if missing:
+        found = await _fetch_tag_ids(session, missing)
+        to_create = [name for name in missing if name not in found]
+        if to_create:
+            await session.execute(insert_ignore(session, Tag).values([{"name": name} for name in to_create]))
+            found.update(await _fetch_tag_ids(session, to_create))
+        session.info.setdefault(PENDING_TAG_IDS, {}).update(found)
+        tag_ids.update(found)
+
+    return [tag_ids[name] for name in normalized]
+
+async def count_links(session: AsyncSession, deltas: Dict[int, int]) -> None:
+    """Applies per-tag link count changes to tag_stats in one statement."""
+    rows = [{"tag_id": tag_id, "snippet_count": delta} for tag_id, delta in deltas.items() if delta]
+    if rows:
+        await session.run_sync(
+            lambda sync_session: insert_or_increment(sync_session.connection(), TagStat, "tag_id", "snippet_count", rows)
+        )
+
+async def link_tags(session: AsyncSession, snippet_id: int, tag_ids: List[int], replace: bool = False) -> None:
+    """
+    Writes the snippet's tag links directly, optionally replacing the current
+    ones, and moves the tag counts by the difference.
+    """
+    deltas = Counter(tag_ids)
+    if replace:
+        deltas.subtract(await unlink_tags(session, snippet_id, count=False))
+    if tag_ids:
+        await session.execute(
+            insert(SnippetTagLink),
+            [{"snippet_id": snippet_id, "tag_id": tag_id} for tag_id in tag_ids]
+        )
+    await count_links(session, deltas)
+
+async def unlink_tags(session: AsyncSession, snippet_id: int, count: bool = True) -> List[int]:
+    """Deletes the snippet's tag links (before the snippet itself), returning their tag ids."""
+    result = await session.execute(
+        delete(SnippetTagLink).where(SnippetTagLink.snippet_id == snippet_id).returning(SnippetTagLink.tag_id)
+    )
+    tag_ids = result.scalars().all()
+    if count:
+        await count_links(session, {tag_id: -1 for tag_id in tag_ids})
+    return tag_ids
+
+async def get_top_tags(session: AsyncSession, limit: int) -> List[Tuple[str, int]]:
+    """(name, snippet count) of the most used tags, read from the tag_stats index."""
+    rows = await session.execute(
+        select(Tag.name, TagStat.snippet_count)
+        .join(Tag, Tag.id == TagStat.tag_id)
+        .where(TagStat.snippet_count > 0)
+        .order_by(TagStat.snippet_count.desc(), TagStat.tag_id.desc())
+        .limit(limit)
+    )
+    return [(name, snippet_count) for name, snippet_count in rows]
+
+async def tag_filter(session: AsyncSession, names: List[str], match: TagMatch) -> Optional[list]:
+    """
+    WHERE clauses keeping the snippets tagged with all (or any) of the
+    normalized `names`, or None when no snippet can match. For `all` the
+    posting lists are intersected smallest first: the rarest tag's links
+    drive the query and every other tag is one primary key probe per
+    candidate, so the cost follows the rarest tag, not the most common one.
+    """
+    tag_ids = [tag_id for tag_id in [await get_tag_id(session, name) for name in names] if tag_id is not None]
+    if match == TagMatch.any:
+        if not tag_ids:
+            return None
+        return [Snippet.id.in_(select(SnippetTagLink.snippet_id).where(SnippetTagLink.tag_id.in_(tag_ids)))]
+
+    if len(tag_ids) < len(names):
+        return None
+    rows = await session.execute(select(TagStat.tag_id, TagStat.snippet_count).where(TagStat.tag_id.in_(tag_ids)))
+    counts = dict(rows.all())
+    rarest, *others = sorted(tag_ids, key=lambda tag_id: counts.get(tag_id, 0))
+    if not counts.get(rarest):
+        return None
+    return [
+        Snippet.id.in_(select(SnippetTagLink.snippet_id).where(SnippetTagLink.tag_id == rarest)),
+        *(
+            exists().where(SnippetTagLink.snippet_id == Snippet.id, SnippetTagLink.tag_id == tag_id)
+            for tag_id in others
+        ),
+    ]
+
+async def warm_tag_cache(session: AsyncSession, limit: int) -> int:
+    """Loads the `limit` most used tags into tag_cache; returns how many were loaded."""
+    rows = (await session.execute(
+        select(Tag.name, Tag.id)
+        .join(TagStat, TagStat.tag_id == Tag.id)
+        .order_by(TagStat.snippet_count.desc(), TagStat.tag_id.desc())
+        .limit(limit)
+    )).all()
+    # Least used first, so the most used are the last to be evicted
+    tag_cache.update(dict(reversed(rows)))
+    return len(rows)
+
+def refresh_tag_index(engine: Engine) -> None:
+    """Loads tag_index from tags and tag_stats when it is due. Sync: run it off the event loop."""
+    def rows():
+        with engine.connect() as connection:
+            return connection.execute(
+                select(Tag.name, func.coalesce(TagStat.snippet_count, 0))
+                .outerjoin(TagStat, TagStat.tag_id == Tag.id)
+            ).all()
+    tag_index.refresh(rows)
+
+@event.listens_for(Session, "after_commit")
+def _promote_pending_tag_ids(session: Session) -> None:
+    pending = session.info.pop(PENDING_TAG_IDS, None)
+    if pending:
+        tag_cache.update(pending)
+        # Includes tags other writers created meanwhile; add() skips known names
+        if tag_index.loaded_at is not None:
+            tag_index.add(pending)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_tag_ids(session: Session, previous_transaction) -> None:
+    session.info.pop(PENDING_TAG_IDS, None)
@@ -1,26 +1,45 @@
 from typing import Optional
 from app.models.models import User
-from sqlmodel import Session, select
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.schemas import UserCreate
-from app.core.security import get_password_hash
+from app.core.password_hasher import password_hasher
+from app.core.principal_cache import principal_cache
 
-def get_user_by_email(session: Session, email: str) -> Optional[User]:
+async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]:
     statement = select(User).where(User.email == email)
-    return session.exec(statement).first()
+    return (await session.execute(statement)).scalars().first()
 
-def get_user_by_id(session: Session, user_id: int) -> Optional[User]:
-    return session.get(User, user_id)
+async def get_user_by_id(session: AsyncSession, user_id: int) -> Optional[User]:
+    return await session.get(User, user_id)
 
-def create_user(session: Session, user_create: UserCreate) -> User:
+async def create_user(session: AsyncSession, user_create: UserCreate) -> User:
     user_data = user_create.model_dump(exclude={"password"})
     
     db_user = User(
         **user_data, 
-        hashed_password=get_password_hash(user_create.password)
+        hashed_password=await password_hasher.hash(user_create.password)
     )
     
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
     
-    return db_user
\ No newline at end of file
+    return db_user
+
+async def set_user_active(session: AsyncSession, db_user: User, is_active: bool) -> User:
+    """Activate or deactivate a user; cached sessions of the user stop working."""
+    db_user.is_active = is_active
+    session.add(db_user)
+    await session.commit()
+    await session.refresh(db_user)
+    principal_cache.invalidate_user(db_user.id)
+    return db_user
+
+async def update_password(session: AsyncSession, db_user: User, password: str) -> User:
+    db_user.hashed_password = await password_hasher.hash(password)
+    session.add(db_user)
+    await session.commit()
+    await session.refresh(db_user)
+    principal_cache.invalidate_user(db_user.id)
+    return db_user
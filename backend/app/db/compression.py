@@ -0,0 +1,182 @@
+import zlib
+import struct
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple, Union
+from sqlalchemy import LargeBinary, text
+from sqlalchemy.types import TypeDecorator
+from sqlmodel.sql.sqltypes import AutoString
+from app.core.config import settings
+
+# Stored layout: 1 codec byte, 4-byte big-endian dictionary id (0 = none), payload
+HEADER = struct.Struct(">BI")
+PLAIN, ZLIB, ZSTD = 0, 1, 2
+CODECS = {"zlib": ZLIB, "zstd": ZSTD}
+# Shorter bodies don't shrink enough to pay for the header and the CPU
+MIN_COMPRESS_BYTES = 128
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+DICTIONARY_BYTES = 16 * 1024
+# Undictionaried streams are valid HTTP content-codings as stored
+HTTP_ENCODINGS = {ZLIB: "deflate", ZSTD: "zstd"}
+
+
+def enabled() -> bool:
+    return bool(settings.SNIPPET_COMPRESSION)
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise RuntimeError("SNIPPET_COMPRESSION=zstd requires the 'zstandard' package") from exc
+    return zstandard
+
+
+# =======================
+# DICTIONARIES
+# =======================
+class DictionaryRegistry:
+    """
+    Shared compression dictionaries by id. Rows keep the id they were
+    written with, so dictionaries are never changed or deleted. All of them
+    are loaded before use (at startup, in the CLI, when one is trained):
+    values are decompressed inside the event loop, where a lookup can't
+    block on the database, so an unknown id is an error.
+    """
+
+    def __init__(self):
+        self._dictionaries: Dict[int, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+        self.current_id = 0
+
+    def load_all(self, connection) -> None:
+        rows = connection.execute(text("SELECT id, codec, data FROM compression_dictionaries ORDER BY id")).all()
+        with self._lock:
+            for dictionary_id, codec, data in rows:
+                self._dictionaries[dictionary_id] = (codec, bytes(data))
+                if codec == settings.SNIPPET_COMPRESSION:
+                    self.current_id = dictionary_id
+
+    def get(self, dictionary_id: int) -> bytes:
+        entry = self._dictionaries.get(dictionary_id)
+        if entry is None:
+            raise RuntimeError(
+                f"Unknown compression dictionary {dictionary_id}: restart the app after training a dictionary"
+            )
+        return entry[1]
+
+    def add(self, dictionary_id: int, codec: str, data: bytes) -> None:
+        with self._lock:
+            self._dictionaries[dictionary_id] = (codec, data)
+            if codec == settings.SNIPPET_COMPRESSION:
+                self.current_id = dictionary_id
+
+
+dictionaries = DictionaryRegistry()
+
+
+def train_dictionary(codec: str, samples: Iterable[str]) -> bytes:
+    """
+    Builds a shared dictionary from sample bodies. zstd trains its own;
+    for zlib the most repeated lines are packed, most frequent last since
+    zlib reaches the end of its preset dictionary most cheaply.
+    """
+    samples = [sample.encode("utf-8") for sample in samples]
+    if codec == "zstd":
+        return _zstd().train_dictionary(DICTIONARY_BYTES, samples).as_bytes()
+
+    counts = Counter(line for sample in samples for line in sample.splitlines(keepends=True) if line.strip())
+    packed, size = [], 0
+    for line, count in counts.most_common():
+        if count < 2 or size + len(line) > DICTIONARY_BYTES:
+            continue
+        packed.append(line)
+        size += len(line)
+    return b"".join(reversed(packed))
+
+
+# =======================
+# CODECS
+# =======================
+def compress(value: str, codec: Optional[str] = None, dictionary_id: Optional[int] = None) -> bytes:
+    codec = codec or settings.SNIPPET_COMPRESSION
+    dictionary_id = dictionaries.current_id if dictionary_id is None else dictionary_id
+    raw = value.encode("utf-8")
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return HEADER.pack(PLAIN, 0) + raw
+
+    zdict = dictionaries.get(dictionary_id) if dictionary_id else None
+    if codec == "zstd":
+        zstandard = _zstd()
+        params = {"dict_data": zstandard.ZstdCompressionDict(zdict)} if zdict else {}
+        payload = zstandard.ZstdCompressor(level=ZSTD_LEVEL, **params).compress(raw)
+    else:
+        compressor = zlib.compressobj(ZLIB_LEVEL, zdict=zdict) if zdict else zlib.compressobj(ZLIB_LEVEL)
+        payload = compressor.compress(raw) + compressor.flush()
+    if len(payload) >= len(raw):
+        return HEADER.pack(PLAIN, 0) + raw
+    return HEADER.pack(CODECS[codec], dictionary_id) + payload
+
+
+def stored_header(stored: Union[bytes, str]) -> Tuple[int, int]:
+    """(codec, dictionary id) of a stored value; text from before compression counts as plain."""
+    if isinstance(stored, str):
+        return PLAIN, 0
+    return HEADER.unpack_from(stored)
+
+
+def decompress(stored: Union[bytes, str]) -> str:
+    if isinstance(stored, str):
+        return stored
+    stored = bytes(stored)
+    codec, dictionary_id = HEADER.unpack_from(stored)
+    payload = stored[HEADER.size:]
+    if codec == PLAIN:
+        return payload.decode("utf-8")
+
+    zdict = dictionaries.get(dictionary_id) if dictionary_id else None
+    if codec == ZSTD:
+        zstandard = _zstd()
+        params = {"dict_data": zstandard.ZstdCompressionDict(zdict)} if zdict else {}
+        return zstandard.ZstdDecompressor(**params).decompress(payload).decode("utf-8")
+    decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+    return (decompressor.decompress(payload) + decompressor.flush()).decode("utf-8")
+
+
+def http_encoded(stored: Union[bytes, str], accept_encoding: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    """
+    (content-encoding, body) when the stored bytes can be sent as they are:
+    compressed without a dictionary, in a coding the client accepts.
+    """
+    if isinstance(stored, str) or not accept_encoding:
+        return None
+    stored = bytes(stored)
+    codec, dictionary_id = HEADER.unpack_from(stored)
+    encoding = HTTP_ENCODINGS.get(codec)
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if dictionary_id or encoding not in accepted:
+        return None
+    return encoding, stored[HEADER.size:]
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text stored as compressed bytes (see HEADER). Values are compressed on
+    write and decompressed when the column is loaded, so deferred columns
+    are never decompressed. Also reads text written before compression.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else compress(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decompress(value)
+
+
+def code_content_type():
+    """Column type of Snippet.code_content for the configured storage mode."""
+    return CompressedText if enabled() else AutoString
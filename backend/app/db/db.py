@@ -1,16 +0,0 @@
-from app.core.config import settings  
-from sqlmodel import SQLModel, Session, create_engine
-
-connect_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args=connect_args
-)
-
-def init_db():
-    SQLModel.metadata.create_all(engine)
-
-def get_session():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+The schema is versioned by the Alembic revisions in backend/migrations.
+Run `alembic upgrade head` from backend/ to migrate a database. At startup
+the app either only checks that the database is at the latest revision
+("verify", one small query per worker) or migrates it first ("upgrade"),
+depending on settings.SCHEMA_MODE. Alembic is imported only to migrate.
+"""
+import os
+from typing import Set
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The latest revision in migrations/versions; a test keeps the two in step
+SCHEMA_HEAD = "0005"
+# Serializes "upgrade" startups of several workers on Postgres
+UPGRADE_LOCK_ID = 0x736E6970
+
+
+class SchemaOutdated(RuntimeError):
+    pass
+
+
+def alembic_config():
+    from alembic.config import Config
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    # Keep the app's logging configuration
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def head_revisions() -> Set[str]:
+    from alembic.script import ScriptDirectory
+    return set(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+
+def current_revisions(engine: Engine) -> Set[str]:
+    with engine.connect() as connection:
+        if not inspect(connection).has_table("alembic_version"):
+            return set()
+        return set(connection.execute(text("SELECT version_num FROM alembic_version")).scalars())
+
+
+def upgrade(engine: Engine, revision: str = "head") -> None:
+    from alembic import command
+    config = alembic_config()
+    with engine.connect() as connection:
+        postgres = connection.dialect.name == "postgresql"
+        if postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": UPGRADE_LOCK_ID})
+            connection.commit()
+        try:
+            config.attributes["connection"] = connection
+            command.upgrade(config, revision)
+        finally:
+            if postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": UPGRADE_LOCK_ID})
+                connection.commit()
+
+
+def verify(engine: Engine) -> None:
+    current = current_revisions(engine)
+    if current != {SCHEMA_HEAD}:
+        raise SchemaOutdated(
+            f"Database schema is at {', '.join(sorted(current)) or 'no revision'}, "
+            f"the app needs {SCHEMA_HEAD}: run `alembic upgrade head` from backend/"
+        )
+
+
+def prepare_schema(engine: Engine) -> None:
+    if settings.SCHEMA_MODE == "upgrade":
+        upgrade(engine)
+    else:
+        verify(engine)
@@ -0,0 +1,62 @@
+import time
+import itertools
+import threading
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core.config import settings
+from app.db.session import build_async_engine, pool_stats
+
+
+class ReplicaSet:
+    """
+    Read replicas picked round-robin. A replica whose connections fail
+    (refused, dropped, failed pre-ping) is taken out of rotation for
+    `retry_after` seconds; with every replica down, choose() returns None
+    and reads go to the primary.
+    """
+
+    def __init__(self, urls: Sequence[str], retry_after: float):
+        self.retry_after = retry_after
+        self.engines: List[AsyncEngine] = [build_async_engine(url) for url in urls]
+        self._down_until: Dict[int, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for index, engine in enumerate(self.engines):
+            event.listen(engine.sync_engine, "handle_error", partial(self._on_error, index))
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        now = time.monotonic()
+        start = next(self._counter)
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self._down_until.get(index, 0.0) <= now:
+                return self.engines[index]
+        return None
+
+    def mark_down(self, index: int) -> None:
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_after
+
+    def _on_error(self, index: int, context) -> None:
+        # A missing connection means connecting itself failed
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(index)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            dict(pool_stats(engine.sync_engine), healthy=self._down_until.get(index, 0.0) <= now)
+            for index, engine in enumerate(self.engines)
+        ]
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+replica_set = ReplicaSet(settings.DATABASE_REPLICA_URLS, retry_after=settings.REPLICA_RETRY_SECONDS)
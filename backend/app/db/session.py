@@ -1,10 +1,165 @@
+import time
+import asyncio
+import threading
+from typing import Any, Dict
 from sqlalchemy import create_engine
 from app.core.config import settings
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """Same database, async driver: psycopg2 -> asyncpg, pysqlite -> aiosqlite."""
+    parsed = make_url(url)
+    backend = parsed.drivername.split("+")[0]
+    return parsed.set(drivername=ASYNC_DRIVERS.get(backend, parsed.drivername)).render_as_string(hide_password=False)
+
+# =======================
+# POOLS
+# =======================
+class PoolWaitStats:
+    """Time spent waiting for a connection to be handed out, including timeouts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": 1000 * self.total_wait / self.checkouts if self.checkouts else 0.0,
+            "wait_ms_max": 1000 * self.max_wait,
+        }
+
+
+class _TimedPoolMixin:
+    """Measures how long each checkout waits on the pool (a new connection's connect time included)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
 
-engine = create_engine(
-    settings.DATABASE_URL, 
-    pool_pre_ping=True 
-)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# =======================
+# ENGINES
+# =======================
+def engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """create_engine() arguments for `url`, driven by the DB_* settings."""
+    parsed = make_url(url)
+    options: Dict[str, Any] = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "query_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            # In-memory databases live in a single connection; keep SQLAlchemy's default pool
+            return options
+    elif parsed.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    )
+    return options
+
+def build_engine(url: str = settings.DATABASE_URL) -> Engine:
+    return create_engine(url, **engine_options(url))
+
+def build_async_engine(url: str = settings.DATABASE_URL) -> AsyncEngine:
+    url = async_database_url(url)
+    return create_async_engine(url, **engine_options(url, is_async=True))
+
+def pool_stats(engine) -> Dict[str, Any]:
+    """Live occupancy and wait times of an engine's pool."""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats.update(wait_stats.as_dict())
+    return stats
+
+async def prefill_pool(engine: AsyncEngine, connections: int = settings.DB_POOL_SIZE) -> int:
+    """
+    Opens up to `connections` pooled connections at once and checks them
+    back in, so the first requests of a new worker don't each wait for a
+    connect. Returns the number opened.
+    """
+    if not isinstance(engine.sync_engine.pool, QueuePool):
+        return 0
+    opened = await asyncio.gather(
+        *(engine.connect().start() for _ in range(min(connections, engine.sync_engine.pool.size()))),
+        return_exceptions=True,
+    )
+    for connection in opened:
+        if not isinstance(connection, BaseException):
+            await connection.close()
+    for connection in opened:
+        if isinstance(connection, BaseException):
+            raise connection
+    return len(opened)
+
+# Sync engine: schema setup, index backfills, scripts and tests.
+engine = build_engine()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine: the request path.
+async_engine = build_async_engine()
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    # Responses are serialized after commit, outside of any IO context
+    expire_on_commit=False
+)
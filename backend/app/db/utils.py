@@ -0,0 +1,66 @@
+import importlib
+from typing import Any, Callable, List, Sequence
+from sqlalchemy import insert, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+def dialect_insert(dialect: str):
+    """The INSERT construct with ON CONFLICT of `dialect`; only the dialect in use gets imported."""
+    return importlib.import_module(f"sqlalchemy.dialects.{dialect}").insert
+
+def insert_ignore(session: Session, model):
+    """
+    INSERT ... ON CONFLICT DO NOTHING for the session's backend,
+    so racing writers can insert the same unique row without failing.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        return dialect_insert(dialect)(model).on_conflict_do_nothing()
+    return insert(model)
+
+def insert_or_increment(connection: Connection, model, key: str, counter: str, rows: List[dict]) -> None:
+    """
+    Inserts rows, or adds their `counter` to the existing row on a `key`
+    conflict, in one statement on Postgres and SQLite. `rows` must have
+    distinct keys.
+    """
+    table = model.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        statement = dialect_insert(dialect)(table).values(rows)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[key],
+            set_={counter: table.c[counter] + statement.excluded[counter]},
+        ))
+        return
+    for row in rows:
+        updated = connection.execute(
+            update(table).where(table.c[key] == row[key]).values({counter: table.c[counter] + row[counter]})
+        )
+        if updated.rowcount == 0:
+            connection.execute(insert(table).values(row))
+
+def backfill_in_batches(
+    engine: Engine,
+    fetch_batch: Callable[[Connection, Any], Sequence],
+    write_batch: Callable[[Connection, Sequence], None],
+) -> int:
+    """
+    Online backfill for migrations: fetch_batch(connection, last_id) returns
+    the next rows to fill after last_id in id order (id first) and
+    write_batch fills them, each batch in its own short transaction. The app
+    keeps serving while it runs, and since filled rows are no longer fetched,
+    a backfill that stops midway resumes where it left off. Inside a
+    migration, run it in `op.get_context().autocommit_block()` so the
+    migration's own transaction holds no locks the batches would wait on.
+    Returns the number of rows written.
+    """
+    written, last_id = 0, None
+    while True:
+        with engine.begin() as connection:
+            rows = fetch_batch(connection, last_id)
+            if not rows:
+                return written
+            write_batch(connection, rows)
+        written += len(rows)
+        last_id = rows[-1][0]
@@ -1,17 +1,122 @@
-from fastapi import FastAPI
-from app.models import models
-from app.db.session import engine
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable
+from fastapi import FastAPI, HTTPException, Response
+from contextlib import asynccontextmanager
+from app.db.session import AsyncSessionLocal, async_engine, engine, prefill_pool
+from app.db.migrations import prepare_schema
+from app.db.replicas import replica_set
 from app.core.config import settings
-from app.core.limiter import limiter 
+from app.core.limiter import RateLimitExceeded, RateLimitHeadersMiddleware
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, TimedJSONResponse, metrics, route_label
+from app.api.deps import PrimaryCookieMiddleware
 from app.api.v1.api import api_router
-from slowapi.errors import RateLimitExceeded
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.middleware import SlowAPIMiddleware
+from app.api.v1.endpoints.snippets import DUPLICATE_OF_HEADER
+from app.services.code_search_service import init_code_search
+from app.crud import crud_tag
+from app.services import trending_service
+from app.services.snippet_service import init_snippet_storage
 from fastapi.middleware.cors import CORSMiddleware  
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.password_hasher import PasswordHasherBusy, password_hasher
+from fastapi.responses import JSONResponse
 
-models.SQLModel.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title=settings.APP_NAME)
+
+def rate_limit_exceeded_handler(request, exc: RateLimitExceeded) -> JSONResponse:
+    metrics.count_rate_limited(route_label(request.scope))
+    return JSONResponse(
+        status_code=429,
+        content={"detail": f"Rate limit exceeded: {exc.rate}"},
+        headers=exc.headers,
+    )
+
+
+def password_hasher_busy_handler(request, exc: PasswordHasherBusy) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in attempts in progress, try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+async def rebase_trending_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(trending_service.rebase, engine)
+        except Exception:
+            logger.exception("Rescaling trending scores failed")
+
+
+# =======================
+# STARTUP
+# =======================
+# Nothing touches the database at import time: each worker prepares and
+# warms itself in the lifespan, before it accepts its first request.
+def prepare_database() -> None:
+    """Checks (or migrates) the schema, then loads what the storage and search code need from it."""
+    prepare_schema(engine)
+    init_snippet_storage(engine)
+    init_code_search(engine)
+
+
+async def prefill_pools() -> int:
+    opened = await prefill_pool(async_engine)
+    for replica in replica_set.engines:
+        try:
+            opened += await prefill_pool(replica)
+        except Exception:
+            # A replica that is down is skipped by reads until it recovers
+            logger.warning("Could not pre-fill the pool of a read replica", exc_info=True)
+    return opened
+
+
+async def warm_tag_cache() -> int:
+    async with AsyncSessionLocal() as session:
+        return await crud_tag.warm_tag_cache(session, settings.TAG_CACHE_WARM_SIZE)
+
+
+async def timed_step(name: str, step: Callable[[], Awaitable]) -> None:
+    started = time.perf_counter()
+    result = await step()
+    detail = "" if result is None else f" ({result})"
+    logger.info("Startup: %s%s in %.1f ms", name, detail, 1000 * (time.perf_counter() - started))
+
+
+async def warm_up() -> None:
+    await timed_step("database", lambda: asyncio.to_thread(prepare_database))
+    await asyncio.gather(
+        timed_step("connection pool", prefill_pools),
+        timed_step("tag cache", warm_tag_cache),
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up()
+    # Not awaited: starting the hashing processes and loading bcrypt only
+    # delays logins, and they wait for the pool anyway
+    password_probe_task = asyncio.create_task(timed_step("bcrypt backend", password_hasher.warm_up))
+    rebase_task = None
+    if settings.TRENDING_REBASE_MINUTES > 0:
+        rebase_task = asyncio.create_task(rebase_trending_periodically(settings.TRENDING_REBASE_MINUTES * 60))
+    # Autocomplete loads in the background; requests before it finishes wait for it
+    tag_index_task = asyncio.create_task(asyncio.to_thread(crud_tag.refresh_tag_index, engine))
+    yield
+    password_probe_task.cancel()
+    tag_index_task.cancel()
+    if rebase_task is not None:
+        rebase_task.cancel()
+    password_hasher.shutdown()
+    # Pooled asyncpg/aiosqlite connections are bound to the serving event loop
+    await async_engine.dispose()
+    await replica_set.dispose()
+
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan, default_response_class=TimedJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,14 +124,28 @@ app.add_middleware(
     allow_credentials=True,       
     allow_methods=["*"],          
     allow_headers=["*"],          
+    expose_headers=[
+        NEXT_CURSOR_HEADER, DUPLICATE_OF_HEADER,
+        "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After", "Server-Timing",
+    ],
 )
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+app.add_exception_handler(PasswordHasherBusy, password_hasher_busy_handler)
+app.add_middleware(RateLimitHeadersMiddleware)
+app.add_middleware(PrimaryCookieMiddleware)
+# Outermost, so its timings cover the other middleware too
+app.add_middleware(MetricsMiddleware, metrics=metrics)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.get("/")
-def root():
-    return {"message": "Welcome to Snipted API"}
\ No newline at end of file
+async def root():
+    return {"message": "Welcome to Snipted API"}
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics() -> Response:
+    """Prometheus text format, summed over every worker of this host."""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
\ No newline at end of file
@@ -1,15 +1,44 @@
-from typing import List, Optional
+import hashlib
+from collections import Counter
+from typing import Iterable, List, Optional
 from datetime import datetime, timezone
+from sqlalchemy import DateTime, Index, bindparam, delete, event, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import column_property
+from sqlalchemy.orm.attributes import set_attribute
 from sqlmodel import Field, SQLModel, Relationship
+from app.db.compression import code_content_type
+from app.db.utils import insert_or_increment
+
+# Feed cards show the start of the code; lists send this instead of code_content
+SNIPPET_PREVIEW_LINES = 10
+SNIPPET_PREVIEW_MAX_CHARS = 1000
 
 def utc_now():
+    # Aware, so timestamp columns are declared with time zone (asyncpg binds them strictly)
     return datetime.now(timezone.utc)
 
+def make_preview(code_content: str) -> str:
+    lines = code_content.split("\n", SNIPPET_PREVIEW_LINES)[:SNIPPET_PREVIEW_LINES]
+    return "\n".join(lines)[:SNIPPET_PREVIEW_MAX_CHARS]
+
+def normalize_code(code_content: str) -> str:
+    """The stored form of a body: line endings are \\n, so CRLF copies share a blob."""
+    return code_content.replace("\r\n", "\n").replace("\r", "\n")
+
+def content_hash(code_content: str) -> str:
+    """SHA-256 of a normalized body, the key of its snippet_blobs row."""
+    return hashlib.sha256(code_content.encode("utf-8")).hexdigest()
+
 # ==========================================
 # JOIN TABLES (Updated Foreign Keys)
 # ==========================================
 class SnippetTagLink(SQLModel, table=True):
     __tablename__ = "snippet_tag_links"
+    __table_args__ = (
+        # Per-tag posting lists, for the tag filters of the feed
+        Index("ix_snippet_tag_links_tag_id_snippet_id", "tag_id", "snippet_id"),
+    )
     snippet_id: Optional[int] = Field(
         default=None, 
         foreign_key="snippets.id",  
@@ -23,6 +52,10 @@ class SnippetTagLink(SQLModel, table=True):
 
 class SnippetLike(SQLModel, table=True):
     __tablename__ = "snippet_likes"
+    __table_args__ = (
+        # A snippet's likes in time order (trending rebuilds)
+        Index("ix_snippet_likes_snippet_id_liked_at", "snippet_id", "liked_at"),
+    )
     user_id: Optional[int] = Field(
         default=None, 
         foreign_key="users.id",     
@@ -33,7 +66,17 @@ class SnippetLike(SQLModel, table=True):
         foreign_key="snippets.id",  
         primary_key=True
     )
-    liked_at: datetime = Field(default_factory=utc_now)
+    liked_at: datetime = Field(default_factory=utc_now, sa_type=DateTime(timezone=True))
+
+class SnippetTrigram(SQLModel, table=True):
+    """Posting list of lowercased code trigrams, used when pg_trgm is not available."""
+    __tablename__ = "snippet_trigrams"
+    trigram: str = Field(primary_key=True)
+    snippet_id: int = Field(
+        foreign_key="snippets.id",
+        primary_key=True,
+        index=True
+    )
 
 # ==========================================
 # USER MODEL
@@ -45,11 +88,13 @@ class UserBase(SQLModel):
 
 class User(UserBase, table=True):
     __tablename__ = "users"  
+    # Keyset pagination seeks on (created_at, id)
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
     id: Optional[int] = Field(default=None, primary_key=True)
     hashed_password: str  
     is_active: bool = Field(default=True)
-    created_at: datetime = Field(default_factory=utc_now)
+    created_at: datetime = Field(default_factory=utc_now, sa_type=DateTime(timezone=True))
 
     snippets: List["Snippet"] = Relationship(back_populates="user")
     liked_snippets: List["Snippet"] = Relationship(back_populates="liked_by_users", link_model=SnippetLike)
@@ -66,20 +111,65 @@ class Tag(TagBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     snippets: List["Snippet"] = Relationship(back_populates="tags", link_model=SnippetTagLink)
 
+class TagStat(SQLModel, table=True):
+    """Denormalized count of snippet_tag_links rows per tag, maintained by crud_tag."""
+    __tablename__ = "tag_stats"
+    __table_args__ = (
+        # Top tags are a backward scan of the first K entries
+        Index("ix_tag_stats_snippet_count_tag_id", "snippet_count", "tag_id"),
+    )
+
+    tag_id: int = Field(primary_key=True, foreign_key="tags.id")
+    snippet_count: int = Field(default=0)
+
+# ==========================================
+# CONTENT-ADDRESSED BODIES
+# ==========================================
+class SnippetBlob(SQLModel, table=True):
+    """
+    One row per distinct normalized body, shared by every snippet with that
+    code. ref_count is the number of snippets pointing at it; the row is
+    deleted when it drops to zero.
+    """
+    __tablename__ = "snippet_blobs"
+
+    hash: str = Field(primary_key=True, max_length=64)
+    # Compressed bytes when SNIPPET_COMPRESSION is set, plain text otherwise
+    content: str = Field(sa_type=code_content_type())
+    ref_count: int = Field(default=0)
+
 # ==========================================
 # SNIPPET MODEL
 # ==========================================
 class SnippetBase(SQLModel):
     title: str = Field(index=True)
-    code_content: str
     language: str = Field(default="text")
 
 class Snippet(SnippetBase, table=True):
     __tablename__ = "snippets" 
+    __table_args__ = (
+        # Keyset pagination seeks on (created_at, id)
+        Index("ix_snippets_created_at_id", "created_at", "id"),
+        # Blob references, and exact-duplicate lookups per user
+        Index("ix_snippets_content_hash_user_id", "content_hash", "user_id"),
+        # A user's snippets, newest first
+        Index("ix_snippets_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Top-K trending is a backward scan of the first K entries
+        Index("ix_snippets_trending_score_id", "trending_score", "id"),
+        Index("ix_snippets_language", "language"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
-    created_at: datetime = Field(default_factory=utc_now)
-    updated_at: datetime = Field(default_factory=utc_now)
+    # Set from code_content on flush
+    content_hash: Optional[str] = Field(default=None, foreign_key="snippet_blobs.hash", nullable=False)
+    created_at: datetime = Field(default_factory=utc_now, sa_type=DateTime(timezone=True))
+    updated_at: datetime = Field(default_factory=utc_now, sa_type=DateTime(timezone=True))
+    # Denormalized count of snippet_likes rows, maintained by crud_like.toggle_like
+    like_count: int = Field(default=0)
+    # Sum of 2^((liked_at - epoch) / half-life) over the likes, see trending_service
+    trending_score: float = Field(default=0.0)
+    # First lines of code_content, kept in sync on every ORM insert/update
+    preview: str = Field(default="")
     
     user_id: Optional[int] = Field(default=None, foreign_key="users.id") 
     user: Optional[User] = Relationship(back_populates="snippets")
@@ -87,6 +177,108 @@ class Snippet(SnippetBase, table=True):
     tags: List[Tag] = Relationship(back_populates="snippets", link_model=SnippetTagLink)
     liked_by_users: List[User] = Relationship(back_populates="liked_snippets", link_model=SnippetLike)
 
-    @property
-    def like_count(self) -> int:
-        return len(self.liked_by_users)
\ No newline at end of file
+    # code_content is mapped below from snippet_blobs rather than being a
+    # column, so it bypasses pydantic when it is passed in or assigned
+    def __init__(self, code_content: Optional[str] = None, **data):
+        super().__init__(**data)
+        if code_content is not None:
+            self.code_content = code_content
+
+    def __setattr__(self, name, value):
+        if name == "code_content":
+            set_attribute(self, name, value)
+        else:
+            super().__setattr__(name, value)
+
+# The body, read from the blob in the same query. Assigned values are kept
+# through the flush; the listeners below store them as blobs.
+Snippet.code_content = column_property(
+    select(SnippetBlob.content)
+    .where(SnippetBlob.hash == Snippet.content_hash)
+    .correlate_except(SnippetBlob)
+    .scalar_subquery(),
+    expire_on_flush=False,
+)
+
+class TrendingEpoch(SQLModel, table=True):
+    """Single row: the reference time (unix seconds) trending scores are scaled to."""
+    __tablename__ = "trending_epoch"
+
+    id: int = Field(default=1, primary_key=True)
+    epoch: float
+
+# ==========================================
+# STORAGE
+# ==========================================
+class CompressionDictionary(SQLModel, table=True):
+    """Shared dictionaries for compressed blob content; rows reference them by id."""
+    __tablename__ = "compression_dictionaries"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    codec: str
+    data: bytes
+    created_at: datetime = Field(default_factory=utc_now, sa_type=DateTime(timezone=True))
+
+
+def acquire_blobs(connection: Connection, bodies: Iterable[str]) -> List[str]:
+    """
+    Takes one reference per body, creating the missing blobs, and returns
+    their hashes in order. Bodies must already be normalized.
+    """
+    bodies = list(bodies)
+    hashes = [content_hash(body) for body in bodies]
+    counts = Counter(hashes)
+    contents = dict(zip(hashes, bodies))
+    insert_or_increment(
+        connection, SnippetBlob, "hash", "ref_count",
+        [{"hash": blob_hash, "content": contents[blob_hash], "ref_count": count} for blob_hash, count in counts.items()],
+    )
+    return hashes
+
+
+def release_blobs(connection: Connection, hashes: Iterable[str]) -> None:
+    """Drops one reference per hash and deletes the blobs nothing points at any more."""
+    counts = Counter(blob_hash for blob_hash in hashes if blob_hash)
+    if not counts:
+        return
+    blobs = SnippetBlob.__table__
+    connection.execute(
+        update(blobs)
+        .where(blobs.c.hash == bindparam("blob_hash"))
+        .values(ref_count=blobs.c.ref_count - bindparam("released")),
+        [{"blob_hash": blob_hash, "released": count} for blob_hash, count in counts.items()],
+    )
+    connection.execute(delete(blobs).where(blobs.c.hash.in_(list(counts)), blobs.c.ref_count <= 0))
+
+
+@event.listens_for(Snippet, "before_insert")
+def _store_body_on_insert(mapper, connection, target: Snippet) -> None:
+    target.code_content = normalize_code(target.code_content)
+    target.content_hash = acquire_blobs(connection, [target.code_content])[0]
+    target.preview = make_preview(target.code_content)
+
+
+@event.listens_for(Snippet, "before_update")
+def _store_body_on_update(mapper, connection, target: Snippet) -> None:
+    # Only when code_content changed, so updates never load a deferred code_content
+    if inspect(target).attrs.code_content.history.has_changes():
+        target.code_content = normalize_code(target.code_content)
+        new_hash = content_hash(target.code_content)
+        if new_hash != target.content_hash:
+            # Released after the row stops pointing at it (see below)
+            inspect(target).info["released_blob"] = target.content_hash
+            acquire_blobs(connection, [target.code_content])
+            target.content_hash = new_hash
+        target.preview = make_preview(target.code_content)
+
+
+@event.listens_for(Snippet, "after_update")
+def _release_body_on_update(mapper, connection, target: Snippet) -> None:
+    released = inspect(target).info.pop("released_blob", None)
+    if released:
+        release_blobs(connection, [released])
+
+
+@event.listens_for(Snippet, "after_delete")
+def _release_body_on_delete(mapper, connection, target: Snippet) -> None:
+    release_blobs(connection, [target.content_hash])
@@ -20,6 +20,10 @@ class SnippetBase(BaseModel):
 class UserCreate(UserBase):
     password: str = Field(..., min_length=8)
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str = Field(..., min_length=8)
+
 class UserResponse(UserBase):
     id: int
     is_active: bool
@@ -37,6 +41,10 @@ class TagResponse(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+class TagCount(BaseModel):
+    name: str
+    snippet_count: int
+
 # =======================
 # SNIPPET SCHEMAS
 # =======================
@@ -54,10 +62,69 @@ class SnippetResponse(SnippetBase):
     created_at: datetime
     updated_at: datetime
     user_id: int
+    like_count: int = 0
     tags: List[TagResponse] = []
     
     model_config = ConfigDict(from_attributes=True)
 
+class SnippetListItem(SnippetResponse):
+    """Every field a list endpoint can return; `fields=` picks a subset."""
+    preview: str = ""
+
+class SnippetSummary(BaseModel):
+    """Default list projection: the stored preview instead of code_content."""
+    id: int
+    title: str
+    language: str
+    preview: str = ""
+    created_at: datetime
+    updated_at: datetime
+    user_id: int
+    like_count: int = 0
+    tags: List[TagResponse] = []
+
+    model_config = ConfigDict(from_attributes=True)
+
+class CodeMatch(BaseModel):
+    line: int
+    start: int
+    end: int
+    offset: int
+    text: str
+
+class SnippetSearchResult(SnippetListItem):
+    matches: List[CodeMatch] = []
+
+class SnippetSearchSummary(SnippetSummary):
+    matches: List[CodeMatch] = []
+
+class SnippetImport(SnippetCreate):
+    """One NDJSON line of a bulk import; timestamps are kept when migrating."""
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class SnippetExport(SnippetBase):
+    """One NDJSON line of a bulk export; can be imported again as-is."""
+    id: int
+    user_id: int
+    created_at: datetime
+    updated_at: datetime
+    like_count: int = 0
+    tags: List[str] = []
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    created: int
+    failed: int
+    errors: List[ImportLineError] = []
+
+class LikeResponse(BaseModel):
+    is_liked: bool
+    like_count: int
+
 class Token(BaseModel):
     access_token: str
     token_type: str
\ No newline at end of file
@@ -0,0 +1,206 @@
+import logging
+from collections import Counter
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import crud_tag
+from app.core.response_cache import response_cache
+from app.models.models import (
+    Snippet, SnippetBlob, SnippetTagLink, Tag, acquire_blobs, make_preview, normalize_code, utc_now,
+)
+from app.schemas.schemas import ImportLineError, ImportReport, SnippetExport, SnippetImport
+from app.services.snippet_service import index_snippet
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+MAX_LINE_BYTES = 1_000_000
+# The report lists the first errors only; `failed` still counts all of them
+MAX_REPORTED_ERRORS = 1000
+
+
+# =======================
+# NDJSON
+# =======================
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[Optional[bytes]]:
+    """
+    Splits a byte stream into lines without holding more than one line.
+    A line longer than MAX_LINE_BYTES is skipped and yielded as None.
+    """
+    buffer = bytearray()
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                break
+            if oversized or len(buffer) + end - start > MAX_LINE_BYTES:
+                yield None
+            else:
+                buffer += chunk[start:end]
+                yield bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = end + 1
+        if not oversized:
+            buffer += chunk[start:]
+            if len(buffer) > MAX_LINE_BYTES:
+                buffer.clear()
+                oversized = True
+    if oversized:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+
+def _parse_line(raw: Optional[bytes]) -> SnippetImport:
+    if raw is None:
+        raise ValueError(f"line exceeds {MAX_LINE_BYTES} bytes")
+    try:
+        return SnippetImport.model_validate_json(raw)
+    except ValidationError as exc:
+        error = exc.errors()[0]
+        location = ".".join(str(part) for part in error["loc"])
+        raise ValueError(f"{location}: {error['msg']}" if location else error["msg"])
+
+
+# =======================
+# IMPORT
+# =======================
+async def _insert_batch(session: AsyncSession, user_id: int, batch: List[Tuple[int, SnippetImport]]) -> None:
+    """Inserts one batch with multi-row statements and commits it."""
+    names = [crud_tag.normalize_tag(name) for _, item in batch for name in item.tags]
+    names = list(dict.fromkeys(name for name in names if name))
+    tag_ids = dict(zip(names, await crud_tag.resolve_tag_ids(session, names)))
+
+    # Core inserts bypass the ORM hooks that store the body and fill the preview
+    bodies = [normalize_code(item.code_content) for _, item in batch]
+    hashes = await session.run_sync(lambda sync_session: acquire_blobs(sync_session.connection(), bodies))
+
+    now = utc_now()
+    rows = [
+        {
+            "title": item.title,
+            "content_hash": blob_hash,
+            "preview": make_preview(body),
+            "language": item.language,
+            "user_id": user_id,
+            "like_count": 0,
+            "created_at": item.created_at or now,
+            "updated_at": item.updated_at or item.created_at or now,
+        }
+        for (_, item), body, blob_hash in zip(batch, bodies, hashes)
+    ]
+    result = await session.execute(insert(Snippet).returning(Snippet.id, sort_by_parameter_order=True), rows)
+    snippet_ids = result.scalars().all()
+
+    links = [
+        {"snippet_id": snippet_id, "tag_id": tag_id}
+        for snippet_id, (_, item) in zip(snippet_ids, batch)
+        for tag_id in dict.fromkeys(tag_ids[name] for name in map(crud_tag.normalize_tag, item.tags) if name)
+    ]
+    if links:
+        await session.execute(insert(SnippetTagLink), links)
+        await crud_tag.count_links(session, Counter(link["tag_id"] for link in links))
+
+    snippets = [
+        Snippet(id=snippet_id, title=item.title, code_content=body)
+        for snippet_id, (_, item), body in zip(snippet_ids, batch, bodies)
+    ]
+    await session.run_sync(lambda sync_session: [index_snippet(sync_session, snippet) for snippet in snippets])
+    await session.commit()
+
+
+async def import_snippets(
+    session: AsyncSession,
+    lines: AsyncIterable[Optional[bytes]],
+    user_id: int,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    """
+    Creates a snippet, owned by `user_id`, for every valid NDJSON line.
+    Each batch is committed on its own, so memory stays bounded and a
+    failing batch only loses its own lines. Blank lines are ignored.
+    """
+    report = ImportReport(created=0, failed=0)
+
+    def fail(line_number: int, error: str) -> None:
+        report.failed += 1
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(ImportLineError(line=line_number, error=error))
+
+    async def flush(batch: List[Tuple[int, SnippetImport]]) -> None:
+        try:
+            await _insert_batch(session, user_id, batch)
+            report.created += len(batch)
+        except Exception as exc:
+            # Whatever a batch raises (database, compression, indexing) only fails that batch
+            await session.rollback()
+            if isinstance(exc, SQLAlchemyError):
+                reason = "batch rejected by the database"
+            else:
+                logger.exception("Import batch failed")
+                reason = "batch failed"
+            for line_number, _ in batch:
+                fail(line_number, f"{reason}: {exc.__class__.__name__}")
+
+    batch: List[Tuple[int, SnippetImport]] = []
+    line_number = 0
+    async for raw in lines:
+        line_number += 1
+        if raw is not None and not raw.strip():
+            continue
+        try:
+            batch.append((line_number, _parse_line(raw)))
+        except ValueError as exc:
+            fail(line_number, str(exc))
+            continue
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    if report.created:
+        await response_cache.snippet_created()
+    return report
+
+
+# =======================
+# EXPORT
+# =======================
+async def export_snippets(session: AsyncSession, user_id: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Streams snippets as NDJSON in id order through a server-side cursor,
+    one partition (and one tag query) at a time, so memory stays constant.
+    """
+    statement = (
+        select(
+            Snippet.id, Snippet.user_id, Snippet.title, SnippetBlob.content.label("code_content"),
+            Snippet.language, Snippet.created_at, Snippet.updated_at, Snippet.like_count,
+        )
+        .join(SnippetBlob, SnippetBlob.hash == Snippet.content_hash)
+        .order_by(Snippet.id)
+    )
+    if user_id is not None:
+        statement = statement.where(Snippet.user_id == user_id)
+
+    result = await session.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    async for partition in result.partitions():
+        tags: Dict[int, List[str]] = {}
+        tag_rows = await session.execute(
+            select(SnippetTagLink.snippet_id, Tag.name)
+            .join(Tag, Tag.id == SnippetTagLink.tag_id)
+            .where(SnippetTagLink.snippet_id.in_([row.id for row in partition]))
+        )
+        for snippet_id, name in tag_rows:
+            tags.setdefault(snippet_id, []).append(name)
+
+        yield b"".join(
+            SnippetExport(**row._mapping, tags=sorted(tags.get(row.id, []))).model_dump_json().encode() + b"\n"
+            for row in partition
+        )
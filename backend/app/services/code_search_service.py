@@ -0,0 +1,269 @@
+import re
+from enum import Enum
+from typing import Iterable, List, Optional, Set, Tuple
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, selectinload
+from app.db import compression
+from app.db.utils import backfill_in_batches
+from app.models.models import Snippet, SnippetBlob, SnippetTrigram
+
+MAX_RESULTS = 100
+MAX_MATCHES_PER_SNIPPET = 20
+SCAN_BATCH_SIZE = 200
+BACKFILL_BATCH_SIZE = 500
+
+# Set by init_code_search() when Postgres' pg_trgm GIN index can serve the prefilter.
+_use_pg_trgm = False
+
+
+class SearchMode(str, Enum):
+    text = "text"
+    substring = "substring"
+    regex = "regex"
+
+
+# =======================
+# TRIGRAMS
+# =======================
+def trigrams(content: str) -> Set[str]:
+    lowered = content.lower()
+    return {lowered[i:i + 3] for i in range(len(lowered) - 2)}
+
+
+def _skip_group(pattern: str, i: int) -> int:
+    """Returns the index just past the parenthesis that closes the one at `i`."""
+    depth = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            i = _skip_class(pattern, i)
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _skip_class(pattern: str, i: int) -> int:
+    """Returns the index just past the character class opened at `i`."""
+    i += 1
+    if pattern[i:i + 1] == "^":
+        i += 1
+    if pattern[i:i + 1] == "]":
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+        elif pattern[i] == "]":
+            return i + 1
+        else:
+            i += 1
+    return i
+
+
+def required_literals(pattern: str) -> List[str]:
+    """
+    Extracts literal runs that every match of `pattern` must contain.
+    Conservative: groups, classes and anything optional are skipped, and a
+    top-level alternation means nothing is required.
+    """
+    literals: List[str] = []
+    current: List[str] = []
+
+    def flush():
+        if current:
+            literals.append("".join(current))
+            current.clear()
+
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if escaped and not escaped.isalnum():
+                current.append(escaped)
+            else:
+                flush()
+            i += 2
+        elif char == "[":
+            flush()
+            i = _skip_class(pattern, i)
+        elif char == "(":
+            flush()
+            i = _skip_group(pattern, i)
+        elif char == "|":
+            return []
+        elif char in "*?{":
+            if current:
+                current.pop()
+            flush()
+            if char == "{":
+                close = pattern.find("}", i)
+                i = close + 1 if close != -1 else len(pattern)
+            else:
+                i += 1
+        elif char in ".^$+":
+            flush()
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+    flush()
+    return literals
+
+
+# =======================
+# INDEX
+# =======================
+def init_code_search(engine: Engine) -> None:
+    """Uses the pg_trgm index when the migrations could create it, otherwise backfills the in-app trigram table."""
+    global _use_pg_trgm
+    # pg_trgm indexes text; compressed bodies are bytea
+    if engine.dialect.name == "postgresql" and not compression.enabled():
+        with engine.connect() as conn:
+            _use_pg_trgm = conn.execute(text("SELECT to_regclass('ix_snippet_blobs_content_trgm') IS NOT NULL")).scalar()
+        if _use_pg_trgm:
+            return
+
+    with engine.connect() as conn:
+        if conn.execute(select(SnippetTrigram.snippet_id).limit(1)).first() is not None:
+            return
+
+    def fetch(conn, last_id):
+        return conn.execute(
+            select(Snippet.id).where(Snippet.id > (last_id or 0)).order_by(Snippet.id).limit(BACKFILL_BATCH_SIZE)
+        ).all()
+
+    def write(conn, rows):
+        with Session(bind=conn) as session:
+            for snippet in session.execute(select(Snippet).where(Snippet.id.in_([row.id for row in rows]))).scalars():
+                index_snippet(session, snippet)
+            session.flush()
+
+    # One short transaction per batch, so startup neither loads the corpus nor holds a long write lock
+    backfill_in_batches(engine, fetch, write)
+
+
+def index_snippet(db: Session, snippet: Snippet) -> None:
+    """Rewrites the trigram posting entries of a flushed snippet."""
+    if _use_pg_trgm:
+        return
+    unindex_snippet(db, snippet.id)
+    rows = [{"trigram": gram, "snippet_id": snippet.id} for gram in trigrams(snippet.code_content)]
+    if rows:
+        db.execute(insert(SnippetTrigram), rows)
+
+
+def unindex_snippet(db: Session, snippet_id: int) -> None:
+    if _use_pg_trgm:
+        return
+    db.execute(delete(SnippetTrigram).where(SnippetTrigram.snippet_id == snippet_id))
+
+
+def _escape_like(literal: str) -> str:
+    return literal.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def candidate_filter(literals: Iterable[str]):
+    """
+    Builds the index prefilter for snippets containing every literal,
+    or None when the literals are too short to narrow anything down.
+    """
+    literals = [literal for literal in literals if len(literal) >= 3]
+    if not literals:
+        return None
+
+    if _use_pg_trgm:
+        blobs = select(SnippetBlob.hash).where(
+            *(SnippetBlob.content.ilike(f"%{_escape_like(lit)}%", escape="\\") for lit in literals)
+        )
+        return [Snippet.content_hash.in_(blobs)]
+
+    grams = set().union(*(trigrams(literal) for literal in literals))
+    posting = (
+        select(SnippetTrigram.snippet_id)
+        .where(SnippetTrigram.trigram.in_(grams))
+        .group_by(SnippetTrigram.snippet_id)
+        .having(func.count() == len(grams))
+    )
+    return [Snippet.id.in_(posting)]
+
+
+# =======================
+# SEARCH
+# =======================
+def compile_regex(pattern: str):
+    """
+    Compiles a user regex with RE2, which matches in time linear in the
+    input, so no pattern can backtrack for long over a 50 KB body.
+    RE2 has no backreferences or lookaround; those raise re.error like
+    any other invalid pattern.
+    """
+    import re2
+    options = re2.Options()
+    options.log_errors = False
+    options.never_capture = True
+    try:
+        return re2.compile(pattern, options)
+    except re2.error as exc:
+        message = exc.args[0] if exc.args else "invalid pattern"
+        raise re.error(message.decode() if isinstance(message, bytes) else str(message)) from None
+
+
+def find_matches(compiled, content: str) -> List[dict]:
+    """Returns 1-based line numbers, column offsets and the matched line for each hit."""
+    matches = []
+    for match in compiled.finditer(content):
+        if match.end() == match.start():
+            continue
+        line_start = content.rfind("\n", 0, match.start()) + 1
+        line_end = content.find("\n", match.start())
+        if line_end == -1:
+            line_end = len(content)
+        matches.append({
+            "line": content.count("\n", 0, match.start()) + 1,
+            "start": match.start() - line_start,
+            "end": match.end() - line_start,
+            "offset": match.start(),
+            "text": content[line_start:line_end],
+        })
+        if len(matches) >= MAX_MATCHES_PER_SNIPPET:
+            break
+    return matches
+
+
+def search_code(db: Session, pattern: str, mode: SearchMode) -> List[Tuple[Snippet, List[dict]]]:
+    """
+    Trigram-prefiltered substring/regex search over code_content.
+    Only index candidates are checked against the exact pattern; patterns
+    without a usable literal fall back to scanning every snippet.
+    Raises re.error for invalid regexes.
+    """
+    if mode == SearchMode.substring:
+        compiled = re.compile(re.escape(pattern))
+        literals = [pattern]
+    else:
+        compiled = compile_regex(pattern)
+        literals = required_literals(pattern)
+
+    statement = select(Snippet).options(selectinload(Snippet.tags)).order_by(Snippet.created_at.desc())
+    prefilter: Optional[list] = candidate_filter(literals)
+    if prefilter is not None:
+        statement = statement.where(*prefilter)
+
+    results: List[Tuple[Snippet, List[dict]]] = []
+    for snippet in db.execute(statement.execution_options(yield_per=SCAN_BATCH_SIZE)).scalars():
+        matches = find_matches(compiled, snippet.code_content)
+        if matches:
+            results.append((snippet, matches))
+            if len(results) >= MAX_RESULTS:
+                break
+    return results
@@ -0,0 +1,155 @@
+import re
+from typing import List
+from sqlalchemy import Float, Integer, literal, or_, select, text
+from sqlalchemy.orm import Session
+from app.db import compression
+from app.models.models import Snippet
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z0-9_]+")
+CAMEL_PART_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z0-9]+")
+
+# Title matches weigh more than body matches when ranking.
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+REINDEX_BATCH_SIZE = 500
+# ts_rank weights for the {D, C, B, A} labels; titles are A, bodies B
+POSTGRES_WEIGHTS = f"{{0, 0, {BODY_WEIGHT / TITLE_WEIGHT}, 1}}"
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+# =======================
+# TOKENIZER
+# =======================
+def tokenize_code(content: str) -> List[str]:
+    """
+    Splits code into search terms.
+    Every identifier is kept whole (underscores dropped, lowercased) and,
+    when it is snake_case or camelCase, also split into its parts, so
+    `getUserName` matches "getusername", "get user" and "user name".
+    """
+    tokens: List[str] = []
+    for identifier in IDENTIFIER_RE.findall(content):
+        whole = identifier.replace("_", "").lower()
+        if not whole:
+            continue
+        tokens.append(whole)
+        parts = [
+            part.lower()
+            for chunk in identifier.split("_") if chunk
+            for part in CAMEL_PART_RE.findall(chunk)
+        ]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def query_terms(q: str) -> List[str]:
+    """Each identifier in the query becomes one prefix term (AND semantics)."""
+    terms: List[str] = []
+    for identifier in IDENTIFIER_RE.findall(q):
+        term = identifier.replace("_", "").lower()
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+# =======================
+# WRITE PATH
+# =======================
+def index_snippet(db: Session, snippet: Snippet) -> None:
+    """Writes (or rewrites) the search document of a flushed snippet in the current transaction."""
+    dialect = _dialect(db.get_bind())
+    title = " ".join(tokenize_code(snippet.title))
+    body = " ".join(tokenize_code(snippet.code_content))
+
+    if dialect == "sqlite":
+        db.execute(text("DELETE FROM snippet_search WHERE rowid = :id"), {"id": snippet.id})
+        db.execute(
+            text("INSERT INTO snippet_search (rowid, title, body) VALUES (:id, :title, :body)"),
+            {"id": snippet.id, "title": title, "body": body},
+        )
+    elif dialect == "postgresql":
+        db.execute(
+            text(
+                "INSERT INTO snippet_search (snippet_id, document) VALUES ("
+                ":id, setweight(to_tsvector('simple', :title), 'A') "
+                "|| setweight(to_tsvector('simple', :body), 'B')) "
+                "ON CONFLICT (snippet_id) DO UPDATE SET document = EXCLUDED.document"
+            ),
+            {"id": snippet.id, "title": title, "body": body},
+        )
+
+
+def unindex_snippet(db: Session, snippet_id: int) -> None:
+    dialect = _dialect(db.get_bind())
+    if dialect == "sqlite":
+        db.execute(text("DELETE FROM snippet_search WHERE rowid = :id"), {"id": snippet_id})
+    elif dialect == "postgresql":
+        db.execute(text("DELETE FROM snippet_search WHERE snippet_id = :id"), {"id": snippet_id})
+
+
+def reindex_all(db: Session) -> int:
+    """Rebuilds the search documents of every snippet, in id-ordered batches."""
+    count = 0
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(Snippet).where(Snippet.id > last_id).order_by(Snippet.id).limit(REINDEX_BATCH_SIZE)
+        ).scalars().all()
+        if not batch:
+            return count
+        for snippet in batch:
+            index_snippet(db, snippet)
+        count += len(batch)
+        last_id = batch[-1].id
+        db.expunge_all()
+
+
+# =======================
+# READ PATH
+# =======================
+def ilike_filter(q: str):
+    """
+    The unindexed substring filter, kept for backends without a full-text index.
+    Compressed bodies can't be matched in SQL, so only titles are then.
+    """
+    if compression.enabled():
+        return Snippet.title.ilike(f"%{q}%")
+    return or_(Snippet.title.ilike(f"%{q}%"), Snippet.code_content.ilike(f"%{q}%"))
+
+
+def ranked_matches(db: Session, q: str):
+    """
+    Returns a subquery of (snippet_id, rank) for the snippets matching `q`,
+    where a lower rank is a better match, or None when `q` has no searchable terms.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return None
+
+    dialect = _dialect(db.get_bind())
+    if dialect == "sqlite":
+        match = " AND ".join(f'"{term}"*' for term in terms)
+        statement = text(
+            "SELECT rowid AS snippet_id, "
+            f"bm25(snippet_search, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS rank "
+            "FROM snippet_search WHERE snippet_search MATCH :match"
+        ).bindparams(match=match)
+    elif dialect == "postgresql":
+        match = " & ".join(f"{term}:*" for term in terms)
+        statement = text(
+            "SELECT snippet_id, -ts_rank(CAST(:weights AS float4[]), document, query) AS rank "
+            "FROM snippet_search, to_tsquery('simple', :match) AS query "
+            "WHERE document @@ query"
+        ).bindparams(match=match, weights=POSTGRES_WEIGHTS)
+    else:
+        return (
+            select(Snippet.id.label("snippet_id"), literal(0.0).label("rank"))
+            .where(ilike_filter(q))
+            .subquery("search_matches")
+        )
+
+    return statement.columns(snippet_id=Integer, rank=Float).subquery("search_matches")
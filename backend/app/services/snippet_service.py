@@ -1,41 +1,128 @@
-from sqlmodel import Session
-from app.crud import crud_tag
-from app.models.models import Snippet, User
+from sqlalchemy import LargeBinary, func, inspect, insert, select, text, type_coerce, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import crud_snippet, crud_tag
+from app.core.config import settings
+from app.core.response_cache import response_cache
+from app.services import search_service, code_search_service
+from app.db import compression
+from app.models.models import CompressionDictionary, Snippet, SnippetBlob, User
 from app.schemas.schemas import SnippetCreate
 
-def create_snippet_with_tags(
-    session: Session, 
+COMPRESS_BATCH_SIZE = 500
+DICTIONARY_SAMPLE_SIZE = 2000
+
+def _blob_content_is_text(engine: Engine) -> bool:
+    """Postgres needs a bytea column for compressed bodies; SQLite stores blobs in any column."""
+    if engine.dialect.name != "postgresql":
+        return False
+    column = next(c for c in inspect(engine).get_columns("snippet_blobs") if c["name"] == "content")
+    return not isinstance(column["type"], LargeBinary)
+
+def init_snippet_storage(engine: Engine) -> None:
+    """Loads the compression dictionaries, refusing to start on an unmigrated column."""
+    if not compression.enabled():
+        return
+    if _blob_content_is_text(engine):
+        raise RuntimeError("SNIPPET_COMPRESSION is set but snippet_blobs.content is text: run `python -m app.cli compress`")
+    with engine.connect() as connection:
+        compression.dictionaries.load_all(connection)
+
+def compress_snippets(engine: Engine, train_dictionary: bool = False, batch_size: int = COMPRESS_BATCH_SIZE) -> int:
+    """
+    Migrates stored bodies to the configured codec, in batches: converts
+    the Postgres column to bytea (dropping the pg_trgm index that only
+    works on text), optionally trains a new shared dictionary from a
+    sample, then rewrites every blob not yet in the target format.
+    Idempotent; returns the number of rewritten blobs.
+    """
+    if not compression.enabled():
+        raise RuntimeError("Set SNIPPET_COMPRESSION to the target codec first")
+    codec = settings.SNIPPET_COMPRESSION
+    if _blob_content_is_text(engine):
+        with engine.begin() as connection:
+            connection.execute(text("DROP INDEX IF EXISTS ix_snippet_blobs_content_trgm"))
+            connection.execute(text(
+                "ALTER TABLE snippet_blobs ALTER COLUMN content TYPE bytea "
+                "USING decode('0000000000', 'hex') || convert_to(content, 'UTF8')"
+            ))
+    stored = type_coerce(SnippetBlob.content, LargeBinary)
+
+    with Session(engine) as session:
+        compression.dictionaries.load_all(session.connection())
+        if train_dictionary:
+            samples = session.execute(select(stored).limit(DICTIONARY_SAMPLE_SIZE)).scalars()
+            data = compression.train_dictionary(codec, (compression.decompress(value) for value in samples))
+            if not data:
+                raise RuntimeError("Not enough snippets to train a dictionary")
+            dictionary_id = session.execute(
+                insert(CompressionDictionary).values(codec=codec, data=data, created_at=func.now())
+                .returning(CompressionDictionary.id)
+            ).scalar_one()
+            session.commit()
+            compression.dictionaries.add(dictionary_id, codec, data)
+
+        target = compression.HEADER.pack(compression.CODECS[codec], compression.dictionaries.current_id)
+        rewritten, last_hash = 0, ""
+        while True:
+            rows = session.execute(
+                select(SnippetBlob.hash, stored)
+                .where(SnippetBlob.hash > last_hash)
+                .order_by(SnippetBlob.hash)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return rewritten
+            changes = [
+                {"hash": blob_hash, "content": compression.decompress(value)}
+                for blob_hash, value in rows
+                if isinstance(value, str) or bytes(value[:compression.HEADER.size]) != target
+            ]
+            if changes:
+                # Bodies the codec can't shrink stay plain; rewriting them is a no-op
+                session.execute(update(SnippetBlob), changes)
+                session.commit()
+                rewritten += len(changes)
+            last_hash = rows[-1].hash
+
+def index_snippet(session: Session, snippet: Snippet) -> None:
+    """
+    Keeps the full-text and trigram indexes of a flushed snippet in sync.
+    The index writers are sync and dialect-specific; async callers run them
+    on their connection with `await session.run_sync(index_snippet, snippet)`.
+    """
+    search_service.index_snippet(session, snippet)
+    code_search_service.index_snippet(session, snippet)
+
+def unindex_snippet(session: Session, snippet_id: int) -> None:
+    search_service.unindex_snippet(session, snippet_id)
+    code_search_service.unindex_snippet(session, snippet_id)
+
+async def create_snippet_with_tags(
+    session: AsyncSession, 
     snippet_in: SnippetCreate, 
     current_user: User
 ) -> Snippet:
     """
     Logic:
     1. Parse tag strings.
-    2. Find existing tags or create new ones.
+    2. Resolve them to tags in bulk, creating the missing ones.
     3. Save Snippet and link everything.
+    4. Index it for search in the same transaction.
     """
     
-    db_tags = []
-    for tag_name in set(snippet_in.tags):
-        clean_name = tag_name.strip().lower()
-        if not clean_name: 
-            continue 
-            
-        existing_tag = crud_tag.get_tag_by_name(session, clean_name)
-        if existing_tag:
-            db_tags.append(existing_tag)
-        else:
-            new_tag = crud_tag.create_tag(session, clean_name)
-            db_tags.append(new_tag)
+    tag_ids = await crud_tag.resolve_tag_ids(session, snippet_in.tags)
 
     snippet_data = snippet_in.model_dump(exclude={"tags"})
     
-    db_snippet = Snippet(**snippet_data)
-    db_snippet.user = current_user
-    db_snippet.tags = db_tags  
+    db_snippet = Snippet(**snippet_data, user_id=current_user.id)
 
     session.add(db_snippet)
-    session.commit()
-    session.refresh(db_snippet)
+    await session.flush()
+    await crud_tag.link_tags(session, db_snippet.id, tag_ids)
+    await session.run_sync(index_snippet, db_snippet)
+    await session.commit()
+    await response_cache.snippet_created()
     
-    return db_snippet
\ No newline at end of file
+    return await crud_snippet.get_snippet(session, db_snippet.id)
\ No newline at end of file
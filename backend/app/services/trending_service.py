@@ -0,0 +1,137 @@
+"""
+A like at time t contributes 2^((t - now) / half-life) to its snippet's
+trending score. Ordering by that sum is the same as ordering by
+2^((t - epoch) / half-life) for any fixed epoch, because the two differ by
+one common factor. So scores are stored relative to an epoch, a like only
+adds its weight to one row, and nothing has to decay per request. The
+weights of new likes grow as time moves away from the epoch. rebase()
+therefore moves the epoch forward now and then, scaling every score down
+by the same factor, before the floats can overflow.
+"""
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Union
+from sqlalchemy import case, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.models import Snippet, SnippetLike, TrendingEpoch
+
+REBUILD_BATCH_SIZE = 1000
+# Below this a snippet's likes are ~20 half-lives old; it drops out of the ranking
+MIN_SCORE = 1e-6
+
+
+def half_life_seconds() -> float:
+    return settings.TRENDING_HALF_LIFE_HOURS * 3600
+
+
+def timestamp(moment: datetime) -> float:
+    # SQLite hands back naive datetimes; they are stored in UTC
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def like_weight(liked_at: float, epoch: float) -> float:
+    return 2.0 ** ((liked_at - epoch) / half_life_seconds())
+
+
+# =======================
+# INCREMENTAL UPDATES
+# =======================
+async def lock_epoch(session: AsyncSession) -> float:
+    """
+    Reads the epoch FOR SHARE, so rebase() can't move it until the caller's
+    transaction ends, and weights computed from it stay on the stored scale.
+    (SQLite has no row locks, but its single writer serializes the two anyway.)
+    """
+    statement = select(TrendingEpoch.epoch).where(TrendingEpoch.id == 1).with_for_update(read=True)
+    return (await session.execute(statement)).scalar_one()
+
+
+def add_like(weight: float) -> dict:
+    """Update values for crud_like: the score moves with SQL-side arithmetic, like like_count."""
+    return {"trending_score": Snippet.trending_score + weight}
+
+
+def remove_like(weight: float) -> dict:
+    # Float error must not leave a tiny (or negative) score behind
+    remaining = Snippet.trending_score - weight
+    return {"trending_score": case((remaining > MIN_SCORE, remaining), else_=0.0)}
+
+
+# =======================
+# BATCH RECOMPUTATION
+# =======================
+def rebase(engine: Engine, now: Optional[float] = None) -> bool:
+    """
+    Moves the epoch to `now`, scaling every score to it in the same
+    transaction, and zeroes the scores that decayed below MIN_SCORE.
+    Safe to run from several workers at once: the conditional epoch update
+    lets exactly one of them rescale. Returns whether this call did.
+    """
+    now = time.time() if now is None else now
+    with Session(engine) as session:
+        epoch = session.execute(select(TrendingEpoch.epoch).where(TrendingEpoch.id == 1)).scalar_one()
+        if now <= epoch:
+            return False
+        moved = session.execute(
+            update(TrendingEpoch).where(TrendingEpoch.id == 1, TrendingEpoch.epoch == epoch).values(epoch=now)
+        )
+        if moved.rowcount != 1:
+            return False
+        factor = like_weight(epoch, now)
+        session.execute(
+            update(Snippet)
+            .where(Snippet.trending_score > 0)
+            .values(trending_score=case(
+                (Snippet.trending_score * factor < MIN_SCORE, 0.0), else_=Snippet.trending_score * factor
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+    return True
+
+
+def rebuild(engine: Union[Engine, Connection]) -> int:
+    """
+    Recomputes every score from snippet_likes, streaming the likes in
+    snippet order and writing the scores in batches, with the epoch reset
+    to now. Corrects any drift; returns the number of scored snippets.
+    Migrations pass their connection.
+    """
+    now = time.time()
+    with Session(engine) as session:
+        session.execute(
+            update(Snippet).where(Snippet.trending_score != 0).values(trending_score=0.0)
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(update(TrendingEpoch).where(TrendingEpoch.id == 1).values(epoch=now))
+
+        scores: Dict[int, float] = {}
+        scored = 0
+        likes = session.execute(
+            select(SnippetLike.snippet_id, SnippetLike.liked_at)
+            .order_by(SnippetLike.snippet_id)
+            .execution_options(yield_per=REBUILD_BATCH_SIZE * 10)
+        )
+        for snippet_id, liked_at in likes:
+            if snippet_id not in scores and len(scores) >= REBUILD_BATCH_SIZE:
+                _write_scores(session, scores)
+                scored += len(scores)
+                scores = {}
+            scores[snippet_id] = scores.get(snippet_id, 0.0) + like_weight(timestamp(liked_at), now)
+        _write_scores(session, scores)
+        session.commit()
+    return scored + len(scores)
+
+
+def _write_scores(session: Session, scores: Dict[int, float]) -> None:
+    if scores:
+        session.execute(
+            update(Snippet),
+            [{"id": snippet_id, "trending_score": score} for snippet_id, score in scores.items()],
+        )
+
@@ -0,0 +1,80 @@
+"""
+Storage size and codec cost of compressed snippet bodies.
+
+Usage (from backend/):
+    python -m benchmarks.bench_compression --snippets 5000
+
+Cuts real Python source (this app and the standard library) into
+snippet-sized chunks, trains a dictionary on a part of them and compresses
+the rest, so the dictionary is never measured on its own samples. zstd is
+included when the optional 'zstandard' package is installed.
+"""
+import os
+import random
+import argparse
+import sysconfig
+import time
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.db import compression
+
+
+def load_snippets(count: int, rng: random.Random):
+    roots = [Path(__file__).resolve().parent.parent / "app", Path(sysconfig.get_paths()["stdlib"])]
+    files = sorted(path for root in roots for path in root.rglob("*.py") if "test" not in path.parts)
+    snippets = []
+    for path in rng.sample(files, min(len(files), count)):
+        lines = path.read_text(encoding="utf-8", errors="replace").splitlines(keepends=True)
+        if len(lines) < 5:
+            continue
+        size = rng.randint(5, 60)
+        start = rng.randrange(max(len(lines) - size, 1))
+        snippets.append("".join(lines[start:start + size]))
+    return snippets
+
+
+def measure(label, snippets, codec, dictionary_id):
+    start = time.perf_counter()
+    stored = [compression.compress(snippet, codec, dictionary_id) for snippet in snippets]
+    compress_us = (time.perf_counter() - start) / len(snippets) * 1e6
+    start = time.perf_counter()
+    for value in stored:
+        compression.decompress(value)
+    decompress_us = (time.perf_counter() - start) / len(snippets) * 1e6
+
+    raw = sum(len(snippet.encode()) for snippet in snippets)
+    size = sum(len(value) for value in stored)
+    print(f"{label:<14}{raw / size:>7.2f}x{size / len(snippets):>10.0f} B{compress_us:>10.1f} us{decompress_us:>10.1f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snippets", type=int, default=5000)
+    parser.add_argument("--training", type=int, default=1000, help="snippets used to train dictionaries")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    snippets = load_snippets(args.snippets + args.training, random.Random(args.seed))
+    training, snippets = snippets[:args.training], snippets[args.training:]
+    average = sum(len(snippet.encode()) for snippet in snippets) / len(snippets)
+    print(f"{len(snippets)} snippets, {average:.0f} B on average\n")
+    print(f"{'codec':<14}{'ratio':>8}{'stored':>12}{'compress':>13}{'decompress':>13}")
+
+    codecs = ["zlib"]
+    try:
+        compression._zstd()
+        codecs.append("zstd")
+    except RuntimeError:
+        print("(zstandard not installed, skipping zstd)")
+    for dictionary_id, codec in enumerate(codecs, start=1):
+        compression.dictionaries.add(dictionary_id, codec, compression.train_dictionary(codec, training))
+        measure(codec, snippets, codec, 0)
+        measure(f"{codec}+dict", snippets, codec, dictionary_id)
+
+
+if __name__ == "__main__":
+    main()
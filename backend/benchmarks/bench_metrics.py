@@ -0,0 +1,98 @@
+"""
+Overhead of the request metrics (MetricsMiddleware, SQL timers, mmap counters).
+
+Usage (from backend/):
+    python -m benchmarks.bench_metrics --requests 5000
+
+Times recording one request in the shared counters, one SQL statement with
+and without a request being timed, and whole in-process requests (the root
+endpoint and the cached feed) with metrics enabled and disabled.
+"""
+import os
+import asyncio
+import argparse
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+os.environ["METRICS_DIR"] = tempfile.mkdtemp()
+os.environ["RATELIMIT_ENABLED"] = "false"
+
+from sqlalchemy import create_engine, text
+from app.core import metrics as metrics_module
+from app.core.metrics import RequestTimings, metrics
+from app.main import app, lifespan
+
+
+def per_call_us(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def statement_us(calls: int, timed: bool) -> float:
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        statement = text("SELECT 1")
+        token = metrics_module._current_timings.set(RequestTimings() if timed else None)
+        try:
+            return per_call_us(lambda: conn.execute(statement), calls)
+        finally:
+            metrics_module._current_timings.reset(token)
+
+
+async def request_us(path: str, requests: int) -> float:
+    """Calls the ASGI app directly, so no HTTP client or server cost is counted."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(dict(scope), receive, send)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def requests_us(requests: int) -> dict:
+    results = {}
+    async with lifespan(app):
+        for path in ("/", "/api/v1/snippets/"):
+            # Alternated, so warm-up doesn't favour either
+            for enabled in (True, False, True, False):
+                metrics.enabled = enabled
+                results[path, enabled] = await request_us(path, requests)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--statements", type=int, default=20000)
+    args = parser.parse_args()
+
+    timings = RequestTimings()
+    record = per_call_us(lambda: metrics.observe_request("GET", "/api/v1/snippets/", 200, 0.012, timings), 100_000)
+    print(f"{'record one request':<34}{record:>8.2f} us")
+    plain, timed = statement_us(args.statements, False), statement_us(args.statements, True)
+    print(f"{'SELECT 1, no request':<34}{plain:>8.2f} us")
+    print(f"{'SELECT 1, timed for a request':<34}{timed:>8.2f} us")
+
+    print()
+    for (path, enabled), us in asyncio.run(requests_us(args.requests)).items():
+        print(f"{'GET ' + path + (' (metrics)' if enabled else ''):<34}{us:>8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
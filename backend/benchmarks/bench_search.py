@@ -0,0 +1,105 @@
+"""
+Full-text index vs. the old ILIKE scan.
+
+Usage (from backend/):
+    python -m benchmarks.bench_search --snippets 20000 --queries 200
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import os
+import random
+import argparse
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db import migrations
+from app.models.models import Snippet, User
+from app.services import search_service
+
+WORDS = [
+    "parse", "token", "user", "session", "cache", "query", "index", "render",
+    "request", "response", "buffer", "stream", "config", "handler", "router",
+    "worker", "socket", "payload", "schema", "client", "server", "retry",
+]
+
+
+def random_identifier(rng: random.Random) -> str:
+    parts = rng.sample(WORDS, rng.randint(1, 3))
+    if rng.random() < 0.5:
+        return "_".join(parts)
+    return parts[0] + "".join(p.title() for p in parts[1:])
+
+
+def random_code(rng: random.Random, lines: int) -> str:
+    return "\n".join(
+        f"    {random_identifier(rng)} = {random_identifier(rng)}({random_identifier(rng)})"
+        for _ in range(lines)
+    )
+
+
+def seed(engine, count: int, rng: random.Random) -> None:
+    with Session(engine) as session:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        session.add(user)
+        session.flush()
+        for i in range(count):
+            snippet = Snippet(
+                title=f"{random_identifier(rng)} #{i}",
+                code_content=random_code(rng, 40),
+                language="python",
+                user_id=user.id,
+            )
+            session.add(snippet)
+            session.flush()
+            search_service.index_snippet(session, snippet)
+            if i % 1000 == 0:
+                session.commit()
+        session.commit()
+
+
+def timed(label: str, run, queries) -> None:
+    start = time.perf_counter()
+    hits = sum(run(q) for q in queries)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed / len(queries) * 1000:8.2f} ms/query  ({hits} total hits)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snippets", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    engine = create_engine(settings.DATABASE_URL)
+    migrations.upgrade(engine)
+    seed(engine, args.snippets, rng)
+    queries = [random_identifier(rng) for _ in range(args.queries)]
+
+    with Session(engine) as session:
+        def ilike(q: str) -> int:
+            statement = (
+                select(Snippet.id).where(search_service.ilike_filter(q))
+                .order_by(Snippet.created_at.desc()).limit(20)
+            )
+            return len(session.execute(statement).all())
+
+        def fulltext(q: str) -> int:
+            matches = search_service.ranked_matches(session, q)
+            statement = select(matches.c.snippet_id).order_by(matches.c.rank).limit(20)
+            return len(session.execute(statement).all())
+
+        print(f"{args.snippets} snippets, {args.queries} queries, top 20")
+        timed("ilike", ilike, queries)
+        timed("fulltext", fulltext, queries)
+
+
+if __name__ == "__main__":
+    main()
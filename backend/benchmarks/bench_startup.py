@@ -0,0 +1,123 @@
+"""
+Worker startup: import time of app.main and time to the first 200.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --runs 5 [--import-budget-ms 1000] [--first-response-budget-ms 3000]
+
+Import time is app.main's cumulative time from `python -X importtime`, with
+its heaviest direct imports. Time to first 200 spawns uvicorn on a throwaway
+SQLite database (already migrated, so the worker only verifies the schema)
+and polls the public feed until it answers. Medians of --runs; exits with 1
+when a median is over its budget, so CI can track both.
+"""
+import os
+import re
+import sys
+import socket
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Tuple
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+os.environ["DB_SCHEMA_MODE"] = "verify"
+
+from sqlalchemy import create_engine
+from app.core.config import settings
+from app.db import migrations
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+FIRST_RESPONSE_TIMEOUT_SECONDS = 30
+
+
+def measure_import() -> Tuple[float, Dict[str, float]]:
+    """app.main's cumulative import time and that of each of its direct imports, in ms."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    total, children = 0.0, {}
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        # Direct imports are listed, indented one level, before app.main itself
+        if len(indent) == 2:
+            children[name] = int(cumulative) / 1000
+        elif not indent and name == "app.main":
+            total = int(cumulative) / 1000
+        elif not indent:
+            children = {}
+    return total, children
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response() -> float:
+    """ms from spawning a uvicorn worker to its first 200."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{settings.API_V1_STR}/snippets/"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < FIRST_RESPONSE_TIMEOUT_SECONDS:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {server.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.005)
+        raise RuntimeError(f"no 200 from {url} within {FIRST_RESPONSE_TIMEOUT_SECONDS}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(label: str, samples: List[float], budget: float) -> bool:
+    median = statistics.median(samples)
+    within = budget <= 0 or median <= budget
+    verdict = "" if budget <= 0 else f"  (budget {budget:.0f} ms: {'ok' if within else 'OVER'})"
+    print(f"{label:<22}{median:>8.0f} ms median, {min(samples):.0f}-{max(samples):.0f}{verdict}")
+    return within
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="heaviest direct imports to list")
+    parser.add_argument("--import-budget-ms", type=float, default=1000, help="0 disables the check")
+    parser.add_argument("--first-response-budget-ms", type=float, default=3000, help="0 disables the check")
+    args = parser.parse_args()
+
+    migrations.upgrade(create_engine(settings.DATABASE_URL))
+
+    imports = [measure_import() for _ in range(args.runs)]
+    first_responses = [measure_first_response() for _ in range(args.runs)]
+
+    within = report("import app.main", [total for total, _ in imports], args.import_budget_ms)
+    within &= report("time to first 200", first_responses, args.first_response_budget_ms)
+    print("\nheaviest imports of app.main (last run):")
+    for name, ms in sorted(imports[-1][1].items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<32}{ms:>8.1f} ms")
+    return 0 if within else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Tag autocomplete from the in-memory prefix index vs. a LIKE query per keystroke.
+
+Usage (from backend/):
+    python -m benchmarks.bench_tag_suggest --tags 50000
+
+Builds a throwaway SQLite database of made-up tag names with heavy-tailed
+usage counts, loads crud_tag.tag_index from it, then times both lookups over
+the prefixes a user types (1 to 4 characters of existing names).
+"""
+import os
+import random
+import argparse
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from sqlalchemy import create_engine, insert, text
+from app.core.config import settings
+from app.crud import crud_tag
+from app.db import migrations
+from app.models.models import Tag, TagStat
+
+SYLLABLES = ["py", "js", "go", "re", "act", "dj", "ango", "node", "ty", "pe", "sql", "lite", "web", "api",
+             "ml", "data", "test", "ci", "dev", "ops", "rust", "ca", "che", "async", "io", "net", "cl", "oud"]
+LIKE = text(
+    "SELECT tags.name, tag_stats.snippet_count FROM tags JOIN tag_stats ON tag_stats.tag_id = tags.id "
+    "WHERE tags.name LIKE :pattern ORDER BY tag_stats.snippet_count DESC, tags.name LIMIT :k"
+)
+
+
+def populate(engine, tags: int, rng: random.Random) -> list:
+    names = set()
+    while len(names) < tags:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))) + str(rng.randint(0, 99)))
+    names = sorted(names)
+    with engine.begin() as conn:
+        conn.execute(insert(Tag), [{"name": name} for name in names])
+        conn.execute(insert(TagStat), [
+            {"tag_id": tag_id, "snippet_count": int(1000 * rng.random() ** 6)}
+            for tag_id in range(1, tags + 1)
+        ])
+    return names
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tags", type=int, default=50_000)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--prefixes", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    engine = create_engine(settings.DATABASE_URL)
+    migrations.upgrade(engine)
+    names = populate(engine, args.tags, rng)
+    prefixes = [name[:rng.randint(1, 4)] for name in rng.sample(names, args.prefixes)]
+
+    started = time.perf_counter()
+    crud_tag.refresh_tag_index(engine)
+    print(f"{args.tags} tags, index loaded in {(time.perf_counter() - started) * 1000:.0f}ms\n")
+
+    started = time.perf_counter()
+    from_index = [crud_tag.tag_index.suggest(prefix, args.top) for prefix in prefixes]
+    index_us = (time.perf_counter() - started) / len(prefixes) * 1e6
+
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        from_db = [
+            [tuple(row) for row in conn.execute(LIKE, {"pattern": f"{prefix}%", "k": args.top})]
+            for prefix in prefixes
+        ]
+        like_us = (time.perf_counter() - started) / len(prefixes) * 1e6
+
+    print(f"{'prefix index':<24}{index_us:>10.1f} us")
+    print(f"{'LIKE per keystroke':<24}{like_us:>10.1f} us")
+    print(f"same suggestions: {from_index == from_db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Trending top-K from stored scores vs. aggregating the likes per request.
+
+Usage (from backend/):
+    python -m benchmarks.bench_trending --likes 1000000 --snippets 20000
+
+Builds a throwaway SQLite database (snippet popularity is heavy-tailed,
+likes are spread over two weeks), computes the stored scores with
+trending_service.rebuild, then times both top-K queries.
+"""
+import os
+import math
+import random
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from sqlalchemy import create_engine, insert, text
+from app.core.config import settings
+from app.db import migrations
+from app.models.models import Snippet, SnippetBlob, SnippetLike, User
+from app.services import trending_service
+
+STORED = text(
+    "SELECT id FROM snippets WHERE trending_score > 0 "
+    "ORDER BY trending_score DESC, id DESC LIMIT :k"
+)
+# What a popular feed without stored scores has to do on every request
+ON_THE_FLY = text(
+    "SELECT snippet_id FROM snippet_likes GROUP BY snippet_id "
+    "ORDER BY SUM(exp((julianday(liked_at) - julianday(:now)) * 86400 * :rate)) DESC, snippet_id DESC "
+    "LIMIT :k"
+)
+
+
+def populate(engine, snippets: int, users: int, likes: int, rng: random.Random) -> None:
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(SnippetBlob), [{"hash": "0" * 64, "content": "pass", "ref_count": snippets}])
+        conn.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x",
+             "reputation_stars": 0, "is_active": True, "created_at": now}
+            for i in range(users)
+        ])
+        conn.execute(insert(Snippet), [
+            {"title": f"snippet {i}", "language": "python", "content_hash": "0" * 64, "user_id": 1,
+             "created_at": now, "updated_at": now, "like_count": 0, "preview": "pass", "trending_score": 0.0}
+            for i in range(snippets)
+        ])
+
+        pairs = set()
+        while len(pairs) < likes:
+            # Skewed toward low ids: a few popular snippets and a long tail
+            snippet_id = int(snippets * rng.random() ** 3) + 1
+            pairs.add((rng.randint(1, users), snippet_id))
+        rows = [
+            {"user_id": user_id, "snippet_id": snippet_id,
+             "liked_at": now - timedelta(seconds=rng.uniform(0, 14 * 86400))}
+            for user_id, snippet_id in pairs
+        ]
+        for start in range(0, len(rows), 50_000):
+            conn.execute(insert(SnippetLike), rows[start:start + 50_000])
+
+
+def timed(conn, statement, params, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = conn.execute(statement, params).scalars().all()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--likes", type=int, default=1_000_000)
+    parser.add_argument("--snippets", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_URL)
+    migrations.upgrade(engine)
+    started = time.perf_counter()
+    populate(engine, args.snippets, args.users, args.likes, random.Random(args.seed))
+    print(f"{args.likes} likes on {args.snippets} snippets, loaded in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    trending_service.rebuild(engine)
+    print(f"rebuild (full recompute): {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    trending_service.rebase(engine, time.time() + 3600)
+    print(f"rebase (periodic rescale): {(time.perf_counter() - started) * 1000:.1f}ms\n")
+
+    rate = math.log(2) / trending_service.half_life_seconds()
+    with engine.connect() as conn:
+        plan = conn.execute(text("EXPLAIN QUERY PLAN " + STORED.text), {"k": args.top}).all()
+        stored_ms, stored = timed(conn, STORED, {"k": args.top}, args.repeat)
+        params = {"k": args.top, "now": datetime.now(timezone.utc), "rate": rate}
+        naive_ms, naive = timed(conn, ON_THE_FLY, params, max(args.repeat // 10, 1))
+
+    print(f"{'stored scores':<24}{stored_ms:>10.3f} ms   ({plan[-1][-1]})")
+    print(f"{'aggregate per request':<24}{naive_ms:>10.3f} ms")
+    print(f"same top {args.top}: {stored == naive}")
+
+
+if __name__ == "__main__":
+    main()
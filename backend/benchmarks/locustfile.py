@@ -0,0 +1,83 @@
+"""
+Load test for the request path at high concurrency (sync vs. async stack).
+
+Needs the dev requirements (locust). Unlike ../locustfile.py, which checks
+the rate limits, this one measures throughput. Use Postgres, since the
+sync/async difference is waiting on the database, and switch off the rate
+limiter and response cache so each request reaches the database:
+
+    export RATELIMIT_ENABLED=false RESPONSE_CACHE_BACKEND=none
+    uvicorn app.main:app --workers 1 --port 8000
+
+    locust -f benchmarks/locustfile.py --host http://localhost:8000 \\
+        --headless -u 500 -r 50 -t 2m --csv results/async
+
+For the comparison, check out the commit before the async change, start it
+the same way, and rerun with `--csv results/sync`. The `*_stats.csv` files
+give requests/s and latency percentiles for each endpoint.
+
+Measured on one CPU shared by uvicorn, locust and PostgreSQL 16 (2 min,
+one worker), sync = the commit before the change, async = the change:
+
+    users  stack  req/s  p50 ms  p95 ms  failures
+    50     sync   159    140     250     0
+    50     async  150    150     350     0
+    200    sync   4      2900    94000   210 (QueuePool timeouts)
+    200    async  77     1600    4800    280 (QueuePool timeouts while signing up)
+
+With spare connections the two stacks serve about the same. Once requests
+outnumber the pool (5 + 10 overflow), sync workers block their threads
+waiting for a connection, and with 200 users none got past sign-up. The
+async worker timed out some sign-ups too, since bcrypt holds a connection,
+but it kept serving the feed.
+"""
+import uuid
+import random
+from locust import HttpUser, between, task
+
+API = "/api/v1"
+
+
+class FeedReader(HttpUser):
+    """Mostly reads (feed pages, single snippets, search) with some likes."""
+
+    wait_time = between(0.05, 0.2)
+
+    def on_start(self):
+        # Leaves the auth cookies in the client's cookie jar
+        email = f"load_{uuid.uuid4().hex[:12]}@example.com"
+        self.client.get(f"{API}/auth/csrf")
+        self.client.headers["X-CSRF-Token"] = self.client.cookies.get("csrf_token", "")
+        self.client.post(
+            f"{API}/auth/register",
+            json={"email": email, "username": email, "password": "loadtest-password"},
+        )
+        self.client.headers["X-CSRF-Token"] = self.client.cookies.get("csrf_token", "")
+        self.snippet_ids = []
+        for i in range(3):
+            response = self.client.post(
+                f"{API}/snippets/",
+                json={"title": f"load test {i}", "code_content": "def handler(request):\n    return request\n"},
+                name=f"{API}/snippets/ [create]",
+            )
+            if response.status_code == 201:
+                self.snippet_ids.append(response.json()["id"])
+
+    @task(10)
+    def feed(self):
+        self.client.get(f"{API}/snippets/?limit=20", name=f"{API}/snippets/ [feed]")
+
+    @task(4)
+    def read_snippet(self):
+        if self.snippet_ids:
+            snippet_id = random.choice(self.snippet_ids)
+            self.client.get(f"{API}/snippets/{snippet_id}", name=f"{API}/snippets/[id]")
+
+    @task(3)
+    def search(self):
+        self.client.get(f"{API}/snippets/search?q=handler", name=f"{API}/snippets/search")
+
+    @task(1)
+    def like(self):
+        if self.snippet_ids:
+            self.client.post(f"{API}/snippets/{self.snippet_ids[0]}/like", name=f"{API}/snippets/[id]/like")
@@ -0,0 +1,47 @@
+"""
+Runs the migrations on settings.DATABASE_URL, or on the connection that
+app.db.migrations passes in when it upgrades the schema at startup.
+"""
+from logging.config import fileConfig
+from alembic import context
+from app.core.config import settings
+from app.models.models import SQLModel
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    # The full-text search tables are created with raw SQL and have no model
+    return not (type_ == "table" and reflected and compare_to is None)
+
+
+def run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+elif config.attributes.get("connection") is not None:
+    run_migrations(config.attributes["connection"])
+else:
+    from app.db.session import engine
+    with engine.connect() as connection:
+        run_migrations(connection)
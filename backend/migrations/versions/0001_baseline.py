@@ -0,0 +1,400 @@
+"""baseline
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+The schema the app used to build at startup with create_all and its
+init_* upgrades. An empty database gets every table and index. A
+database created before migrations gets the tables, columns and indexes
+it is missing, and its data is carried over in online batches.
+
+It runs no app code besides reading the settings: the helpers below are
+copies of the app's as of this revision, so later changes to the app
+don't change what it does. Bodies are stored as text; 0005 converts them for
+SNIPPET_COMPRESSION.
+"""
+import re
+import time
+import zlib
+import struct
+import hashlib
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence, Union
+import sqlalchemy as sa
+from alembic import context, op
+from app.core.config import settings
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+PREVIEW_LINES = 10
+PREVIEW_MAX_CHARS = 1000
+# Stored body layout: 1 codec byte (0 plain, 1 zlib, 2 zstd), 4-byte dictionary id, payload
+BODY_HEADER = struct.Struct(">BI")
+IDENTIFIER_RE = re.compile(r"[A-Za-z0-9_]+")
+CAMEL_PART_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z0-9]+")
+
+INDEXES = [
+    ("ix_users_username", "users", ["username"], True),
+    ("ix_users_email", "users", ["email"], True),
+    ("ix_users_created_at_id", "users", ["created_at", "id"], False),
+    ("ix_tags_name", "tags", ["name"], True),
+    ("ix_tag_stats_snippet_count_tag_id", "tag_stats", ["snippet_count", "tag_id"], False),
+    ("ix_snippets_title", "snippets", ["title"], False),
+    ("ix_snippets_created_at_id", "snippets", ["created_at", "id"], False),
+    ("ix_snippets_content_hash_user_id", "snippets", ["content_hash", "user_id"], False),
+    ("ix_snippets_trending_score_id", "snippets", ["trending_score", "id"], False),
+    ("ix_snippet_tag_links_tag_id_snippet_id", "snippet_tag_links", ["tag_id", "snippet_id"], False),
+    ("ix_snippet_trigrams_snippet_id", "snippet_trigrams", ["snippet_id"], False),
+]
+
+
+def _create_tables(existing: set) -> None:
+    tables = {
+        "users": lambda: op.create_table(
+            "users",
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("reputation_stars", sa.Integer(), nullable=False),
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        ),
+        "tags": lambda: op.create_table(
+            "tags",
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("id", sa.Integer(), primary_key=True),
+        ),
+        "compression_dictionaries": lambda: op.create_table(
+            "compression_dictionaries",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("codec", sa.String(), nullable=False),
+            sa.Column("data", sa.LargeBinary(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        ),
+        "snippet_blobs": lambda: op.create_table(
+            "snippet_blobs",
+            sa.Column("hash", sa.String(length=64), primary_key=True),
+            sa.Column("content", sa.String(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False),
+        ),
+        "trending_epoch": lambda: op.create_table(
+            "trending_epoch",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column("epoch", sa.Float(), nullable=False),
+        ),
+        "snippets": lambda: op.create_table(
+            "snippets",
+            sa.Column("title", sa.String(), nullable=False),
+            sa.Column("language", sa.String(), nullable=False),
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("content_hash", sa.String(), sa.ForeignKey("snippet_blobs.hash"), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column("like_count", sa.Integer(), nullable=False),
+            sa.Column("trending_score", sa.Float(), nullable=False),
+            sa.Column("preview", sa.String(), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        ),
+        "tag_stats": lambda: op.create_table(
+            "tag_stats",
+            sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tags.id"), primary_key=True, autoincrement=False),
+            sa.Column("snippet_count", sa.Integer(), nullable=False),
+        ),
+        "snippet_likes": lambda: op.create_table(
+            "snippet_likes",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("snippet_id", sa.Integer(), sa.ForeignKey("snippets.id"), primary_key=True),
+            sa.Column("liked_at", sa.DateTime(), nullable=False),
+        ),
+        "snippet_tag_links": lambda: op.create_table(
+            "snippet_tag_links",
+            sa.Column("snippet_id", sa.Integer(), sa.ForeignKey("snippets.id"), primary_key=True),
+            sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tags.id"), primary_key=True),
+        ),
+        "snippet_trigrams": lambda: op.create_table(
+            "snippet_trigrams",
+            sa.Column("trigram", sa.String(), primary_key=True),
+            sa.Column("snippet_id", sa.Integer(), sa.ForeignKey("snippets.id"), primary_key=True),
+        ),
+    }
+    for name, create in tables.items():
+        if name not in existing:
+            create()
+
+
+# =======================
+# FROZEN HELPERS
+# =======================
+def _backfill(engine, fetch_batch, write_batch) -> None:
+    """fetch_batch(connection, last_id) returns id-ordered rows, id first; each batch commits on its own."""
+    last_id = 0
+    while True:
+        with engine.begin() as connection:
+            rows = fetch_batch(connection, last_id)
+            if not rows:
+                return
+            write_batch(connection, rows)
+        last_id = rows[-1][0]
+
+
+def _load_dictionaries(connection) -> Dict[int, bytes]:
+    rows = connection.execute(sa.text("SELECT id, data FROM compression_dictionaries")).all()
+    return {dictionary_id: bytes(data) for dictionary_id, data in rows}
+
+
+def _body_text(stored, dictionaries: Dict[int, bytes]) -> str:
+    """A stored body as text: text as it is, compressed bytes decompressed."""
+    if isinstance(stored, str):
+        return stored
+    stored = bytes(stored)
+    codec, dictionary_id = BODY_HEADER.unpack_from(stored)
+    payload = stored[BODY_HEADER.size:]
+    zdict = dictionaries[dictionary_id] if dictionary_id else None
+    if codec == 0:
+        return payload.decode("utf-8")
+    if codec == 2:
+        import zstandard
+        params = {"dict_data": zstandard.ZstdCompressionDict(zdict)} if zdict else {}
+        return zstandard.ZstdDecompressor(**params).decompress(payload).decode("utf-8")
+    decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+    return (decompressor.decompress(payload) + decompressor.flush()).decode("utf-8")
+
+
+def _normalize(body: str) -> str:
+    return body.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _preview(body: str) -> str:
+    return "\n".join(body.split("\n", PREVIEW_LINES)[:PREVIEW_LINES])[:PREVIEW_MAX_CHARS]
+
+
+def _tokenize(content: str) -> List[str]:
+    """Identifiers whole and, when snake_case or camelCase, also in parts, lowercased."""
+    tokens: List[str] = []
+    for identifier in IDENTIFIER_RE.findall(content):
+        whole = identifier.replace("_", "").lower()
+        if not whole:
+            continue
+        tokens.append(whole)
+        parts = [part.lower() for chunk in identifier.split("_") if chunk for part in CAMEL_PART_RE.findall(chunk)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def _content_is_binary(connection) -> bool:
+    column = next(c for c in sa.inspect(connection).get_columns("snippet_blobs") if c["name"] == "content")
+    return isinstance(column["type"], sa.LargeBinary)
+
+
+# =======================
+# DATABASES FROM BEFORE MIGRATIONS
+# =======================
+def _move_code_to_blobs(connection) -> None:
+    """code_content used to be a column of snippets; bodies now live in shared snippet_blobs rows."""
+    columns = {column["name"] for column in sa.inspect(connection).get_columns("snippets")}
+    if "content_hash" not in columns:
+        op.execute("ALTER TABLE snippets ADD COLUMN content_hash VARCHAR(64) REFERENCES snippet_blobs(hash)")
+    dictionaries = _load_dictionaries(connection)
+    # A compressed snippet_blobs table from before migrations takes plain bodies behind the header
+    binary = _content_is_binary(connection)
+
+    def fetch(conn, last_id):
+        # Text, or compressed bytes if the column was compressed in place
+        return conn.execute(sa.text(
+            "SELECT id, code_content FROM snippets WHERE content_hash IS NULL AND id > :last_id "
+            "ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).all()
+
+    def write(conn, rows):
+        bodies = [_normalize(_body_text(body, dictionaries)) for _, body in rows]
+        hashes = [hashlib.sha256(body.encode("utf-8")).hexdigest() for body in bodies]
+        contents = {
+            blob_hash: BODY_HEADER.pack(0, 0) + body.encode("utf-8") if binary else body
+            for blob_hash, body in zip(hashes, bodies)
+        }
+        conn.execute(sa.text(
+            "INSERT INTO snippet_blobs (hash, content, ref_count) VALUES (:hash, :content, :ref_count) "
+            "ON CONFLICT (hash) DO UPDATE SET ref_count = snippet_blobs.ref_count + excluded.ref_count"
+        ), [
+            {"hash": blob_hash, "content": contents[blob_hash], "ref_count": count}
+            for blob_hash, count in Counter(hashes).items()
+        ])
+        conn.execute(
+            sa.text("UPDATE snippets SET content_hash = :content_hash WHERE id = :id"),
+            [{"id": snippet_id, "content_hash": blob_hash} for (snippet_id, _), blob_hash in zip(rows, hashes)],
+        )
+
+    with op.get_context().autocommit_block():
+        _backfill(connection.engine, fetch, write)
+    op.drop_column("snippets", "code_content")
+    if connection.dialect.name == "postgresql":
+        op.alter_column("snippets", "content_hash", nullable=False)
+
+
+def _fill_previews(connection) -> None:
+    dictionaries = _load_dictionaries(connection)
+
+    def fetch(conn, last_id):
+        return conn.execute(sa.text(
+            "SELECT snippets.id, snippet_blobs.content FROM snippets "
+            "JOIN snippet_blobs ON snippet_blobs.hash = snippets.content_hash "
+            "WHERE snippets.preview = '' AND snippets.id > :last_id ORDER BY snippets.id LIMIT :limit"
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).all()
+
+    def write(conn, rows):
+        conn.execute(
+            sa.text("UPDATE snippets SET preview = :preview WHERE id = :id"),
+            [
+                {"id": snippet_id, "preview": _preview(_body_text(content, dictionaries))}
+                for snippet_id, content in rows
+            ],
+        )
+
+    with op.get_context().autocommit_block():
+        _backfill(connection.engine, fetch, write)
+
+
+def _adopt_legacy_snippets(connection) -> bool:
+    """Adds the snippets columns of the later startup upgrades; returns whether scores need a rebuild."""
+    columns = {column["name"] for column in sa.inspect(connection).get_columns("snippets")}
+    if "code_content" in columns:
+        _move_code_to_blobs(connection)
+    rescore = "trending_score" not in columns
+    if rescore:
+        op.add_column("snippets", sa.Column("trending_score", sa.Float(), nullable=False, server_default="0"))
+    if "preview" not in columns:
+        op.add_column("snippets", sa.Column("preview", sa.String(), nullable=False, server_default=""))
+        _fill_previews(connection)
+    return rescore
+
+
+# =======================
+# SEARCH INDEXES
+# =======================
+def _create_search_indexes(connection) -> None:
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS snippet_search USING fts5(title, body, tokenize='unicode61')"
+        )
+    elif dialect == "postgresql":
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS snippet_search ("
+            "snippet_id INTEGER PRIMARY KEY REFERENCES snippets(id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_snippet_search_document ON snippet_search USING GIN (document)")
+        # pg_trgm indexes text, so not the bytea of compressed bodies; without it the trigram table is used
+        if not context.is_offline_mode():
+            try:
+                with connection.begin_nested():
+                    connection.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                    connection.execute(sa.text(
+                        "CREATE INDEX IF NOT EXISTS ix_snippet_blobs_content_trgm "
+                        "ON snippet_blobs USING GIN (content gin_trgm_ops)"
+                    ))
+            except sa.exc.DBAPIError:
+                pass
+
+
+def _rebuild_trending(connection) -> None:
+    """Every score from snippet_likes: 2^((liked_at - epoch) / half-life) per like, with the epoch reset to now."""
+    now = time.time()
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+    scores: Dict[int, float] = {}
+    for snippet_id, liked_at in connection.execute(sa.text("SELECT snippet_id, liked_at FROM snippet_likes")):
+        # SQLite hands back text; both keep UTC without a time zone
+        if isinstance(liked_at, str):
+            liked_at = datetime.fromisoformat(liked_at)
+        liked_at = liked_at.replace(tzinfo=timezone.utc).timestamp()
+        scores[snippet_id] = scores.get(snippet_id, 0.0) + 2.0 ** ((liked_at - now) / half_life)
+
+    connection.execute(sa.text("UPDATE snippets SET trending_score = 0 WHERE trending_score <> 0"))
+    connection.execute(sa.text("UPDATE trending_epoch SET epoch = :epoch WHERE id = 1"), {"epoch": now})
+    rows = [{"id": snippet_id, "score": score} for snippet_id, score in scores.items()]
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(
+            sa.text("UPDATE snippets SET trending_score = :score WHERE id = :id"), rows[start:start + BATCH_SIZE]
+        )
+
+
+def _index_search_documents(connection) -> None:
+    dialect = connection.dialect.name
+    dictionaries = _load_dictionaries(connection)
+    if dialect == "sqlite":
+        statement = sa.text("INSERT INTO snippet_search (rowid, title, body) VALUES (:id, :title, :body)")
+    else:
+        statement = sa.text(
+            "INSERT INTO snippet_search (snippet_id, document) VALUES ("
+            ":id, setweight(to_tsvector('simple', :title), 'A') "
+            "|| setweight(to_tsvector('simple', :body), 'B'))"
+        )
+
+    def fetch(conn, last_id):
+        return conn.execute(sa.text(
+            "SELECT snippets.id, snippets.title, snippet_blobs.content FROM snippets "
+            "JOIN snippet_blobs ON snippet_blobs.hash = snippets.content_hash "
+            "WHERE snippets.id > :last_id ORDER BY snippets.id LIMIT :limit"
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).all()
+
+    def write(conn, rows):
+        conn.execute(statement, [
+            {
+                "id": snippet_id,
+                "title": " ".join(_tokenize(title)),
+                "body": " ".join(_tokenize(_body_text(content, dictionaries))),
+            }
+            for snippet_id, title, content in rows
+        ])
+
+    _backfill(connection.engine, fetch, write)
+
+
+def _fill_derived_data(connection, rescore: bool) -> None:
+    """Counts, scores and search documents of existing rows; nothing to do on an empty database."""
+    def empty(table: str) -> bool:
+        return connection.execute(sa.text(f"SELECT 1 FROM {table} LIMIT 1")).first() is None
+
+    if empty("tag_stats"):
+        op.execute(
+            "INSERT INTO tag_stats (tag_id, snippet_count) "
+            "SELECT tag_id, COUNT(*) FROM snippet_tag_links GROUP BY tag_id"
+        )
+    if empty("trending_epoch"):
+        op.bulk_insert(sa.table("trending_epoch", sa.column("id"), sa.column("epoch")), [{"id": 1, "epoch": time.time()}])
+        rescore = True
+
+    with op.get_context().autocommit_block():
+        if rescore and not empty("snippet_likes"):
+            _rebuild_trending(connection)
+        if connection.dialect.name in ("sqlite", "postgresql") and empty("snippet_search") and not empty("snippets"):
+            _index_search_documents(connection)
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    existing = set() if context.is_offline_mode() else set(sa.inspect(connection).get_table_names())
+    _create_tables(existing)
+    rescore = "snippets" in existing and _adopt_legacy_snippets(connection)
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+    _create_search_indexes(connection)
+    if not context.is_offline_mode():
+        _fill_derived_data(connection, rescore)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS snippet_search")
+    for name in (
+        "snippet_trigrams", "snippet_tag_links", "snippet_likes", "tag_stats", "snippets", "trending_epoch",
+        "snippet_blobs", "compression_dictionaries", "tags", "users",
+    ):
+        op.drop_table(name)
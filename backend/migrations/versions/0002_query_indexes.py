@@ -0,0 +1,36 @@
+"""query indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Indexes for per-user snippet pages (and the user foreign key) and for
+reading a snippet's likes in time order (trending rebuilds, like lookups
+by snippet). On Postgres they are built CONCURRENTLY, so writes to the
+tables continue while they build.
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_snippets_user_id_created_at_id", "snippets", ["user_id", "created_at", "id"]),
+    ("ix_snippet_likes_snippet_id_liked_at", "snippet_likes", ["snippet_id", "liked_at"]),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,48 @@
+"""timestamps with time zone
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+The app writes timezone-aware UTC datetimes, which asyncpg refuses to
+bind to `timestamp without time zone`. On Postgres the timestamp columns
+become `timestamptz`, reading the stored values as UTC. SQLite keeps no
+time zone either way, so nothing changes there.
+"""
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    ("users", "created_at"),
+    ("compression_dictionaries", "created_at"),
+    ("snippets", "created_at"),
+    ("snippets", "updated_at"),
+    ("snippet_likes", "liked_at"),
+]
+
+
+def _alter(with_time_zone: bool) -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, column in COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=sa.DateTime(timezone=with_time_zone),
+            existing_type=sa.DateTime(timezone=not with_time_zone),
+            existing_nullable=False,
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+        )
+
+
+def upgrade() -> None:
+    _alter(with_time_zone=True)
+
+
+def downgrade() -> None:
+    _alter(with_time_zone=False)
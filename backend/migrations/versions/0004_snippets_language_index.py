@@ -0,0 +1,29 @@
+"""snippets language index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+The snippets(language) index, for per-language lookups. Built
+CONCURRENTLY on Postgres like the other query indexes.
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_snippets_language", "snippets", ["language"], if_not_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_snippets_language", table_name="snippets", if_exists=True, postgresql_concurrently=True)
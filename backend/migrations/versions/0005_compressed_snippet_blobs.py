@@ -0,0 +1,73 @@
+"""compressed snippet blobs
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+With SNIPPET_COMPRESSION set, snippet_blobs.content holds compressed
+bytes, so the text column the baseline creates becomes binary: bytea on
+Postgres, each body prefixed with the plain-codec header (dropping the
+pg_trgm index, which only works on text), and BLOB on SQLite, whose
+existing text values are read as they are. Nothing is compressed here;
+`python -m app.cli compress` rewrites the bodies, and converts the column
+itself when compression is switched on after this revision.
+"""
+from typing import Sequence, Union
+import sqlalchemy as sa
+from alembic import context, op
+from app.core.config import settings
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _content_is_binary(connection) -> bool:
+    column = next(c for c in sa.inspect(connection).get_columns("snippet_blobs") if c["name"] == "content")
+    return isinstance(column["type"], sa.LargeBinary)
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if not settings.SNIPPET_COMPRESSION:
+        return
+    if not context.is_offline_mode() and _content_is_binary(connection):
+        return
+    if connection.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_snippet_blobs_content_trgm")
+        # '0000000000' is the header of a plain body: codec 0, no dictionary
+        op.execute(
+            "ALTER TABLE snippet_blobs ALTER COLUMN content TYPE bytea "
+            "USING decode('0000000000', 'hex') || convert_to(content, 'UTF8')"
+        )
+    else:
+        with op.batch_alter_table("snippet_blobs") as batch:
+            batch.alter_column("content", type_=sa.LargeBinary(), existing_type=sa.String(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    # Offline there is no column to look at, so the setting says whether upgrade() converted it
+    if context.is_offline_mode():
+        if not settings.SNIPPET_COMPRESSION:
+            return
+    elif not _content_is_binary(connection):
+        return
+    postgres = connection.dialect.name == "postgresql"
+    if not context.is_offline_mode():
+        compressed = (
+            "SELECT 1 FROM snippet_blobs WHERE get_byte(content, 0) <> 0 LIMIT 1" if postgres else
+            "SELECT 1 FROM snippet_blobs WHERE typeof(content) = 'blob' AND substr(content, 1, 1) <> x'00' LIMIT 1"
+        )
+        if connection.execute(sa.text(compressed)).first() is not None:
+            raise RuntimeError("snippet_blobs holds compressed bodies, which can't be turned back into text in SQL")
+    if postgres:
+        op.execute(
+            "ALTER TABLE snippet_blobs ALTER COLUMN content TYPE varchar "
+            "USING convert_from(substring(content from 6), 'UTF8')"
+        )
+    else:
+        op.execute("UPDATE snippet_blobs SET content = CAST(substr(content, 6) AS TEXT) WHERE typeof(content) = 'blob'")
+        with op.batch_alter_table("snippet_blobs") as batch:
+            batch.alter_column("content", type_=sa.String(), existing_type=sa.LargeBinary(), existing_nullable=False)
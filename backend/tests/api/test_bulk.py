@@ -0,0 +1,76 @@
+import json
+import uuid
+from fastapi.testclient import TestClient
+from app.crud import user as crud_user
+from app.schemas.schemas import UserCreate
+from app.services import bulk_service
+
+def test_ndjson_import_reports_bad_lines_and_round_trips_through_export(client: TestClient, normal_user_token_headers):
+    tag = f"bulk-{uuid.uuid4().hex[:8]}"
+    lines = [
+        json.dumps({"title": "First", "code_content": "a = 1", "tags": [tag, tag.upper()]}),
+        "{not json",
+        "",
+        json.dumps({"title": "", "code_content": "b = 2"}),
+        json.dumps({"title": "Second", "code_content": "b = 2", "language": "python", "created_at": "2020-01-02T03:04:05Z"}),
+    ]
+    response = client.post(
+        "/api/v1/snippets/import", headers=normal_user_token_headers, content="\n".join(lines).encode()
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["created"], report["failed"]) == (2, 2)
+    assert [error["line"] for error in report["errors"]] == [2, 4]
+    assert report["errors"][1]["error"].startswith("title:")
+
+    user_id = client.get("/api/v1/users/me", headers=normal_user_token_headers).json()["id"]
+    export = client.get(f"/api/v1/snippets/export?user_id={user_id}", headers=normal_user_token_headers)
+    assert export.headers["content-type"] == "application/x-ndjson"
+    exported = [json.loads(line) for line in export.text.splitlines()]
+    imported = [row for row in exported if row["title"] in ("First", "Second")]
+    assert [row["tags"] for row in imported] == [[tag], []]
+    assert imported[1]["created_at"].startswith("2020-01-02T03:04:05")
+
+    feed = client.get(f"/api/v1/snippets/?tag={tag}").json()
+    assert [snippet["title"] for snippet in feed] == ["First"]
+
+def test_export_is_limited_to_the_callers_snippets(client: TestClient, normal_user_token_headers):
+    email = f"other_{uuid.uuid4().hex[:8]}@example.com"
+    other = client.post("/api/v1/auth/register", json={"email": email, "username": email, "password": "password"})
+    other_headers = {"Authorization": f"Bearer {other.cookies.get('access_token')}"}
+    client.cookies.clear()
+    client.post("/api/v1/snippets/", headers=other_headers, json={"title": "Private", "code_content": "secret = 1"})
+    client.post("/api/v1/snippets/", headers=normal_user_token_headers, json={"title": "Mine", "code_content": "mine = 1"})
+
+    mine = client.get("/api/v1/snippets/export", headers=normal_user_token_headers)
+    assert mine.status_code == 200
+    user_id = client.get("/api/v1/users/me", headers=normal_user_token_headers).json()["id"]
+    assert {json.loads(line)["user_id"] for line in mine.text.splitlines()} == {user_id}
+
+    theirs = client.get(f"/api/v1/snippets/export?user_id={other.json()['id']}", headers=normal_user_token_headers)
+    assert theirs.status_code == 403
+
+def test_import_reports_a_failing_batch_and_keeps_the_others(run_async, monkeypatch):
+    insert_batch = bulk_service._insert_batch
+
+    async def failing_insert_batch(session, user_id, batch):
+        if any(item.title == "Boom" for _, item in batch):
+            raise ValueError("cannot store this batch")
+        await insert_batch(session, user_id, batch)
+
+    monkeypatch.setattr(bulk_service, "_insert_batch", failing_insert_batch)
+
+    async def lines():
+        for title in ("Before", "Boom", "After"):
+            yield json.dumps({"title": title, "code_content": f"{title} = 1"}).encode()
+
+    async def scenario(sessions):
+        async with sessions() as session:
+            email = f"bulk_{uuid.uuid4().hex[:8]}@example.com"
+            user = await crud_user.create_user(session, UserCreate(email=email, username=email, password="password"))
+            return await bulk_service.import_snippets(session, lines(), user.id, batch_size=1)
+
+    report = run_async(scenario)
+    assert (report.created, report.failed) == (2, 1)
+    assert report.errors[0].line == 2
+    assert report.errors[0].error == "batch failed: ValueError"
@@ -0,0 +1,134 @@
+import time
+import uuid
+import asyncio
+import threading
+import pytest
+from datetime import timedelta
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.crud import crud_like
+from app.db.session import engine
+from app.models.models import Snippet, SnippetLike, User, utc_now
+from app.services import trending_service
+
+PARALLEL_LIKES = 200
+CONCURRENCY = 16
+
+def test_like_toggle_returns_like_count(client: TestClient, normal_user_token_headers):
+    snippet = client.post(
+        "/api/v1/snippets/",
+        headers=normal_user_token_headers,
+        json={"title": "Likeable", "code_content": "x"}
+    ).json()
+    assert snippet["like_count"] == 0
+
+    liked = client.post(f"/api/v1/snippets/{snippet['id']}/like", headers=normal_user_token_headers)
+    assert liked.json() == {"is_liked": True, "like_count": 1}
+    assert client.get(f"/api/v1/snippets/{snippet['id']}").json()["like_count"] == 1
+
+    unliked = client.post(f"/api/v1/snippets/{snippet['id']}/like", headers=normal_user_token_headers)
+    assert unliked.json() == {"is_liked": False, "like_count": 0}
+
+def test_parallel_likes_keep_counters_exact(run_async):
+    run_id = uuid.uuid4().hex[:8]
+
+    async def scenario(sessions):
+        async with sessions() as session:
+            owner = User(username=f"owner_{run_id}", email=f"owner_{run_id}@test.com", hashed_password="x")
+            session.add(owner)
+            await session.flush()
+            snippet = Snippet(title="Popular", code_content="x", user_id=owner.id)
+            fans = [
+                User(username=f"fan_{run_id}_{i}", email=f"fan_{run_id}_{i}@test.com", hashed_password="x")
+                for i in range(PARALLEL_LIKES)
+            ]
+            session.add_all([snippet, *fans])
+            await session.commit()
+            owner_id, snippet_id = owner.id, snippet.id
+            fan_ids = [fan.id for fan in fans]
+
+        # SQLite serializes writers; bound the open connections like a pool would
+        slots = asyncio.Semaphore(CONCURRENCY)
+
+        async def toggle(user_id: int) -> bool:
+            async with slots, sessions() as session:
+                return (await crud_like.toggle_like(session, user_id, snippet_id, owner_id))[0]
+
+        async def counters():
+            async with sessions() as session:
+                snippet = await session.get(Snippet, snippet_id)
+                owner = await session.get(User, owner_id)
+                return snippet.like_count, owner.reputation_stars
+
+        assert all(await asyncio.gather(*(toggle(fan_id) for fan_id in fan_ids)))
+        assert await counters() == (PARALLEL_LIKES, PARALLEL_LIKES)
+
+        assert not any(await asyncio.gather(*(toggle(fan_id) for fan_id in fan_ids[: PARALLEL_LIKES // 2])))
+        assert await counters() == (PARALLEL_LIKES // 2, PARALLEL_LIKES // 2)
+
+    run_async(scenario)
+
+def test_trending_ranks_by_decayed_likes(client: TestClient, run_async):
+    run_id = uuid.uuid4().hex[:8]
+    half_life = timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+
+    async def scenario(sessions):
+        async with sessions() as session:
+            owner = User(username=f"trend_{run_id}", email=f"trend_{run_id}@test.com", hashed_password="x")
+            fans = [
+                User(username=f"tfan_{run_id}_{i}", email=f"tfan_{run_id}_{i}@test.com", hashed_password="x")
+                for i in range(5)
+            ]
+            session.add_all([owner, *fans])
+            await session.flush()
+            snippets = [Snippet(title=f"Trend {run_id} {name}", code_content=name, user_id=owner.id) for name in "abc"]
+            session.add_all(snippets)
+            await session.flush()
+            # Five likes three half-lives old are worth 5/8 of a fresh one
+            liked_at = utc_now() - 3 * half_life
+            session.add_all([SnippetLike(user_id=fan.id, snippet_id=snippets[1].id, liked_at=liked_at) for fan in fans])
+            await session.commit()
+            return owner.id, [fan.id for fan in fans], [snippet.id for snippet in snippets]
+
+    owner_id, fan_ids, (a, b, c) = run_async(scenario)
+    trending_service.rebuild(engine)
+
+    def ranking():
+        ids = [item["id"] for item in client.get("/api/v1/snippets/trending?limit=100").json()]
+        return [snippet_id for snippet_id in ids if snippet_id in (a, b, c)]
+
+    likes_a = [(fan_id, a) for fan_id in fan_ids[:3]]
+    run_async(lambda sessions: _toggle_all(sessions, owner_id, likes_a + [(fan_ids[0], c)]))
+    assert ranking() == [a, c, b]
+
+    # Rescaling to a later epoch keeps the order
+    assert trending_service.rebase(engine, time.time() + 3600)
+    assert ranking() == [a, c, b]
+
+    # Unliking takes the like's weight back out
+    run_async(lambda sessions: _toggle_all(sessions, owner_id, likes_a))
+    assert ranking() == [c, b]
+
+
+async def _toggle_all(sessions, owner_id, likes):
+    for user_id, snippet_id in likes:
+        async with sessions() as session:
+            await crud_like.toggle_like(session, user_id, snippet_id, owner_id)
+
+def test_rebase_waits_for_likes_holding_the_epoch(run_async):
+    if engine.dialect.name != "postgresql":
+        pytest.skip("SQLite's single writer already serializes likes and rebases")
+
+    async def scenario(sessions):
+        async with sessions() as session:
+            epoch = await trending_service.lock_epoch(session)
+            rebased = []
+            rebase = threading.Thread(target=lambda: rebased.append(trending_service.rebase(engine, epoch + 60)))
+            rebase.start()
+            await asyncio.sleep(0.5)
+            assert rebased == []
+            await session.commit()
+        rebase.join(timeout=10)
+        assert rebased == [True]
+
+    run_async(scenario)
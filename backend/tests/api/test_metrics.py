@@ -0,0 +1,30 @@
+import re
+from fastapi.testclient import TestClient
+
+def _series(text: str, prefix: str) -> float:
+    return sum(float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(prefix))
+
+def test_requests_are_timed_and_exported(client: TestClient, normal_user_token_headers):
+    labels = 'method="GET",route="/api/v1/snippets/{snippet_id}"'
+    before = client.get("/metrics").text
+    snippet_id = client.post(
+        "/api/v1/snippets/", headers=normal_user_token_headers, json={"title": "Timed", "code_content": "x"}
+    ).json()["id"]
+
+    response = client.get(f"/api/v1/snippets/{snippet_id}")
+    timing = response.headers["Server-Timing"]
+    assert re.fullmatch(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="queries: [1-9]\d*", serialize;dur=[\d.]+', timing)
+
+    exported = client.get("/metrics")
+    assert exported.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = exported.text
+    assert "# TYPE snipted_http_request_duration_seconds histogram" in after
+    for prefix in (
+        f'snipted_http_requests_total{{{labels},status="200"}}',
+        f"snipted_http_request_duration_seconds_count{{{labels}}}",
+    ):
+        assert _series(after, prefix) == _series(before, prefix) + 1
+    assert _series(after, f"snipted_db_queries_total{{{labels}}}") > _series(before, f"snipted_db_queries_total{{{labels}}}")
+    assert _series(after, f"snipted_serialization_duration_seconds_total{{{labels}}}") > _series(
+        before, f"snipted_serialization_duration_seconds_total{{{labels}}}"
+    )
@@ -0,0 +1,43 @@
+import uuid
+from fastapi.testclient import TestClient
+
+def _count(client: TestClient, query_counter, url: str) -> int:
+    query_counter.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    return len(query_counter)
+
+def test_list_endpoints_query_count_is_independent_of_page_size(
+    client: TestClient, normal_user_token_headers, query_counter
+):
+    run_id = uuid.uuid4().hex[:8]
+    tag = f"nplus1-{run_id}"
+    for i in range(6):
+        client.post(
+            "/api/v1/snippets/",
+            headers=normal_user_token_headers,
+            json={"title": f"Counted {run_id} {i}", "code_content": "x", "tags": [tag, f"extra-{i}"]}
+        )
+
+    for url in (f"/api/v1/snippets/?tag={tag}&limit={{}}", "/api/v1/snippets/?limit={}"):
+        assert _count(client, query_counter, url.format(2)) == _count(client, query_counter, url.format(6))
+
+    small = _count(client, query_counter, f"/api/v1/snippets/search?q=counted {run_id} 1")
+    large = _count(client, query_counter, f"/api/v1/snippets/search?q=counted {run_id}")
+    assert small == large
+
+def test_snippet_create_resolves_tags_in_bulk(client: TestClient, normal_user_token_headers, query_counter):
+    def create(tags) -> int:
+        query_counter.clear()
+        response = client.post(
+            "/api/v1/snippets/",
+            headers=normal_user_token_headers,
+            json={"title": "Tagged", "code_content": "x", "tags": tags}
+        )
+        assert response.status_code == 201
+        return len(query_counter)
+
+    run_id = uuid.uuid4().hex[:8]
+    one_tag = create([f"solo-{run_id}"])
+    many_tags = create([f"Bulk-{run_id}-{i} " for i in range(10)])
+    assert one_tag == many_tags
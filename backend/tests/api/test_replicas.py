@@ -0,0 +1,70 @@
+import uuid
+import asyncio
+from sqlalchemy import event, text
+from fastapi.testclient import TestClient
+from app.api import deps
+from app.core.config import settings
+from app.db.replicas import ReplicaSet
+
+def test_replicas_round_robin_and_fail_over(tmp_path):
+    replicas = ReplicaSet(
+        [f"sqlite:///{tmp_path}/a.db", f"sqlite:///{tmp_path}/missing/b.db", f"sqlite:///{tmp_path}/c.db"],
+        retry_after=60,
+    )
+    a, b, c = replicas.engines
+
+    async def scenario():
+        assert [replicas.choose() for _ in range(3)] == [a, b, c]
+        try:
+            async with b.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except Exception:
+            pass
+        assert [replicas.choose() for _ in range(4)] == [a, c, c, a]
+        assert [stats["healthy"] for stats in replicas.stats()] == [True, False, True]
+        await replicas.dispose()
+
+    asyncio.run(scenario())
+
+def test_reads_use_replica_until_client_writes(client: TestClient, normal_user_token_headers, monkeypatch):
+    # The primary's own file stands in for a replica
+    replicas = ReplicaSet([settings.DATABASE_URL], retry_after=60)
+    replica_reads = []
+    event.listen(
+        replicas.engines[0].sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: replica_reads.append(statement),
+    )
+    monkeypatch.setattr(deps, "replica_set", replicas)
+    client.cookies.delete(deps.PRIMARY_COOKIE)
+
+    assert client.get(f"/api/v1/snippets/?tag=replica-{uuid.uuid4().hex[:8]}").status_code == 200
+    assert replica_reads
+
+    created = client.post(
+        "/api/v1/snippets/", headers=normal_user_token_headers,
+        json={"title": "Fresh", "code_content": "x"}
+    )
+    assert created.cookies.get(deps.PRIMARY_COOKIE) == "1"
+    replica_reads.clear()
+    snippet = client.get(f"/api/v1/snippets/{created.json()['id']}")
+    assert snippet.json()["title"] == "Fresh"
+    assert not replica_reads
+
+    client.cookies.delete(deps.PRIMARY_COOKIE)
+    client.portal.call(replicas.dispose)
+
+def test_writes_returning_their_own_response_set_primary_cookie(client: TestClient, monkeypatch):
+    replicas = ReplicaSet([settings.DATABASE_URL], retry_after=60)
+    monkeypatch.setattr(deps, "replica_set", replicas)
+    email = f"sticky_{uuid.uuid4().hex[:8]}@test.com"
+    register = client.post("/api/v1/auth/register", json={"email": email, "username": email, "password": "old-password"})
+    headers = {"Authorization": f"Bearer {register.cookies.get('access_token')}"}
+    client.cookies.clear()
+
+    changed = client.put("/api/v1/users/me/password", headers=headers,
+                         json={"current_password": "old-password", "new_password": "new-password"})
+    assert changed.status_code == 204
+    assert changed.cookies.get(deps.PRIMARY_COOKIE) == "1"
+
+    client.cookies.clear()
+    client.portal.call(replicas.dispose)
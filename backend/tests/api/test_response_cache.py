@@ -0,0 +1,64 @@
+import asyncio
+import uuid
+from fastapi.testclient import TestClient
+from app.core.response_cache import MemoryBackend
+
+def test_feed_and_detail_are_cached_and_invalidated_by_writes(client: TestClient, normal_user_token_headers):
+    tag = f"cached-{uuid.uuid4().hex[:8]}"
+    snippet_id = client.post(
+        "/api/v1/snippets/", headers=normal_user_token_headers,
+        json={"title": "Cached", "code_content": "x", "tags": [tag]}
+    ).json()["id"]
+
+    feed_url = f"/api/v1/snippets/?tag={tag}"
+    first = client.get(feed_url)
+    assert first.headers["X-Cache"] == "MISS"
+    second = client.get(f"/api/v1/snippets/?tag={tag.upper()}")
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+
+    detail_url = f"/api/v1/snippets/{snippet_id}"
+    assert client.get(detail_url).headers["X-Cache"] == "MISS"
+    assert client.get(detail_url).headers["X-Cache"] == "HIT"
+
+    client.post(f"{detail_url}/like", headers=normal_user_token_headers)
+    detail = client.get(detail_url)
+    assert detail.headers["X-Cache"] == "MISS"
+    assert detail.json()["like_count"] == 1
+    feed = client.get(feed_url)
+    assert feed.headers["X-Cache"] == "MISS"
+    assert feed.json()[0]["like_count"] == 1
+
+    newer_id = client.post(
+        "/api/v1/snippets/", headers=normal_user_token_headers,
+        json={"title": "Newer", "code_content": "x", "tags": [tag]}
+    ).json()["id"]
+    assert [s["title"] for s in client.get(feed_url).json()] == ["Newer", "Cached"]
+
+    # The second page doesn't contain the deleted snippet, but moves up
+    second_page_url = f"{feed_url}&skip=1&limit=1"
+    assert [s["title"] for s in client.get(second_page_url).json()] == ["Cached"]
+    client.delete(f"/api/v1/snippets/{newer_id}", headers=normal_user_token_headers)
+    assert client.get(second_page_url).json() == []
+
+    stats = client.get("/api/v1/snippets/cache/stats", headers=normal_user_token_headers).json()
+    assert 0 < stats["hit_ratio"] < 1
+    client.cookies.clear()
+    assert client.get("/api/v1/snippets/cache/stats").status_code == 401
+
+def test_memory_backend_tag_invalidation_and_eviction():
+    async def scenario():
+        backend = MemoryBackend(maxsize=2)
+        await backend.set("feed-1", b"a", ttl=60, tags=["lists", "snippet:1"])
+        await backend.set("feed-2", b"b", ttl=60, tags=["lists", "snippet:2"])
+
+        await backend.invalidate_tags(["snippet:1"])
+        assert await backend.get("feed-1") is None
+        assert await backend.get("feed-2") == b"b"
+
+        await backend.set("detail-3", b"c", ttl=60, tags=["snippet:3"])
+        await backend.set("detail-4", b"d", ttl=60, tags=["snippet:4"])
+        assert await backend.get("feed-2") is None
+        assert "snippet:2" not in backend._tags
+
+    asyncio.run(scenario())
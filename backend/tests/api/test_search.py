@@ -1,4 +1,6 @@
+import time
 import uuid
+import pytest
 from fastapi.testclient import TestClient
 
 def test_search_functionality(client: TestClient, normal_user_token_headers):
@@ -34,7 +36,8 @@ def test_search_functionality(client: TestClient, normal_user_token_headers):
     assert res_code.status_code == 200
     data_code = res_code.json()
     assert len(data_code) == 1
-    assert target_code_marker in data_code[0]["code_content"]
+    assert target_code_marker in data_code[0]["preview"]
+    assert "code_content" not in data_code[0]
     
     res_combined = client.get(f"/api/v1/snippets/?q={target_title}&tag=ui")
     assert len(res_combined.json()) == 0
@@ -42,4 +45,100 @@ def test_search_functionality(client: TestClient, normal_user_token_headers):
 def test_pagination_max_limit(client: TestClient):
     """Ensure the API rejects limit > 100"""
     response = client.get("/api/v1/snippets/?limit=150")
-    assert response.status_code == 422
\ No newline at end of file
+    assert response.status_code == 422
+
+def test_search_splits_identifiers_and_ranks_title_first(client: TestClient, normal_user_token_headers):
+    run_id = str(uuid.uuid4())[:8]
+    marker = f"Marker{run_id}"
+
+    body_hit = client.post("/api/v1/snippets/", json={
+        "title": "Helpers",
+        "code_content": f"def fetch_user_name():\n    return {marker}",
+    }).json()
+    title_hit = client.post("/api/v1/snippets/", json={
+        "title": f"{marker} cache",
+        "code_content": "const getUserName = () => null;",
+    }).json()
+
+    res = client.get(f"/api/v1/snippets/search?q=user name {marker}")
+    assert res.status_code == 200
+    assert [s["id"] for s in res.json()] == [title_hit["id"], body_hit["id"]]
+
+    res_snake = client.get(f"/api/v1/snippets/search?q=fetch_user_name {marker}")
+    assert [s["id"] for s in res_snake.json()] == [body_hit["id"]]
+
+    client.delete(f"/api/v1/snippets/{body_hit['id']}")
+    res_deleted = client.get(f"/api/v1/snippets/search?q={marker}")
+    assert [s["id"] for s in res_deleted.json()] == [title_hit["id"]]
+
+def test_code_search_substring_and_regex(client: TestClient, normal_user_token_headers):
+    run_id = str(uuid.uuid4())[:8]
+    code = f"import os\n\npath_{run_id} = os.path.join(base, name)\n"
+    snippet_id = client.post("/api/v1/snippets/", json={"title": "Paths", "code_content": code}).json()["id"]
+
+    res = client.get("/api/v1/snippets/search", params={"q": f"path_{run_id} = os.path.join(", "mode": "substring"})
+    assert res.status_code == 200
+    data = res.json()
+    assert [s["id"] for s in data] == [snippet_id]
+    assert data[0]["matches"][0]["line"] == 3
+    assert data[0]["matches"][0]["start"] == 0
+    assert data[0]["matches"][0]["offset"] == code.index(f"path_{run_id}")
+
+    res_regex = client.get("/api/v1/snippets/search", params={"q": rf"path_{run_id}\s*=\s*os\.\w+", "mode": "regex"})
+    match = res_regex.json()[0]["matches"][0]
+    assert match["end"] - match["start"] == len(f"path_{run_id} = os.path")
+
+    res_invalid = client.get("/api/v1/snippets/search", params={"q": "(unclosed", "mode": "regex"})
+    assert res_invalid.status_code == 400
+
+def test_code_search_regex_runs_in_linear_time(client: TestClient, normal_user_token_headers):
+    run_id = str(uuid.uuid4())[:8]
+    code = f"# {run_id}\n" + "a" * 40_000 + "!"
+    client.post("/api/v1/snippets/", json={"title": "Backtracking bait", "code_content": code})
+
+    started = time.perf_counter()
+    res = client.get("/api/v1/snippets/search", params={"q": f"{run_id}\\n(a+)+$", "mode": "regex"})
+    assert res.status_code == 200
+    assert res.json() == []
+    assert time.perf_counter() - started < 2
+
+    res_backref = client.get("/api/v1/snippets/search", params={"q": r"(a)\1", "mode": "regex"})
+    assert res_backref.status_code == 400
+
+def test_code_search_finds_updated_crlf_code_across_lines(client: TestClient, normal_user_token_headers):
+    run_id = str(uuid.uuid4())[:8]
+    snippet_id = client.post("/api/v1/snippets/", json={"title": "Before", "code_content": "x = 1"}).json()["id"]
+    client.put(f"/api/v1/snippets/{snippet_id}", json={"code_content": f"foo_{run_id}\r\nbar_{run_id}"})
+
+    res = client.get("/api/v1/snippets/search", params={"q": f"{run_id}\nbar_{run_id}", "mode": "substring"})
+    assert [s["id"] for s in res.json()] == [snippet_id]
+
+def test_trigram_backfill_runs_in_batches(client: TestClient, normal_user_token_headers, monkeypatch):
+    from sqlalchemy import delete, func, select
+    from app.db.session import engine
+    from app.models.models import Snippet, SnippetTrigram
+    from app.services import code_search_service
+    if code_search_service._use_pg_trgm:
+        pytest.skip("pg_trgm serves the prefilter, there is nothing to backfill")
+
+    run_id = str(uuid.uuid4())[:8]
+    for i in range(3):
+        client.post("/api/v1/snippets/", json={"title": f"Backfill {i}", "code_content": f"backfill_{run_id}_{i}"})
+    with engine.begin() as conn:
+        conn.execute(delete(SnippetTrigram))
+
+    batch_sizes = []
+    backfill = code_search_service.backfill_in_batches
+
+    def recording_backfill(engine, fetch, write):
+        return backfill(engine, fetch, lambda conn, rows: batch_sizes.append(len(rows)) or write(conn, rows))
+
+    monkeypatch.setattr(code_search_service, "BACKFILL_BATCH_SIZE", 2)
+    monkeypatch.setattr(code_search_service, "backfill_in_batches", recording_backfill)
+    code_search_service.init_code_search(engine)
+
+    with engine.connect() as conn:
+        snippets = conn.execute(select(func.count()).select_from(Snippet)).scalar()
+    assert max(batch_sizes) == 2 and sum(batch_sizes) == snippets
+    res = client.get("/api/v1/snippets/search", params={"q": f"backfill_{run_id}_1", "mode": "substring"})
+    assert [s["title"] for s in res.json()] == ["Backfill 1"]
@@ -1,3 +1,4 @@
+import uuid
 from fastapi.testclient import TestClient
 
 def test_create_snippet(client: TestClient, normal_user_token_headers):
@@ -46,4 +47,131 @@ def test_delete_snippet_permission(client: TestClient):
     client.cookies.clear()
     
     response = client.delete("/api/v1/snippets/1")
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+def test_read_snippets_cursor_pagination(client: TestClient, normal_user_token_headers):
+    tag = f"paging-{uuid.uuid4().hex[:8]}"
+    created = [
+        client.post(
+            "/api/v1/snippets/",
+            headers=normal_user_token_headers,
+            json={"title": f"Page {i}", "code_content": "x", "tags": [tag]}
+        ).json()["id"]
+        for i in range(5)
+    ]
+
+    first = client.get(f"/api/v1/snippets/?tag={tag}&limit=2")
+    assert first.status_code == 200
+    cursor = first.headers["X-Next-Cursor"]
+
+    # A newer snippet must not shift the following pages
+    client.post(
+        "/api/v1/snippets/",
+        headers=normal_user_token_headers,
+        json={"title": "Late", "code_content": "x", "tags": [tag]}
+    )
+
+    second = client.get(f"/api/v1/snippets/?tag={tag}&limit=2&cursor={cursor}")
+    seen = [s["id"] for s in first.json()] + [s["id"] for s in second.json()]
+    assert seen == list(reversed(created))[:4]
+
+    third = client.get(f"/api/v1/snippets/?tag={tag}&limit=2&cursor={second.headers['X-Next-Cursor']}")
+    assert [s["id"] for s in third.json()] == [created[0]]
+
+def test_read_snippets_invalid_cursor(client: TestClient):
+    response = client.get("/api/v1/snippets/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+def test_create_snippet_normalizes_and_dedupes_tags(client: TestClient, normal_user_token_headers):
+    response = client.post(
+        "/api/v1/snippets/",
+        headers=normal_user_token_headers,
+        json={"title": "Dupes", "code_content": "x", "tags": [" Python", "python", "PYTHON ", "qa", " "]}
+    )
+    assert response.status_code == 201
+    assert sorted(tag["name"] for tag in response.json()["tags"]) == ["python", "qa"]
+
+def test_read_snippet_conditional_get(client: TestClient, normal_user_token_headers):
+    snippet_id = client.post(
+        "/api/v1/snippets/",
+        headers=normal_user_token_headers,
+        json={"title": "Etag", "code_content": "print('etag')\n"}
+    ).json()["id"]
+
+    first = client.get(f"/api/v1/snippets/{snippet_id}")
+    etag = first.headers["ETag"]
+    assert "max-age" in first.headers["Cache-Control"]
+
+    not_modified = client.get(f"/api/v1/snippets/{snippet_id}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+
+    client.post(f"/api/v1/snippets/{snippet_id}/like", headers=normal_user_token_headers)
+    changed = client.get(f"/api/v1/snippets/{snippet_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+def test_read_snippet_raw(client: TestClient, normal_user_token_headers):
+    snippet_id = client.post(
+        "/api/v1/snippets/",
+        headers=normal_user_token_headers,
+        json={"title": "Raw", "code_content": "fn main() {}\n"}
+    ).json()["id"]
+
+    raw = client.get(f"/api/v1/snippets/{snippet_id}/raw")
+    assert raw.status_code == 200
+    assert raw.headers["content-type"].startswith("text/plain")
+    assert raw.text == "fn main() {}\n"
+
+    cached = client.get(f"/api/v1/snippets/{snippet_id}/raw", headers={"If-None-Match": raw.headers["ETag"]})
+    assert cached.status_code == 304
+
+    client.put(f"/api/v1/snippets/{snippet_id}", headers=normal_user_token_headers, json={"code_content": "fn main() { run() }\n"})
+    updated = client.get(f"/api/v1/snippets/{snippet_id}/raw", headers={"If-None-Match": raw.headers["ETag"]})
+    assert updated.status_code == 200
+    assert updated.text == "fn main() { run() }\n"
+
+    assert client.get("/api/v1/snippets/999999999/raw").status_code == 404
+
+def test_list_fields_projection(client: TestClient, normal_user_token_headers):
+    tag = f"fields-{uuid.uuid4().hex[:8]}"
+    code = "\n".join(f"line {i}" for i in range(30))
+    client.post("/api/v1/snippets/", headers=normal_user_token_headers, json={"title": "Long", "code_content": code, "tags": [tag]})
+
+    [summary] = client.get(f"/api/v1/snippets/?tag={tag}").json()
+    assert "code_content" not in summary
+    assert summary["preview"] == "\n".join(f"line {i}" for i in range(10))
+
+    [full] = client.get(f"/api/v1/snippets/?tag={tag}&fields=full").json()
+    assert full["code_content"] == code and "preview" not in full
+
+    [sparse] = client.get(f"/api/v1/snippets/?tag={tag}&fields=title,tags").json()
+    assert set(sparse) == {"id", "title", "tags"}
+
+    assert client.get(f"/api/v1/snippets/?tag={tag}&fields=title,secret").status_code == 400
+
+def test_identical_code_is_stored_once(client: TestClient, normal_user_token_headers, run_async):
+    from sqlalchemy import select
+    from app.models.models import SnippetBlob, content_hash
+
+    code = f"# {uuid.uuid4().hex}\nprint('same')\n"
+    first = client.post("/api/v1/snippets/", headers=normal_user_token_headers, json={"title": "One", "code_content": code})
+    assert "X-Duplicate-Of" not in first.headers
+    # CRLF copies are the same body
+    second = client.post("/api/v1/snippets/", headers=normal_user_token_headers, json={"title": "Two", "code_content": code.replace("\n", "\r\n")})
+    assert second.status_code == 201
+    assert second.headers["X-Duplicate-Of"] == str(first.json()["id"])
+    assert second.json()["code_content"] == code
+
+    async def blob(sessions):
+        async with sessions() as session:
+            return (await session.execute(select(SnippetBlob.ref_count).where(SnippetBlob.hash == content_hash(code)))).scalar()
+
+    assert run_async(blob) == 2
+    raw = [client.get(f"/api/v1/snippets/{r.json()['id']}/raw") for r in (first, second)]
+    assert raw[0].headers["ETag"] == raw[1].headers["ETag"]
+
+    client.delete(f"/api/v1/snippets/{first.json()['id']}", headers=normal_user_token_headers)
+    assert run_async(blob) == 1
+    client.put(f"/api/v1/snippets/{second.json()['id']}", headers=normal_user_token_headers, json={"code_content": "changed"})
+    assert run_async(blob) is None
@@ -0,0 +1,76 @@
+import uuid
+from app.crud import crud_tag
+
+def test_tag_cache_only_learns_committed_tags(run_async):
+    name = f"cached-{uuid.uuid4().hex[:8]}"
+
+    async def scenario(sessions):
+        async with sessions() as session:
+            await crud_tag.resolve_tag_ids(session, [name])
+            await session.rollback()
+        assert crud_tag.tag_cache.get(name) is None
+
+        async with sessions() as session:
+            [tag_id] = await crud_tag.resolve_tag_ids(session, [name.upper()])
+            await session.commit()
+        assert crud_tag.tag_cache.get(name) == tag_id
+
+        async with sessions() as session:
+            assert await crud_tag.get_tag_id(session, name) == tag_id
+
+    run_async(scenario)
+
+def test_multi_tag_filters_and_counts(client, normal_user_token_headers):
+    run_id = uuid.uuid4().hex[:8]
+    a, b, c = (f"{name}-{run_id}" for name in "abc")
+
+    def create(title, tags):
+        return client.post(
+            "/api/v1/snippets/", headers=normal_user_token_headers,
+            json={"title": title, "code_content": f"print('{title}')", "tags": tags},
+        ).json()["id"]
+
+    both = create("both", [a, b])
+    only_a = create("only a", [a])
+    only_b = create("only b", [b, c])
+
+    def feed(**params):
+        return {item["id"] for item in client.get("/api/v1/snippets/", params=params).json()}
+
+    assert feed(tags=f"{a},{b}") == {both}
+    assert feed(tags=f" {b.upper()},{a}", match="all") == {both}
+    assert feed(tags=f"{a},{b}", match="any") == {both, only_a, only_b}
+    assert feed(tag=a, tags=c, match="any") == {both, only_a, only_b}
+    assert feed(tags=f"{a},missing-{run_id}") == set()
+    assert feed(tags=f"{a},missing-{run_id}", match="any") == {both, only_a}
+
+    def counts():
+        return {tag["name"]: tag["snippet_count"] for tag in client.get("/api/v1/tags/?limit=100").json()}
+
+    assert {name: counts().get(name) for name in (a, b, c)} == {a: 2, b: 2, c: 1}
+
+    client.put(f"/api/v1/snippets/{only_b}", headers=normal_user_token_headers, json={"tags": [a]})
+    client.delete(f"/api/v1/snippets/{both}", headers=normal_user_token_headers)
+    assert {name: counts().get(name) for name in (a, b, c)} == {a: 2, b: None, c: None}
+    assert feed(tags=f"{a},{b}", match="any") == {only_a, only_b}
+
+def test_suggest_learns_new_tags(client, normal_user_token_headers):
+    prefix = f"sg{uuid.uuid4().hex[:6]}"
+    client.get("/api/v1/tags/suggest", params={"prefix": prefix})
+    client.post(
+        "/api/v1/snippets/", headers=normal_user_token_headers,
+        json={"title": "Suggested", "code_content": "x", "tags": [f"{prefix}-web", f"{prefix}-api"]},
+    )
+
+    suggestions = client.get("/api/v1/tags/suggest", params={"prefix": prefix.upper()}).json()
+    assert [tag["name"] for tag in suggestions] == [f"{prefix}-api", f"{prefix}-web"]
+
+def test_tag_cache_stats(client, normal_user_token_headers):
+    tag = f"stats-{uuid.uuid4().hex[:8]}"
+    client.post("/api/v1/snippets/", json={"title": "Tagged", "code_content": "x", "tags": [tag]})
+    client.get("/api/v1/snippets/", params={"tags": tag})
+
+    stats = client.get("/api/v1/tags/cache/stats", headers=normal_user_token_headers).json()
+    assert stats["size"] >= 1
+    assert stats["hits"] >= 1
+    assert set(stats) >= {"maxsize", "misses", "evictions", "hit_ratio"}
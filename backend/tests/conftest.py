@@ -1,9 +1,14 @@
 import uuid
+import asyncio
 import pytest
-from app.main import app
-from typing import Generator, Dict
+from app.main import app, prepare_database
+from sqlalchemy import event
+from typing import Any, Awaitable, Callable, Generator, Dict, List
 from app.core.limiter import limiter  
-from app.db.session import SessionLocal
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+from app.db.session import SessionLocal, async_database_url, async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from fastapi.testclient import TestClient
 
 @pytest.fixture(scope="session", autouse=True)
@@ -12,6 +17,11 @@ def disable_rate_limiting():
     yield
     limiter.enabled = True
 
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """The app only prepares the database on startup; tests may use it before any client starts."""
+    prepare_database()
+
 @pytest.fixture(scope="session")
 def db() -> Generator:
     """
@@ -44,4 +54,37 @@ def normal_user_token_headers(client: TestClient) -> Dict[str, str]:
     if not token:
         pytest.fail("No cookie found in registration response")
 
-    return {"Authorization": f"Bearer {token}"}
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def query_counter() -> Generator:
+    """
+    Records every SQL statement sent to the engine.
+    Use `len(query_counter)` around a request to guard against N+1 loading.
+    """
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def run_async() -> Callable[[Callable[[async_sessionmaker], Awaitable[Any]]], Any]:
+    """
+    Runs `fn(sessions)` to completion on a fresh event loop, where `sessions`
+    is an async session factory on its own unpooled engine (the app's pooled
+    connections belong to the TestClient's loop).
+    """
+    def run(fn):
+        async def main():
+            test_engine = create_async_engine(async_database_url(settings.DATABASE_URL), poolclass=NullPool)
+            try:
+                return await fn(async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+            finally:
+                await test_engine.dispose()
+        return asyncio.run(main())
+
+    return run
@@ -1,4 +1,8 @@
 import uuid
+from jose import jwt
+from app.crud import user as crud_user
+from app.core.config import settings
+from app.core.security import password_context
 from fastapi.testclient import TestClient
 
 def test_access_snippet_without_token(client: TestClient):
@@ -42,4 +46,90 @@ def test_use_fake_token(client: TestClient):
     tampered_token = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.garbage.signature"
     client.cookies.set("access_token", tampered_token)
     response = client.get("/api/v1/users/me")
-    assert response.status_code == 403
\ No newline at end of file
+    assert response.status_code == 403
+
+def test_cached_principal_is_dropped_on_deactivation(client: TestClient, query_counter, run_async):
+    email = f"cached_{uuid.uuid4().hex[:8]}@example.com"
+    register = client.post("/api/v1/auth/register", json={
+        "email": email,
+        "username": email,
+        "password": "cached_strong_password"
+    })
+    token = register.cookies.get("access_token")
+    headers = {"Authorization": f"Bearer {token}"}
+    client.cookies.clear()
+
+    assert jwt.get_unverified_claims(token)["sub"] == str(register.json()["id"])
+
+    client.post("/api/v1/snippets/", headers=headers, json={"title": "Warm", "code_content": "x"})
+    query_counter.clear()
+    client.post("/api/v1/snippets/", headers=headers, json={"title": "Cached", "code_content": "x"})
+    assert not any("FROM users" in statement for statement in query_counter)
+
+    async def deactivate(sessions):
+        async with sessions() as session:
+            user = await crud_user.get_user_by_id(session, register.json()["id"])
+            await crud_user.set_user_active(session, user, False)
+
+    run_async(deactivate)
+
+    response = client.post("/api/v1/snippets/", headers=headers, json={"title": "Blocked", "code_content": "x"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+def test_login_rehashes_outdated_bcrypt_cost(client: TestClient, run_async):
+    email = f"legacy_{uuid.uuid4().hex[:8]}@test.com"
+    register = client.post("/api/v1/auth/register", json={"email": email, "username": email, "password": "password"})
+    user_id = register.json()["id"]
+    client.cookies.clear()
+
+    async def stored_hash(sessions, replace_with=None):
+        async with sessions() as session:
+            user = await crud_user.get_user_by_id(session, user_id)
+            if replace_with:
+                user.hashed_password = replace_with
+                await session.commit()
+            return user.hashed_password
+
+    legacy_rounds = 4 if settings.BCRYPT_ROUNDS != 4 else 5
+    run_async(lambda sessions: stored_hash(sessions, password_context().hash("password", rounds=legacy_rounds)))
+
+    response = client.post("/api/v1/auth/login", data={"username": email, "password": "password"})
+    assert response.status_code == 200
+    assert run_async(stored_hash).startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+
+def test_rate_limit_is_per_user_with_headers(client: TestClient, normal_user_token_headers, monkeypatch):
+    from app.core.limiter import MemoryStore, limiter
+    monkeypatch.setattr(limiter, "store", MemoryStore())
+    monkeypatch.setattr(limiter, "enabled", True)
+
+    responses = [client.get("/api/v1/users/me", headers=normal_user_token_headers) for _ in range(21)]
+    assert [r.status_code for r in responses[:20]] == [200] * 20
+    assert responses[0].headers["X-RateLimit-Limit"] == "20"
+    assert responses[0].headers["X-RateLimit-Remaining"] == "19"
+    assert responses[20].status_code == 429
+    assert int(responses[20].headers["Retry-After"]) >= 1
+
+    # Another user on the same address has their own bucket
+    email = f"second_{uuid.uuid4().hex[:8]}@test.com"
+    token = client.post(
+        "/api/v1/auth/register", json={"email": email, "username": email, "password": "password"}
+    ).cookies.get("access_token")
+    client.cookies.clear()
+    assert client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+def test_change_password(client: TestClient):
+    email = f"rotate_{uuid.uuid4().hex[:8]}@test.com"
+    register = client.post("/api/v1/auth/register", json={"email": email, "username": email, "password": "old-password"})
+    headers = {"Authorization": f"Bearer {register.cookies.get('access_token')}"}
+    client.cookies.clear()
+
+    wrong = client.put("/api/v1/users/me/password", headers=headers,
+                       json={"current_password": "not-it", "new_password": "new-password"})
+    assert wrong.status_code == 400
+    changed = client.put("/api/v1/users/me/password", headers=headers,
+                         json={"current_password": "old-password", "new_password": "new-password"})
+    assert changed.status_code == 204
+
+    assert client.post("/api/v1/auth/login", data={"username": email, "password": "old-password"}).status_code == 400
+    assert client.post("/api/v1/auth/login", data={"username": email, "password": "new-password"}).status_code == 200
@@ -0,0 +1,50 @@
+import zlib
+import pytest
+from app.db import compression
+
+CODE = "".join(f"def handler_{i}(request):\n    return request.json()\n" for i in range(20))
+
+def test_round_trip_and_short_values_stay_plain(monkeypatch):
+    monkeypatch.setattr(compression.settings, "SNIPPET_COMPRESSION", "zlib")
+    stored = compression.compress(CODE, dictionary_id=0)
+    assert compression.stored_header(stored) == (compression.ZLIB, 0)
+    assert len(stored) < len(CODE) // 4
+    assert compression.decompress(stored) == CODE
+
+    short = compression.compress("x = 1", dictionary_id=0)
+    assert compression.stored_header(short) == (compression.PLAIN, 0)
+    assert compression.decompress(short) == "x = 1"
+    # Rows written before compression was switched on
+    assert compression.decompress(CODE) == CODE
+
+def test_dictionary_shrinks_similar_snippets(monkeypatch):
+    monkeypatch.setattr(compression.settings, "SNIPPET_COMPRESSION", "zlib")
+    registry = compression.DictionaryRegistry()
+    monkeypatch.setattr(compression, "dictionaries", registry)
+    samples = [CODE.replace("handler", name) for name in ("view", "route", "endpoint")]
+    registry.add(7, "zlib", compression.train_dictionary("zlib", samples))
+
+    value = CODE.replace("handler", "api")
+    with_dictionary = compression.compress(value)
+    assert compression.stored_header(with_dictionary) == (compression.ZLIB, 7)
+    assert len(with_dictionary) < len(compression.compress(value, dictionary_id=0))
+    assert compression.decompress(with_dictionary) == value
+
+def test_http_encoded_serves_stored_bytes(monkeypatch):
+    monkeypatch.setattr(compression.settings, "SNIPPET_COMPRESSION", "zlib")
+    stored = compression.compress(CODE, dictionary_id=0)
+    encoding, body = compression.http_encoded(stored, "gzip, deflate;q=0.5")
+    assert encoding == "deflate" and zlib.decompress(body).decode() == CODE
+    assert compression.http_encoded(stored, "gzip, br") is None
+    assert compression.http_encoded(compression.compress("x = 1"), "deflate") is None
+
+def test_unknown_dictionary_is_an_error(monkeypatch):
+    monkeypatch.setattr(compression.settings, "SNIPPET_COMPRESSION", "zlib")
+    registry = compression.DictionaryRegistry()
+    monkeypatch.setattr(compression, "dictionaries", registry)
+    registry.add(7, "zlib", compression.train_dictionary("zlib", [CODE, CODE]))
+    stored = compression.compress(CODE)
+    monkeypatch.setattr(compression, "dictionaries", compression.DictionaryRegistry())
+
+    with pytest.raises(RuntimeError, match="Unknown compression dictionary 7"):
+        compression.decompress(stored)
@@ -1,5 +1,15 @@
+import asyncio
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from app.core.cache import LRUCache
+from app.db.session import build_engine, pool_stats
+from app.services import bulk_service
+from app.core.password_hasher import PasswordHasher, PasswordHasherBusy
 from app.models.models import Snippet, User
 from app.core.security import verify_password, get_password_hash
+from app.services.search_service import tokenize_code
+from app.services.code_search_service import required_literals
 
 def test_password_hashing():
     """
@@ -15,8 +25,8 @@ def test_password_hashing():
 
 def test_snippet_model_logic():
     """
-    Test the 'like_count' property on the Snippet model.
-    We mock the relationship using simple lists.
+    'like_count' is a stored counter, not derived from the relationship,
+    so building the relationship in memory must not change it.
     """
     u1 = User(username="u1", email="u1@test.com", hashed_password="x")
     u2 = User(username="u2", email="u2@test.com", hashed_password="x")
@@ -24,4 +34,75 @@ def test_snippet_model_logic():
     snippet = Snippet(title="Test", code_content="x")
     snippet.liked_by_users = [u1, u2] 
     
-    assert snippet.like_count == 2
\ No newline at end of file
+    assert snippet.like_count == 0
+
+def test_tokenize_code_splits_identifiers():
+    tokens = tokenize_code("def getUserName(http_client): HTTPServer")
+
+    assert "getusername" in tokens
+    assert {"get", "user", "name"} <= set(tokens)
+    assert {"httpclient", "http", "client"} <= set(tokens)
+    assert {"httpserver", "server"} <= set(tokens)
+
+def test_required_literals_for_trigram_prefilter():
+    assert required_literals(r"os\.path\.join\(") == ["os.path.join("]
+    assert required_literals(r"def\s+get_\w+") == ["def", "get_"]
+    assert required_literals(r"colou?r(s|es)") == ["colo", "r"]
+    assert required_literals(r"foo|bar") == []
+
+def test_lru_cache_evicts_and_expires():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    cache.set("d", 4, ttl=0)
+    assert cache.get("d") is None
+
+    stats = cache.stats()
+    assert stats["size"] <= 2
+    assert stats["evictions"] == 2
+    assert stats["hits"] == 2 and stats["misses"] == 2
+
+def test_password_hasher_rejects_when_saturated():
+    release = threading.Event()
+    hasher = PasswordHasher(workers=1, queue_depth=1, executor_factory=lambda n: ThreadPoolExecutor(n))
+
+    async def scenario():
+        busy = [asyncio.ensure_future(hasher._submit(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash("one too many")
+        release.set()
+        await asyncio.gather(*busy)
+        return await hasher.verify("secret", await hasher.hash("secret"))
+
+    assert asyncio.run(scenario()) == (True, None)
+    assert hasher.stats()["rejected"] == 1
+    hasher.shutdown()
+
+def test_engine_pool_reports_checkouts(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path}/pool.db")
+    with engine.connect():
+        busy = pool_stats(engine)
+    idle = pool_stats(engine)
+    engine.dispose()
+
+    assert busy["pool"] == "TimedQueuePool"
+    assert (busy["checked_out"], idle["checked_out"]) == (1, 0)
+    assert idle["checkouts"] == 1 and idle["wait_ms_max"] >= 0
+
+def test_iter_lines_splits_chunks_and_skips_oversized_lines(monkeypatch):
+    monkeypatch.setattr(bulk_service, "MAX_LINE_BYTES", 8)
+
+    async def chunks():
+        for chunk in (b"ab", b"c\nde", b"f\n0123456789", b"0123\nlast"):
+            yield chunk
+
+    async def collect():
+        return [line async for line in bulk_service.iter_lines(chunks())]
+
+    assert asyncio.run(collect()) == [b"abc", b"def", None, b"last"]
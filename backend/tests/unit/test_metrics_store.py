@@ -0,0 +1,60 @@
+import os
+import multiprocessing
+from app.core.metrics import EXITED_FILE, Metrics, MmapCounters, RequestTimings
+
+def _serve(directory, requests):
+    metrics = Metrics(directory)
+    timings = RequestTimings()
+    timings.db_queries = 2
+    for _ in range(requests):
+        metrics.observe_request("GET", "/items/{id}", 200, 0.02, timings)
+
+def test_workers_are_summed_on_scrape(tmp_path):
+    workers = [multiprocessing.Process(target=_serve, args=(str(tmp_path), 50)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    metrics = Metrics(str(tmp_path))
+    metrics.count_rate_limited("/items/{id}")
+
+    lines = metrics.render().splitlines()
+    labels = 'method="GET",route="/items/{id}"'
+    assert f'snipted_http_requests_total{{{labels},status="200"}} 150' in lines
+    assert f'snipted_http_request_duration_seconds_bucket{{{labels},le="0.01"}} 0' in lines
+    assert f'snipted_http_request_duration_seconds_bucket{{{labels},le="0.025"}} 150' in lines
+    assert f'snipted_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 150' in lines
+    assert f'snipted_http_request_duration_seconds_count{{{labels}}} 150' in lines
+    assert f'snipted_db_queries_total{{{labels}}} 300' in lines
+    assert 'snipted_rate_limited_total{route="/items/{id}"} 1' in lines
+
+def test_counters_file_grows_and_reopens(tmp_path):
+    path = str(tmp_path / "1.bin")
+    counters = MmapCounters(path)
+    keys = [f"series\tkey=\"{index:05d}\"" for index in range(3000)]
+    for key in keys:
+        counters.add(key, 1.5)
+    counters.add(keys[0], 1)
+
+    reopened = MmapCounters(path)
+    reopened.add(keys[-1], 1)
+    values = MmapCounters.read(path)
+    assert len(values) == 3000
+    assert values[keys[0]] == 2.5 and values[keys[1]] == 1.5 and values[keys[-1]] == 2.5
+
+def test_exited_workers_are_folded_on_scrape(tmp_path):
+    workers = [multiprocessing.Process(target=_serve, args=(str(tmp_path), 20)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    metrics = Metrics(str(tmp_path))
+    metrics.count_rate_limited("/items/{id}")
+
+    labels = 'method="GET",route="/items/{id}"'
+    assert f'snipted_http_requests_total{{{labels},status="200"}} 40' in metrics.render().splitlines()
+    assert sorted(path.name for path in tmp_path.glob("*.bin")) == [f"{os.getpid()}.bin", EXITED_FILE]
+    worker = multiprocessing.Process(target=_serve, args=(str(tmp_path), 5))
+    worker.start()
+    worker.join()
+    assert f'snipted_http_requests_total{{{labels},status="200"}} 45' in metrics.render().splitlines()
@@ -0,0 +1,115 @@
+import os
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, text
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from app.db import migrations
+from app.db.session import build_async_engine
+from app.models.models import SQLModel, User, utc_now
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# A throwaway Postgres database; its public schema is dropped and rebuilt
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+# What create_all used to build before the blob, trending and preview upgrades
+LEGACY_SCHEMA = [
+    "CREATE TABLE users (username VARCHAR NOT NULL, email VARCHAR NOT NULL, reputation_stars INTEGER NOT NULL, "
+    "id INTEGER PRIMARY KEY, hashed_password VARCHAR NOT NULL, is_active BOOLEAN NOT NULL, created_at DATETIME NOT NULL)",
+    "CREATE TABLE tags (name VARCHAR NOT NULL, id INTEGER PRIMARY KEY)",
+    "CREATE TABLE snippets (title VARCHAR NOT NULL, code_content VARCHAR NOT NULL, language VARCHAR NOT NULL, "
+    "id INTEGER PRIMARY KEY, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, like_count INTEGER NOT NULL, "
+    "user_id INTEGER REFERENCES users (id))",
+    "CREATE TABLE snippet_tag_links (snippet_id INTEGER REFERENCES snippets (id), tag_id INTEGER REFERENCES tags (id), "
+    "PRIMARY KEY (snippet_id, tag_id))",
+    "CREATE TABLE snippet_likes (user_id INTEGER REFERENCES users (id), snippet_id INTEGER REFERENCES snippets (id), "
+    "liked_at DATETIME NOT NULL, PRIMARY KEY (user_id, snippet_id))",
+]
+
+@pytest.fixture
+def fresh_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    yield engine
+    engine.dispose()
+
+def test_migrations_build_the_models_schema(fresh_engine):
+    assert migrations.head_revisions() == {migrations.SCHEMA_HEAD}
+    with pytest.raises(migrations.SchemaOutdated):
+        migrations.verify(fresh_engine)
+
+    migrations.upgrade(fresh_engine)
+    migrations.verify(fresh_engine)
+    with fresh_engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"include_object": _modeled_only})
+        assert compare_metadata(context, SQLModel.metadata) == []
+
+def test_upgrade_adopts_a_database_from_before_migrations(fresh_engine):
+    with fresh_engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text(
+            "INSERT INTO users VALUES ('ada', 'ada@example.com', 0, 1, 'x', 1, '2024-01-01 00:00:00')"
+        ))
+        connection.execute(text("INSERT INTO tags VALUES ('python', 1)"))
+        for snippet_id, code in [(1, "print('hi')\r\n"), (2, "print('hi')\n"), (3, "fetchUserName()")]:
+            connection.execute(text(
+                "INSERT INTO snippets VALUES (:title, :code, 'python', :id, '2024-01-01 00:00:00', "
+                "'2024-01-01 00:00:00', 1, 1)"
+            ), {"title": f"snippet {snippet_id}", "code": code, "id": snippet_id})
+            connection.execute(text("INSERT INTO snippet_tag_links VALUES (:id, 1)"), {"id": snippet_id})
+        connection.execute(text("INSERT INTO snippet_likes VALUES (1, 3, '2024-01-01 00:00:00')"))
+
+    migrations.upgrade(fresh_engine)
+
+    migrations.verify(fresh_engine)
+    with fresh_engine.connect() as connection:
+        assert connection.execute(text("SELECT hash, ref_count FROM snippet_blobs ORDER BY ref_count")).all()[1][1] == 2
+        assert connection.execute(text("SELECT preview FROM snippets WHERE id = 1")).scalar() == "print('hi')\n"
+        assert connection.execute(text("SELECT snippet_count FROM tag_stats WHERE tag_id = 1")).scalar() == 3
+        assert connection.execute(text("SELECT id FROM snippets WHERE trending_score > 0")).scalars().all() == [3]
+        assert connection.execute(text(
+            "SELECT rowid FROM snippet_search WHERE snippet_search MATCH 'user'"
+        )).scalars().all() == [3]
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="set TEST_POSTGRES_URL to run against Postgres")
+def test_postgres_timestamps_take_aware_datetimes():
+    engine = create_engine(POSTGRES_URL)
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA public CASCADE"))
+            connection.execute(text("CREATE SCHEMA public"))
+        migrations.upgrade(engine, "0002")
+        with engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO users (username, email, reputation_stars, hashed_password, is_active, created_at) "
+                "VALUES ('ada', 'ada@example.com', 0, 'x', true, '2024-01-01 12:00:00')"
+            ))
+
+        migrations.upgrade(engine)
+
+        migrations.verify(engine)
+        with engine.connect() as connection:
+            context = MigrationContext.configure(connection, opts={"include_object": _modeled_only})
+            assert compare_metadata(context, SQLModel.metadata) == []
+            stored = connection.execute(text("SELECT created_at FROM users WHERE username = 'ada'")).scalar()
+            assert stored == datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    finally:
+        engine.dispose()
+
+    async def insert_with_asyncpg() -> datetime:
+        async_engine = build_async_engine(POSTGRES_URL)
+        try:
+            async with AsyncSession(async_engine) as session:
+                user = User(username="grace", email="grace@example.com", hashed_password="x", created_at=utc_now())
+                session.add(user)
+                await session.commit()
+                await session.refresh(user)
+                return user.created_at
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(insert_with_asyncpg()).tzinfo is not None
+
+def _modeled_only(obj, name, type_, reflected, compare_to) -> bool:
+    return not (type_ == "table" and reflected and compare_to is None)
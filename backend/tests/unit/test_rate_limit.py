@@ -0,0 +1,47 @@
+import os
+import asyncio
+import multiprocessing
+from app.core.limiter import MemoryStore, MmapStore, default_mmap_path, parse_rate, take_token
+
+def test_parse_rate():
+    assert parse_rate("5/minute") == (5, 60)
+    assert parse_rate("20/minutes") == (20, 60)
+
+def test_token_bucket_refills_over_time():
+    allowed, tokens = take_token(0.0, 100.0, 106.0, capacity=5, refill_rate=5 / 60)
+    assert not allowed and tokens == 0.5
+    allowed, tokens = take_token(0.5, 100.0, 106.0, capacity=5, refill_rate=5 / 60)
+    assert allowed and tokens == 0.0
+
+def _allowed(store, key, attempts, capacity, refill_rate):
+    async def spend():
+        return [(await store.hit(key, capacity, refill_rate))[0] for _ in range(attempts)]
+    return asyncio.run(spend())
+
+def test_memory_store_limits_per_key():
+    store = MemoryStore()
+    assert _allowed(store, "a", 4, 3, 0.001) == [True, True, True, False]
+    assert _allowed(store, "b", 1, 3, 0.001) == [True]
+
+def _spend(path, key, attempts, results):
+    store = MmapStore(path, slots=1024)
+    results.put(sum(_allowed(store, key, attempts, 100, 0.0001)))
+
+def test_mmap_store_is_shared_between_processes(tmp_path):
+    path = os.path.join(tmp_path, "buckets.bin")
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_spend, args=(path, "shared", 60, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sum(results.get() for _ in workers) == 100
+    assert _allowed(MmapStore(path, slots=1024), "shared", 1, 100, 0.0001) == [False]
+    assert _allowed(MmapStore(path, slots=1024), "other", 1, 100, 0.0001) == [True]
+
+def test_default_mmap_path_is_per_deployment():
+    path = default_mmap_path("postgresql://db-a/snipted", 65536)
+    assert path == default_mmap_path("postgresql://db-a/snipted", 65536)
+    assert path != default_mmap_path("postgresql://db-b/snipted", 65536)
+    assert path != default_mmap_path("postgresql://db-a/snipted", 1024)
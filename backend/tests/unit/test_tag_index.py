@@ -0,0 +1,15 @@
+from app.core.tag_index import TagIndex
+
+def test_suggestions_rank_by_usage_for_short_and_long_prefixes():
+    index = TagIndex(refresh_seconds=300)
+    index.load([("python", 40), ("pytest", 12), ("pydantic", 12), ("php", 30), ("rust", 8)])
+
+    assert index.suggest("", 2) == [("python", 40), ("php", 30)]
+    assert index.suggest("py", 10) == [("python", 40), ("pydantic", 12), ("pytest", 12)]
+    assert index.suggest("pyt", 10) == [("python", 40), ("pytest", 12)]
+    assert index.suggest("pythonic", 10) == []
+
+    index.add(["pytorch", "python"])
+    assert len(index) == 6
+    assert index.suggest("pyt", 10) == [("python", 40), ("pytest", 12), ("pytorch", 0)]
+    assert index.suggest("p", 10)[-1] == ("pytorch", 0)
@@ -67,7 +67,7 @@ export default function Home() {
               
               <div className="bg-zinc-950 rounded-lg p-4 mb-4 border border-zinc-800/50 shadow-inner">
                 <pre className="text-sm text-zinc-300 font-mono overflow-x-auto scrollbar-hide">
-                  <code>{snippet.code_content}</code>
+                  <code>{snippet.preview}</code>
                 </pre>
               </div>
 